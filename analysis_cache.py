@@ -0,0 +1,183 @@
+"""分析结果磁盘缓存模块
+
+以文件身份（绝对路径、大小、修改时间，可选内容哈希）为键，缓存分析结果和
+DataFrame 的 Arrow IPC (Feather) 列式副本。重新加载时以内存映射方式读取，
+缓存总大小超过上限时按最近最少使用的顺序淘汰。
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+from .compressed_io import physical_path
+from .excel_reader import sheet_fingerprint
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+
+def file_content_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """计算文件内容的 blake2b 哈希"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        hash_content: bool = False
+    ):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+
+    def key_for(self, file_path: str) -> str:
+        """根据文件身份生成缓存键，文件被修改后键随之改变
+
+        归档成员以归档文件的大小和修改时间为准。.xlsx 工作表以工作表自身的内容指纹为准，
+        工作簿中其他工作表的修改不会使其失效。
+        """
+        fingerprint = sheet_fingerprint(file_path)
+        if fingerprint is not None:
+            identity = [CACHE_VERSION, os.path.abspath(file_path), fingerprint]
+            return hashlib.sha256(json.dumps(identity).encode('utf-8')).hexdigest()
+        stat = os.stat(physical_path(file_path))
+        identity = [CACHE_VERSION, os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns]
+        if self.hash_content:
+            identity.append(file_content_hash(physical_path(file_path)))
+        return hashlib.sha256(json.dumps(identity).encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str):
+        return self.cache_dir / f"{key}.pkl", self.cache_dir / f"{key}.arrow"
+
+    def get(
+        self,
+        file_path: str,
+        with_data: bool = True,
+        columns: Optional[List] = None
+    ) -> Optional[Dict[str, Any]]:
+        """读取缓存，返回 {'analysis', 'data'}；未命中返回 None
+
+        with_data=False 时只读取分析结果，data 为 None。
+        columns 不为None时只从数据副本中读取这些列。
+        缓存中没有数据副本时 data 同样为 None。
+        """
+        try:
+            meta_path, data_path = self._paths(self.key_for(file_path))
+            with open(meta_path, 'rb') as f:
+                analysis = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+
+        data = None
+        if with_data and data_path.exists():
+            data = self._read_frame(data_path, analysis['columns'], columns)
+
+        # 更新访问时间，供LRU淘汰使用
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return {'analysis': analysis, 'data': data}
+
+    def put(self, file_path: str, analysis: Dict[str, Any], df: Optional[pd.DataFrame] = None):
+        """写入缓存，df 无法以 Arrow 格式保存时只缓存分析结果"""
+        meta_path, data_path = self._paths(self.key_for(file_path))
+        if df is not None:
+            try:
+                self._atomic_write(data_path, lambda tmp: self._write_frame(df, tmp))
+            except Exception:
+                pass
+        self._atomic_write(meta_path, lambda tmp: self._write_pickle(analysis, tmp))
+        self.evict()
+
+    def _write_pickle(self, obj: Any, path: str):
+        with open(path, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _write_frame(self, df: pd.DataFrame, path: str):
+        # Feather 要求字符串列名和默认索引，原始列名在读取时从分析结果恢复
+        frame = df.reset_index(drop=True)
+        frame.columns = [str(col) for col in frame.columns]
+        frame.to_feather(path, compression='uncompressed')
+
+    def _read_frame(self, path: Path, columns, selected: Optional[List] = None) -> Optional[pd.DataFrame]:
+        import pyarrow.feather as feather
+        if selected is not None:
+            wanted = set(selected)
+            columns = [col for col in columns if col in wanted]
+        try:
+            table = feather.read_table(
+                str(path),
+                columns=None if selected is None else [str(col) for col in columns],
+                memory_map=True
+            )
+        except Exception:
+            return None
+        df = table.to_pandas(split_blocks=True)
+        if len(columns) == len(df.columns):
+            df.columns = columns
+        return df
+
+    def _atomic_write(self, target: Path, writer):
+        """先写临时文件再替换，避免并行加载时读到写了一半的缓存"""
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            writer(tmp)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _entries(self):
+        entries = []
+        for meta_path in self.cache_dir.glob('*.pkl'):
+            data_path = meta_path.with_suffix('.arrow')
+            try:
+                stat = meta_path.stat()
+                size, last_access = stat.st_size, stat.st_mtime
+                if data_path.exists():
+                    size += data_path.stat().st_size
+            except OSError:
+                continue
+            entries.append((last_access, size, meta_path, data_path))
+        return entries
+
+    def size(self) -> int:
+        """缓存占用的总字节数"""
+        return sum(size for _, size, _, _ in self._entries())
+
+    def evict(self):
+        """总大小超过上限时，从最久未访问的条目开始删除"""
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, meta_path, data_path in entries:
+            if total <= self.max_bytes:
+                break
+            for path in (meta_path, data_path):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
+
+    def clear(self):
+        """清空缓存"""
+        for _, _, meta_path, data_path in self._entries():
+            for path in (meta_path, data_path):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
@@ -0,0 +1,101 @@
+"""pyarrow 读取引擎
+
+使用 pyarrow 的多线程 CSV 解析器和 JSON Lines 解析器读取文本数据。
+数据源可以是文件路径，也可以是解压中的二进制流。
+pyarrow 在函数内部导入，未安装时调用方应回退到 pandas 引擎。
+"""
+import json
+from typing import IO, Any, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from .compressed_io import read_head
+
+ENGINES = ['pandas', 'pyarrow']
+JSON_LINES_SUFFIXES = ['.jsonl', '.ndjson']
+# JSON Lines 流式读取时每个数据块的字节数
+JSON_BLOCK_BYTES = 16 * 1024 * 1024
+# 判断 .json 文件是否为 JSON Lines 时读取的字节数
+JSON_SNIFF_BYTES = 64 * 1024
+
+
+def supports_dialect(dialect: Dict[str, Any]) -> bool:
+    """pyarrow 的 CSV 解析器只支持单字符分隔符和 '.' 小数点"""
+    return len(dialect['sep']) == 1 and dialect['decimal'] == '.'
+
+
+def is_json_lines(file_path: str) -> bool:
+    """.json 文件的第一个非空行是完整的 JSON 值、且后面还有其他非空行时按 JSON Lines 处理
+
+    整个文件为一个 JSON 文档（如 df.to_json() 的输出或多行缩进的文档）时返回 False。
+    """
+    lines = [line for line in read_head(file_path, JSON_SNIFF_BYTES).splitlines() if line.strip()]
+    if len(lines) < 2:
+        return False
+    try:
+        json.loads(lines[0])
+    except ValueError:
+        return False
+    return True
+
+
+def _to_pandas(table, arrow_dtypes: bool) -> pd.DataFrame:
+    if arrow_dtypes:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas()
+
+
+def read_csv(
+    source: Union[str, IO[bytes]],
+    dialect: Dict[str, Any],
+    columns: Optional[List] = None,
+    arrow_dtypes: bool = False
+) -> pd.DataFrame:
+    """按探测到的格式用多线程解析器读取 CSV，无表头时列名与 pandas 一致为 0..n-1"""
+    import pyarrow.csv as pa_csv
+
+    header = dialect['header']
+    read_options = pa_csv.ReadOptions(
+        encoding=dialect['encoding'],
+        autogenerate_column_names=not header,
+        use_threads=True
+    )
+    parse_options = pa_csv.ParseOptions(delimiter=dialect['sep'])
+    include = None
+    if columns is not None:
+        include = [str(col) if header else f"f{col}" for col in columns]
+    convert_options = pa_csv.ConvertOptions(include_columns=include)
+
+    table = pa_csv.read_csv(
+        source,
+        read_options=read_options,
+        parse_options=parse_options,
+        convert_options=convert_options
+    )
+    df = _to_pandas(table, arrow_dtypes)
+    if not header:
+        df.columns = [int(name[1:]) for name in table.column_names]
+    return df
+
+
+def read_json_lines(
+    source: Union[str, IO[bytes]],
+    columns: Optional[List] = None,
+    arrow_dtypes: bool = False
+) -> pd.DataFrame:
+    """用多线程解析器读取 JSON Lines 文件"""
+    import pyarrow.json as pa_json
+
+    table = pa_json.read_json(source, read_options=pa_json.ReadOptions(use_threads=True))
+    if columns is not None:
+        table = table.select([str(col) for col in columns])
+    return _to_pandas(table, arrow_dtypes)
+
+
+def iter_json_lines(source: Union[str, IO[bytes]], arrow_dtypes: bool = False) -> Iterator[pd.DataFrame]:
+    """逐个记录批次读取 JSON Lines 文件，内存中只保留当前批次"""
+    import pyarrow.json as pa_json
+
+    reader = pa_json.open_json(source, read_options=pa_json.ReadOptions(block_size=JSON_BLOCK_BYTES))
+    for batch in reader:
+        yield _to_pandas(batch, arrow_dtypes)
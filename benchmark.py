@@ -0,0 +1,475 @@
+"""
+性能基准测试
+
+用法:
+    python -m fig_agent.benchmark analyze --rows 1000 --columns 100 1000 5000 20000
+    python -m fig_agent.benchmark read --rows 100000 1000000 5000000
+    python -m fig_agent.benchmark http --calls 50 --threads 4
+    python -m fig_agent.benchmark stream --calls 5 --prose-chars 2000
+    python -m fig_agent.benchmark async --calls 40 --concurrency 8
+    python -m fig_agent.benchmark prompt-cache --files 10 --retries 1
+    python -m fig_agent.benchmark ratelimit --calls 60 --threads 8 --server-rps 10
+    python -m fig_agent.benchmark replay --files 8 --latency 0.5 --token-delay 0.01
+    python -m fig_agent.benchmark speculative --runs 20 --candidates 1 2 3 --failure-rate 0.4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from fig_agent.data_analyzer import DataAnalyzer
+from fig_agent.http_pool import PooledSession
+from fig_agent.mock_server import start_chat_server
+
+
+def _timeit(func: Callable, repeat: int = 3) -> float:
+    """返回多次运行中的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _legacy_analyze_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
+    """逐列循环的旧版 analyze_dataframe，作为对比基线"""
+    statistics = {}
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            statistics[col] = {
+                'mean': float(df[col].mean()) if not df[col].isna().all() else None,
+                'std': float(df[col].std()) if not df[col].isna().all() else None,
+                'min': float(df[col].min()) if not df[col].isna().all() else None,
+                'max': float(df[col].max()) if not df[col].isna().all() else None,
+                'median': float(df[col].median()) if not df[col].isna().all() else None
+            }
+        elif not pd.api.types.is_datetime64_any_dtype(df[col]):
+            statistics[col] = {
+                'unique_count': int(df[col].nunique()),
+                'top_values': df[col].value_counts().head(5).to_dict()
+            }
+    return statistics
+
+
+def _make_wide_frame(rows: int, columns: int, categorical_ratio: float = 0.2) -> pd.DataFrame:
+    """构造宽表：大部分为数值列，按比例混入低基数分类列"""
+    rng = np.random.default_rng(0)
+    n_categorical = int(columns * categorical_ratio)
+    numeric = pd.DataFrame(
+        rng.standard_normal((rows, columns - n_categorical)),
+        columns=[f'sensor_{i}' for i in range(columns - n_categorical)]
+    )
+    labels = np.array(['A', 'B', 'C', 'D', 'E', 'F'], dtype=object)
+    categorical = pd.DataFrame(
+        labels[rng.integers(0, len(labels), (rows, n_categorical))],
+        columns=[f'label_{i}' for i in range(n_categorical)]
+    )
+    return pd.concat([numeric, categorical], axis=1)
+
+
+def bench_analyze_dataframe(rows: int, column_counts: List[int], repeat: int = 3):
+    """比较逐列循环与向量化 analyze_dataframe 随列数增长的耗时"""
+    analyzer = DataAnalyzer()
+    print(f"\nanalyze_dataframe 基准测试 (行数={rows})")
+    print(f"{'列数':>8} {'逐列循环(s)':>14} {'向量化(s)':>12} {'加速比':>8}")
+    for columns in column_counts:
+        df = _make_wide_frame(rows, columns)
+        legacy = _timeit(lambda: _legacy_analyze_dataframe(df), repeat)
+        vectorized = _timeit(lambda: analyzer.analyze_dataframe(df), repeat)
+        print(f"{columns:>8} {legacy:>14.3f} {vectorized:>12.3f} {legacy / vectorized:>7.1f}x")
+
+
+def _make_mixed_frame(rows: int) -> pd.DataFrame:
+    """构造典型的日志型数据：整数、浮点、低基数字符串和时间戳"""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'id': np.arange(rows),
+        'value': rng.standard_normal(rows),
+        'ratio': rng.random(rows),
+        'region': np.array(['north', 'south', 'east', 'west'], dtype=object)[rng.integers(0, 4, rows)],
+        'timestamp': pd.date_range('2024-01-01', periods=rows, freq='s').strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+
+def bench_read_engines(row_counts: List[int], repeat: int = 3):
+    """比较 pandas 与 pyarrow 引擎读取 CSV 和 JSON Lines 的耗时"""
+    engines = [
+        ('pandas', DataAnalyzer(engine='pandas')),
+        ('pyarrow', DataAnalyzer(engine='pyarrow')),
+        ('pyarrow+arrow类型', DataAnalyzer(engine='pyarrow', arrow_dtypes=True)),
+    ]
+    print(f"\nread_data 引擎基准测试 (CPU核数={os.cpu_count()})")
+    header = ''.join(f"{name + '(s)':>20}" for name, _ in engines)
+    print(f"{'格式':>6} {'行数':>10} {'大小(MB)':>10}{header} {'加速比':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in row_counts:
+            df = _make_mixed_frame(rows)
+            files = {
+                'csv': os.path.join(tmp_dir, f'bench_{rows}.csv'),
+                'jsonl': os.path.join(tmp_dir, f'bench_{rows}.jsonl'),
+            }
+            df.to_csv(files['csv'], index=False)
+            df.to_json(files['jsonl'], orient='records', lines=True)
+            for fmt, path in files.items():
+                size_mb = os.path.getsize(path) / 1024 ** 2
+                timings = [_timeit(lambda: analyzer.read_data(path), repeat) for _, analyzer in engines]
+                cells = ''.join(f"{t:>20.3f}" for t in timings)
+                print(f"{fmt:>6} {rows:>10} {size_mb:>10.1f}{cells} {timings[0] / timings[1]:>7.1f}x")
+
+
+def bench_http_pool(calls: int, threads: int, delay: float, url: str = None):
+    """比较每次新建连接与共享 keep-alive 连接池的请求耗时
+
+    url 为None时使用本地替身接口（无TLS，握手开销只有TCP）；指定 HTTPS 地址可测量 TLS 握手的节省。
+    """
+    server = None
+    if url is None:
+        server, url = start_chat_server(delay)
+    payload = {'model': 'deepseek-chat', 'messages': [{'role': 'user', 'content': 'ping'}]}
+
+    def fresh_call(_):
+        session = PooledSession(pool_size=1)
+        try:
+            return session.post(url, json=payload, timeout=60)[1]
+        finally:
+            session.close()
+
+    pooled = PooledSession(pool_size=threads)
+
+    def pooled_call(_):
+        return pooled.post(url, json=payload, timeout=60)[1]
+
+    print(f"\nHTTP 连接池基准测试 (请求数={calls}, 线程数={threads}, 服务端延迟={delay}s)")
+    print(f"{'模式':>10} {'连接(ms)':>10} {'首字节(ms)':>12} {'传输(ms)':>10} {'总计(ms)':>10} {'新建连接':>8} {'墙钟(s)':>8}")
+    for name, call in [('每次新建', fresh_call), ('连接池', pooled_call)]:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            timings = list(executor.map(call, range(calls)))
+        wall = time.perf_counter() - start
+        mean = {key: np.mean([t[key] for t in timings]) * 1000 for key in ('connect', 'ttfb', 'transfer', 'total')}
+        opened = sum(t['new_connections'] for t in timings)
+        print(
+            f"{name:>10} {mean['connect']:>10.2f} {mean['ttfb']:>12.2f} {mean['transfer']:>10.2f} "
+            f"{mean['total']:>10.2f} {opened:>8} {wall:>8.2f}"
+        )
+    pooled.close()
+    if server is not None:
+        server.shutdown()
+
+
+def bench_streaming(calls: int, token_delay: float, prose_chars: int):
+    """比较一次性接收与流式接收（代码块结束即断开）得到代码的耗时
+
+    替身接口的回复为一个代码块加 prose_chars 个字符的说明文字，每16个字符间隔 token_delay 秒。
+    """
+    from fig_agent.llm_client import DeepSeekClient
+
+    code = "import matplotlib.pyplot as plt\n" + "plt.plot([1, 2, 3])\n" * 20 + "plt.savefig('output.png')"
+    reply = f"Here is the visualization:\n```python\n{code}\n```\n" + ("Explanation. " * prose_chars)[:prose_chars]
+    server, url = start_chat_server(0.05, reply=reply, token_delay=token_delay)
+    client = DeepSeekClient('benchmark', base_url=url.rsplit('/chat/completions', 1)[0])
+    messages = [{'role': 'user', 'content': 'plot'}]
+
+    def buffered():
+        client.chat_completion(messages)
+
+    def streamed():
+        client.chat_completion(messages, stream=True, on_code_complete=lambda _: None, stop_after_code=True)
+
+    print(f"\n流式接收基准测试 (回复={len(reply)}字符, 其中代码={len(code)}字符, 每块间隔={token_delay}s)")
+    print(f"{'模式':>14} {'平均耗时(s)':>12}")
+    for name, call in [('一次性接收', buffered), ('流式+提前断开', streamed)]:
+        elapsed = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            call()
+            elapsed.append(time.perf_counter() - start)
+        print(f"{name:>14} {np.mean(elapsed):>12.3f}")
+    client.close()
+    server.shutdown()
+
+
+def bench_async_generation(calls: int, concurrency: int, delay: float):
+    """比较逐个调用与异步并发调用 generate_visualization_code 生成多个文件代码的墙钟时间"""
+    from fig_agent.llm_client import DeepSeekClient
+
+    server, url = start_chat_server(delay, reply="```python\nplt.savefig('output.png')\n```")
+    client = DeepSeekClient(
+        'benchmark', base_url=url.rsplit('/chat/completions', 1)[0],
+        pool_size=concurrency, max_concurrency=concurrency
+    )
+    summaries = [f"file_{i}.csv" for i in range(calls)]
+
+    def sequential():
+        return [client.generate_visualization_code(summary) for summary in summaries]
+
+    async def concurrent():
+        return await asyncio.gather(*[client.generate_visualization_code_async(summary) for summary in summaries])
+
+    print(f"\n异步并发生成基准测试 (文件数={calls}, 并发数={concurrency}, 服务端延迟={delay}s)")
+    print(f"{'模式':>10} {'墙钟(s)':>8} {'新建连接':>8}")
+    for name, run in [('逐个调用', sequential), ('异步并发', lambda: asyncio.run(concurrent()))]:
+        opened = client.http.stats['new_connections']
+        start = time.perf_counter()
+        run()
+        wall = time.perf_counter() - start
+        print(f"{name:>10} {wall:>8.2f} {client.http.stats['new_connections'] - opened:>8}")
+    client.close()
+    server.shutdown()
+
+
+def bench_prompt_cache(files: int, retries: int):
+    """模拟一次会话：为 files 个文件各生成一次代码并修复 retries 次，统计服务端上下文缓存命中的输入 token
+
+    替身接口按前缀（64 token 为一块）模拟缓存，命中部分通常按未命中价格的一小部分计费。
+    """
+    from fig_agent.llm_client import DeepSeekClient
+
+    server, url = start_chat_server(0.0, reply="```python\nplt.savefig('output.png')\n```")
+    client = DeepSeekClient('benchmark', base_url=url.rsplit('/chat/completions', 1)[0])
+    analyzer = DataAnalyzer()
+
+    print(f"\n上下文缓存基准测试 (文件数={files}, 每个文件修复次数={retries})")
+    print(f"{'文件':>6} {'输入token':>10} {'缓存命中':>10} {'未命中':>10} {'命中率':>8}")
+    for i in range(files):
+        summary = analyzer.generate_summary(analyzer.analyze_dataframe(_make_mixed_frame(200 + i)))
+        before = client.usage.summary()
+        code = client.generate_visualization_code(summary)
+        for _ in range(retries):
+            code = client.generate_visualization_code(
+                summary, previous_code=code, feedback="Code execution failed: KeyError"
+            )
+        after = client.usage.summary()
+        prompt = after['prompt_tokens'] - before['prompt_tokens']
+        hit = after['cache_hit_tokens'] - before['cache_hit_tokens']
+        print(f"{i + 1:>6} {prompt:>10} {hit:>10} {prompt - hit:>10} {hit / prompt:>8.1%}")
+
+    totals = client.usage.summary()
+    print(
+        f"{'合计':>6} {totals['prompt_tokens']:>10} {totals['cache_hit_tokens']:>10} "
+        f"{totals['cache_miss_tokens']:>10} {totals['cache_hit_rate']:>8.1%}"
+    )
+    client.close()
+    server.shutdown()
+
+
+def bench_rate_limit(calls: int, threads: int, server_rps: float):
+    """多线程调用限流的替身接口，比较只按 Retry-After 重试、加上抖动退避和再加上客户端限流时的429次数与耗时"""
+    from fig_agent.llm_client import DeepSeekClient
+
+    modes = [
+        ('无抖动', {'backoff_base': 0.0, 'backoff_max': 0.0}),
+        ('抖动退避', {'backoff_base': 0.05}),
+        ('限流+退避', {'backoff_base': 0.05, 'requests_per_minute': int(server_rps * 60 * 0.9)}),
+    ]
+    messages = [{'role': 'user', 'content': 'ping'}]
+    print(f"\n限流与重试基准测试 (请求数={calls}, 线程数={threads}, 服务端限流={server_rps}次/秒)")
+    print(f"{'模式':>10} {'成功':>6} {'429次数':>8} {'重试':>6} {'本地等待':>8} {'墙钟(s)':>8}")
+    for name, options in modes:
+        server, url = start_chat_server(0.0, requests_per_second=server_rps)
+        client = DeepSeekClient('benchmark', base_url=url.rsplit('/chat/completions', 1)[0], pool_size=threads, **options)
+
+        def call(_):
+            try:
+                client.chat_completion(messages, max_retries=20)
+                return True
+            except Exception:
+                return False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            succeeded = sum(executor.map(call, range(calls)))
+        wall = time.perf_counter() - start
+        stats = client.call_stats
+        print(
+            f"{name:>10} {succeeded:>6} {stats['rate_limited']:>8} {stats['retried']:>6} "
+            f"{stats['throttled']:>8} {wall:>8.2f}"
+        )
+        client.close()
+        server.shutdown()
+
+
+def bench_agent_replay(files: int, latency: float, token_delay: float, fixture_dir: str = None):
+    """不访问网络运行完整流程（读取数据、并发生成代码、执行并保存图片），统计LLM与代码执行的耗时
+
+    先以 record 模式请求本地替身接口（代替真实接口）录制夹具，再以 replay 模式回放，
+    回放时每次调用模拟 latency 秒的首字节时间和每块 token_delay 秒的输出间隔。
+    fixture_dir 中已有夹具时跳过录制，可用于复用以真实接口录制的夹具。
+    """
+    from fig_agent.visualization_agent import VisualizationAgent
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixture_dir = fixture_dir or os.path.join(tmp_dir, 'fixtures')
+        output_dir = os.path.join(tmp_dir, 'output')
+        paths = []
+        for i in range(files):
+            path = os.path.join(tmp_dir, f'data_{i}.csv')
+            _make_mixed_frame(200 + i).to_csv(path, index=False)
+            paths.append(path)
+        # 代码中的 output.png 由执行器替换为各图的文件名
+        reply = (
+            "```python\nfig, ax = plt.subplots()\nax.plot(df['value'])\n"
+            f"plt.savefig({os.path.join(output_dir, 'output.png')!r})\n```"
+        )
+
+        def run(llm_options):
+            agent = VisualizationAgent('benchmark', output_dir=output_dir, llm_options=llm_options)
+            agent.load_data(paths)
+            start = time.perf_counter()
+            results = agent.generate_visualizations(max_retries=1)
+            wall = time.perf_counter() - start
+            history = agent.get_history()
+            agent.llm_client.close()
+            return results, wall, history
+
+        modes = []
+        if not os.path.isdir(fixture_dir) or not os.listdir(fixture_dir):
+            server, url = start_chat_server(0.0, reply=reply)
+            base_url = url.rsplit('/chat/completions', 1)[0]
+            modes.append(('录制', run({'base_url': base_url, 'transport': 'record', 'fixture_dir': fixture_dir})))
+            server.shutdown()
+        modes.append(('回放', run({
+            'transport': 'replay', 'fixture_dir': fixture_dir,
+            'replay_latency': latency, 'replay_token_delay': token_delay
+        })))
+
+    print(f"\n离线回放基准测试 (文件数={files}, 首字节={latency}s, 每块间隔={token_delay}s)")
+    print(f"{'模式':>6} {'成功':>6} {'LLM调用':>8} {'LLM耗时(s)':>10} {'执行耗时(s)':>11} {'墙钟(s)':>8}")
+    for name, (results, wall, history) in modes:
+        succeeded = sum(1 for r in results.values() if r['success'])
+        timing = history['timing']
+        print(
+            f"{name:>6} {succeeded:>6} {history['llm_calls']['total']['calls']:>8} "
+            f"{timing['llm_seconds']:>10.2f} {timing['execution_seconds']:>11.2f} {wall:>8.2f}"
+        )
+
+
+def bench_speculative(runs: int, candidates: List[int], failure_rate: float, delay: float):
+    """比较逐次修复与同时生成多个候选代码（采用第一个执行成功的）的端到端耗时分位数
+
+    替身接口的每次回复以 failure_rate 的概率为执行出错的代码，每次调用等待 delay 秒。
+    """
+    import random
+    import seaborn  # noqa: F401  # 两种模式都在计时前导入执行环境
+    from fig_agent.visualization_agent import VisualizationAgent
+
+    good = "```python\nfig, ax = plt.subplots()\nax.plot(df['value'])\n```"
+    bad = "```python\nfig, ax = plt.subplots()\nax.plot(df['missing'])\n```"
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+
+    def responder(request):
+        with rng_lock:
+            return bad if rng.random() < failure_rate else good
+
+    server, url = start_chat_server(delay, responder=responder)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'data.csv')
+        _make_mixed_frame(1000).to_csv(path, index=False)
+        for count in candidates:
+            agent = VisualizationAgent('benchmark', output_dir=os.path.join(tmp_dir, f'output_{count}'), llm_options={
+                'base_url': url.rsplit('/chat/completions', 1)[0], 'pool_size': max(count, 1)
+            })
+            agent.load_data([path])
+            elapsed = []
+            succeeded = 0
+            for _ in range(runs):
+                start = time.perf_counter()
+                succeeded += agent.generate_visualization(max_retries=3, candidates=count)['success']
+                elapsed.append(time.perf_counter() - start)
+            calls = agent.get_history()['llm_calls']['total']['calls']
+            agent.llm_client.close()
+            p50, p90, p99 = np.percentile(elapsed, [50, 90, 99])
+            name = '逐次修复' if count == 1 else f'{count}个候选'
+            rows.append(f"{name:>10} {succeeded / runs:>8.0%} {p50:>8.2f} {p90:>8.2f} {p99:>8.2f} {calls:>8}")
+    server.shutdown()
+
+    # Agent 运行时输出较多，表格在全部完成后统一输出
+    print(f"\n推测式候选代码基准测试 (次数={runs}, 单次失败率={failure_rate:.0%}, 接口延迟={delay}s)")
+    print(f"{'模式':>10} {'成功率':>8} {'p50(s)':>8} {'p90(s)':>8} {'p99(s)':>8} {'LLM调用':>8}")
+    for row in rows:
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FigAgent 性能基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    analyze_parser = subparsers.add_parser('analyze', help='analyze_dataframe 宽表扩展性')
+    analyze_parser.add_argument('--rows', type=int, default=1000)
+    analyze_parser.add_argument('--columns', type=int, nargs='+', default=[100, 1000, 5000, 20000])
+    analyze_parser.add_argument('--repeat', type=int, default=3)
+
+    read_parser = subparsers.add_parser('read', help='read_data 读取引擎对比')
+    read_parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000])
+    read_parser.add_argument('--repeat', type=int, default=3)
+
+    http_parser = subparsers.add_parser('http', help='LLM 接口连接池对比')
+    http_parser.add_argument('--calls', type=int, default=50)
+    http_parser.add_argument('--threads', type=int, default=4)
+    http_parser.add_argument('--delay', type=float, default=0.01, help='本地替身接口的响应延迟（秒）')
+    http_parser.add_argument('--url', default=None, help='改为请求该地址（如 HTTPS 接口）')
+
+    stream_parser = subparsers.add_parser('stream', help='流式接收与提前断开对比')
+    stream_parser.add_argument('--calls', type=int, default=5)
+    stream_parser.add_argument('--token-delay', type=float, default=0.01)
+    stream_parser.add_argument('--prose-chars', type=int, default=2000)
+
+    async_parser = subparsers.add_parser('async', help='逐个调用与异步并发生成对比')
+    async_parser.add_argument('--calls', type=int, default=40)
+    async_parser.add_argument('--concurrency', type=int, default=8)
+    async_parser.add_argument('--delay', type=float, default=0.2, help='本地替身接口的响应延迟（秒）')
+
+    prompt_cache_parser = subparsers.add_parser('prompt-cache', help='会话中服务端上下文缓存命中的输入token')
+    prompt_cache_parser.add_argument('--files', type=int, default=10)
+    prompt_cache_parser.add_argument('--retries', type=int, default=1)
+
+    ratelimit_parser = subparsers.add_parser('ratelimit', help='服务端限流下的重试与客户端限流对比')
+    ratelimit_parser.add_argument('--calls', type=int, default=60)
+    ratelimit_parser.add_argument('--threads', type=int, default=8)
+    ratelimit_parser.add_argument('--server-rps', type=float, default=10)
+
+    replay_parser = subparsers.add_parser('replay', help='以录制的夹具离线运行完整流程')
+    replay_parser.add_argument('--files', type=int, default=8)
+    replay_parser.add_argument('--latency', type=float, default=0.5, help='回放时模拟的首字节时间（秒）')
+    replay_parser.add_argument('--token-delay', type=float, default=0.01, help='回放时模拟的每块输出间隔（秒）')
+    replay_parser.add_argument('--fixtures', default=None, help='夹具目录，为空时先录制')
+
+    speculative_parser = subparsers.add_parser('speculative', help='逐次修复与同时生成多个候选代码对比')
+    speculative_parser.add_argument('--runs', type=int, default=20)
+    speculative_parser.add_argument('--candidates', type=int, nargs='+', default=[1, 2, 3])
+    speculative_parser.add_argument('--failure-rate', type=float, default=0.4)
+    speculative_parser.add_argument('--delay', type=float, default=1.0, help='本地替身接口的响应延迟（秒）')
+
+    args = parser.parse_args()
+    if args.command == 'analyze':
+        bench_analyze_dataframe(args.rows, args.columns, args.repeat)
+    elif args.command == 'read':
+        bench_read_engines(args.rows, args.repeat)
+    elif args.command == 'http':
+        bench_http_pool(args.calls, args.threads, args.delay, args.url)
+    elif args.command == 'stream':
+        bench_streaming(args.calls, args.token_delay, args.prose_chars)
+    elif args.command == 'async':
+        bench_async_generation(args.calls, args.concurrency, args.delay)
+    elif args.command == 'prompt-cache':
+        bench_prompt_cache(args.files, args.retries)
+    elif args.command == 'ratelimit':
+        bench_rate_limit(args.calls, args.threads, args.server_rps)
+    elif args.command == 'replay':
+        bench_agent_replay(args.files, args.latency, args.token_delay, args.fixtures)
+    elif args.command == 'speculative':
+        bench_speculative(args.runs, args.candidates, args.failure_rate, args.delay)
+
+
+if __name__ == '__main__':
+    main()
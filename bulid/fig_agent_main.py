@@ -6,6 +6,7 @@ FigAgent 主入口文件
 """
 import sys
 import os
+import multiprocessing
 
 # 确保打包后能找到模块
 if getattr(sys, 'frozen', False):
@@ -25,6 +26,8 @@ sys.path.insert(0, application_path)
 from fig_agent.cli import main
 
 if __name__ == '__main__':
+    # 打包后的exe中，multiprocessing 启动的子进程需要由此进入子进程入口而不是再次运行CLI
+    multiprocessing.freeze_support()
     try:
         main()
     except KeyboardInterrupt:
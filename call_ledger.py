@@ -0,0 +1,117 @@
+"""LLM 调用记录模块
+
+每次 chat completions 调用记录为一条结构化记录：开始时间、模型、调用用途（suggest/generate/
+combined/refine）、输入输出 token 数、首字节耗时和总耗时、重试次数等，保存在内存中，
+流式接收提前断开而收不到 usage 时 token 数为估算值（usage_estimated），
+指定文件时同时以 JSON Lines 格式追加写入，便于事后统计一次会话的 LLM 耗时和费用。
+"""
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .token_usage import USAGE_FIELDS
+
+# 费用按每百万 token 的单价计算，键为 cache_hit_tokens / cache_miss_tokens / completion_tokens
+PRICE_FIELDS = ['cache_hit_tokens', 'cache_miss_tokens', 'completion_tokens']
+
+
+class CallLedger:
+    def __init__(self, path: Optional[str] = None, prices: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            path: JSON Lines 文件路径，为None时只保存在内存中
+            prices: 每百万 token 的单价，如 {'cache_hit_tokens': 0.5, 'cache_miss_tokens': 2, 'completion_tokens': 8}；
+                为None时不计算费用
+        """
+        self.path = path
+        self.prices = prices
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def start(self, purpose: Optional[str], model: str, stream: bool) -> Dict[str, Any]:
+        """开始记录一次调用，返回的记录在调用过程中由客户端补充"""
+        return {
+            'started': time.time(),
+            'purpose': purpose,
+            'model': model,
+            'stream': stream,
+            'cached': False,
+            'retries': 0,
+            'throttle_wait': 0.0,
+            'ttfb': None,
+            'first_token': None,
+            'request_seconds': None,
+            'stopped_early': False,
+            'latency': None,
+            'error': None,
+            **dict.fromkeys(USAGE_FIELDS),
+            'usage_estimated': False,
+            '_clock': time.perf_counter(),
+        }
+
+    def finish(self, call: Dict[str, Any]):
+        """结束记录：计算总耗时（含重试和等待）和费用，保存记录"""
+        call['latency'] = time.perf_counter() - call.pop('_clock')
+        if self.prices is not None and call['prompt_tokens'] is not None:
+            call['cost'] = sum(call[field] * self.prices.get(field, 0.0) for field in PRICE_FIELDS) / 1e6
+        with self._lock:
+            self.records.append(call)
+            if self.path is not None:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(call, ensure_ascii=False) + '\n')
+
+    def summary(self) -> Dict[str, Any]:
+        """按用途汇总调用次数、token 数和耗时"""
+        with self._lock:
+            records = list(self.records)
+        return {
+            'total': _aggregate(records),
+            'by_purpose': {
+                purpose: _aggregate([r for r in records if r['purpose'] == purpose])
+                for purpose in dict.fromkeys(r['purpose'] for r in records)
+            },
+        }
+
+
+def _busy_seconds(records: List[Dict[str, Any]]) -> float:
+    """调用时间段 [started, started + latency] 的并集长度，并发的调用只计一次"""
+    intervals = sorted((r['started'], r['started'] + r['latency']) for r in records)
+    total = 0.0
+    current_start = current_end = None
+    for start, end in intervals:
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def _aggregate(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """汇总一组调用记录：llm_seconds 为调用时间段并集的长度（等待LLM的墙钟时间），
+    llm_seconds_summed 为各次调用耗时之和"""
+    requested = [r for r in records if not r['cached']]
+    result = {
+        'calls': len(records),
+        'cached': len(records) - len(requested),
+        'errors': sum(1 for r in records if r['error']),
+        'retries': sum(r['retries'] for r in records),
+        'unreported_usage': sum(1 for r in requested if r['prompt_tokens'] is None and not r['error']),
+        'estimated_usage': sum(1 for r in records if r.get('usage_estimated')),
+        'llm_seconds_summed': sum(r['latency'] for r in records),
+        'throttle_wait': sum(r['throttle_wait'] for r in records),
+    }
+    # 开始时间为时间戳、耗时为单调时钟，两者相加的舍入误差不能使并集超过总和
+    result['llm_seconds'] = min(_busy_seconds(records), result['llm_seconds_summed'])
+    for field in USAGE_FIELDS:
+        result[field] = sum(r[field] or 0 for r in records)
+    ttfbs = [r['ttfb'] for r in requested if r['ttfb'] is not None]
+    result['mean_ttfb'] = sum(ttfbs) / len(ttfbs) if ttfbs else None
+    result['mean_latency'] = result['llm_seconds_summed'] / len(records) if records else None
+    if any('cost' in r for r in records):
+        result['cost'] = sum(r.get('cost', 0.0) for r in records)
+    return result
@@ -6,7 +6,7 @@ from .config_manager import ConfigManager
 
 class CLI:
     def __init__(self, api_key: str):
-        self.agent = VisualizationAgent(api_key=api_key)
+        self.agent = VisualizationAgent(api_key=api_key, stream=True)
         self.running = True
     
     def show_menu(self):
@@ -22,6 +22,7 @@ class CLI:
         print("6. 优化当前可视化")
         print("7. 导出代码")
         print("8. 查看历史")
+        print("9. 监视数据变化")
         print("0. 退出")
         print("="*60)
     
@@ -65,12 +66,12 @@ class CLI:
     
     def generate_visualization_interactive(self):
         """交互式生成可视化"""
-        if not self.agent.current_data:
+        if not self.agent.current_analyses:
             print("\n请先加载数据")
             return
         
         # 选择数据文件
-        file_paths = list(self.agent.current_data.keys())
+        file_paths = list(self.agent.current_analyses.keys())
         if len(file_paths) > 1:
             print("\n请选择要可视化的数据：")
             for i, path in enumerate(file_paths, 1):
@@ -172,6 +173,16 @@ class CLI:
         print(f"成功执行次数: {sum(1 for h in history['execution_history'] if h['success'])}")
         print(f"失败次数: {sum(1 for h in history['execution_history'] if not h['success'])}")
     
+    def watch_interactive(self):
+        """监视已加载的文件和文件夹，变化时增量更新"""
+        if not self.agent.watch_sources:
+            print("\n请先加载数据")
+            return
+        
+        print("\n数据变化时是否重新生成相关可视化？(y/N)")
+        rerender = input("> ").strip().lower() == 'y'
+        self.agent.watch(rerender=rerender)
+    
     def generate_all_visualizations_interactive(self):
         """为所有数据生成综合可视化"""
         if not self.agent.current_data:
@@ -198,7 +209,7 @@ class CLI:
         
         while self.running:
             self.show_menu()
-            choice = input("\n请选择功能 (0-8): ").strip()
+            choice = input("\n请选择功能 (0-9): ").strip()
             
             if choice == '0':
                 print("\n再见！")
@@ -219,6 +230,8 @@ class CLI:
                 self.export_code_interactive()
             elif choice == '8':
                 self.show_history()
+            elif choice == '9':
+                self.watch_interactive()
             else:
                 print("\n无效的选择，请重试")
 
@@ -2,6 +2,7 @@ import sys
 import io
 import os
 import glob
+import time
 import traceback
 from contextlib import redirect_stdout, redirect_stderr
 from typing import Dict, Any, Optional, List
@@ -20,9 +21,14 @@ class CodeExecutor:
         code: str, 
         df: pd.DataFrame,
         output_filename: str = "output.png",
-        base_filename: Optional[str] = None
+        base_filename: Optional[str] = None,
+        workdir: Optional[str] = None
     ) -> Dict[str, Any]:
-        """执行可视化代码，支持多图输出"""
+        """执行可视化代码，支持多图输出
+        
+        workdir 不为None时切换到该目录执行，代码中以相对路径保存的图片都在该目录中，
+        检测到的输出文件为绝对路径。
+        """
         result = {
             'success': False,
             'output': '',
@@ -53,6 +59,11 @@ class CodeExecutor:
         stdout_capture = io.StringIO()
         stderr_capture = io.StringIO()
         
+        start = time.perf_counter()
+        original_dir = os.getcwd()
+        if workdir is not None:
+            os.chdir(workdir)
+        
         # 记录执行前的图片文件
         if base_filename:
             output_pattern = base_filename if os.path.isdir(base_filename) else os.path.dirname(base_filename) or '.'
@@ -74,6 +85,8 @@ class CodeExecutor:
             if base_filename:
                 after_files = set(glob.glob(os.path.join(output_pattern, '*.png')))
                 new_files = list(after_files - before_files)
+                if workdir is not None:
+                    new_files = [os.path.abspath(f) for f in new_files]
                 if new_files:
                     result['output_files'] = sorted(new_files)
                     result['output_file'] = new_files[0] if len(new_files) == 1 else None
@@ -89,7 +102,10 @@ class CodeExecutor:
             result['error'] = f"{type(e).__name__}: {str(e)}\n\n{traceback.format_exc()}"
             result['output'] = stdout_capture.getvalue()
             plt.close('all')
+        finally:
+            os.chdir(original_dir)
         
+        result['execution_seconds'] = time.perf_counter() - start
         return result
     
     def execute_combined_visualization(
@@ -124,6 +140,7 @@ class CodeExecutor:
         stdout_capture = io.StringIO()
         stderr_capture = io.StringIO()
         
+        start = time.perf_counter()
         try:
             plt.clf()
             plt.close('all')
@@ -165,6 +182,7 @@ class CodeExecutor:
             except:
                 pass
         
+        result['execution_seconds'] = time.perf_counter() - start
         return result
     
     def validate_code(self, code: str) -> Dict[str, Any]:
@@ -0,0 +1,174 @@
+"""列裁剪模块
+
+静态分析生成的可视化代码，找出其引用的列名，使数据层只读取这些列。
+只有当代码对数据表的每一次使用都能确定涉及哪些列时才裁剪，
+出现整表操作（如 df.describe()、df.columns、for 循环遍历）或无法静态确定的写法时返回 None，
+调用方应回退到读取完整数据。
+"""
+import ast
+from typing import List, Optional, Sequence, Set
+
+FRAME_NAME = 'df'
+# 只筛选行、不依赖其他列的方法；dropna/drop_duplicates 仅在指定 subset 时成立
+ROW_METHODS = {'head', 'tail', 'sample', 'copy', 'reset_index', 'sort_values', 'nlargest', 'nsmallest'}
+SUBSET_METHODS = {'dropna', 'drop_duplicates'}
+# 用作行筛选条件时返回布尔序列的方法
+MASK_METHODS = {'isin', 'between', 'notna', 'notnull', 'isna', 'isnull', 'contains', 'startswith', 'endswith'}
+# 出现在这些调用中的 data=df 只使用通过参数指定的列
+_AXIS_KEYWORDS = {'x', 'y', 'hue', 'size', 'style', 'col', 'row', 'weights'}
+
+
+def _constant_strings(node: ast.AST) -> Optional[List[str]]:
+    """常量字符串或常量字符串列表，其他形式返回 None"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, (ast.List, ast.Tuple)) and node.elts:
+        values = []
+        for elt in node.elts:
+            if not (isinstance(elt, ast.Constant) and isinstance(elt.value, str)):
+                return None
+            values.append(elt.value)
+        return values
+    return None
+
+
+def _is_row_mask(node: ast.AST) -> bool:
+    if isinstance(node, (ast.Compare, ast.BoolOp, ast.UnaryOp, ast.BinOp)):
+        return True
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr in MASK_METHODS
+    )
+
+
+def _has_keyword(call: ast.Call, name: str) -> bool:
+    return any(keyword.arg == name for keyword in call.keywords)
+
+
+class _FrameUsage:
+    """检查数据表名称的每一次读取是否都只涉及可确定的列"""
+
+    def __init__(self, tree: ast.AST, columns: Set[str]):
+        self.columns = columns
+        self.parents = {}
+        for parent in ast.walk(tree):
+            for child in ast.iter_child_nodes(parent):
+                self.parents[child] = parent
+        self.names = {FRAME_NAME}
+        self.referenced: Set[str] = set()
+
+    def _climb(self, node: ast.AST) -> ast.AST:
+        """沿着保持列集合不变的行操作向上，返回最外层的表达式"""
+        while True:
+            parent = self.parents.get(node)
+            if isinstance(parent, ast.Subscript) and parent.value is node and _is_row_mask(parent.slice):
+                node = parent
+                continue
+            if isinstance(parent, ast.Attribute) and parent.value is node:
+                call = self.parents.get(parent)
+                if isinstance(call, ast.Call) and call.func is parent:
+                    if parent.attr in ROW_METHODS or (parent.attr in SUBSET_METHODS and _has_keyword(call, 'subset')):
+                        node = call
+                        continue
+                if parent.attr == 'loc':
+                    subscript = self.parents.get(parent)
+                    if isinstance(subscript, ast.Subscript) and not isinstance(subscript.slice, ast.Tuple):
+                        node = subscript
+                        continue
+            return node
+
+    def _consumed_safely(self, node: ast.AST) -> bool:
+        parent = self.parents.get(node)
+
+        if isinstance(parent, ast.Subscript) and parent.value is node:
+            keys = _constant_strings(parent.slice)
+            if keys is not None:
+                self.referenced.update(keys)
+                return True
+            return False
+
+        if isinstance(parent, ast.Attribute) and parent.value is node:
+            if parent.attr in self.columns:
+                self.referenced.add(parent.attr)
+                return True
+            if parent.attr == 'index':
+                return True
+            grandparent = self.parents.get(parent)
+            if parent.attr == 'loc' and isinstance(grandparent, ast.Subscript):
+                # df.loc[行条件, 列]
+                keys = _constant_strings(grandparent.slice.elts[-1]) if isinstance(grandparent.slice, ast.Tuple) else None
+                if keys is not None:
+                    self.referenced.update(keys)
+                    return True
+                return False
+            if parent.attr == 'groupby' and isinstance(grandparent, ast.Call):
+                # df.groupby(...)[列]
+                selection = self.parents.get(grandparent)
+                if isinstance(selection, ast.Subscript) and selection.value is grandparent:
+                    keys = _constant_strings(selection.slice)
+                    if keys is not None:
+                        self.referenced.update(keys)
+                        return True
+            return False
+
+        if isinstance(parent, ast.keyword) and parent.arg == 'data':
+            call = self.parents.get(parent)
+            return any(_has_keyword(call, name) for name in _AXIS_KEYWORDS)
+
+        if isinstance(parent, ast.Call) and node in parent.args:
+            func = parent.func
+            if isinstance(func, ast.Name) and func.id == 'len':
+                return True
+            # sns.scatterplot(df, x='a', y='b')
+            return parent.args[0] is node and any(_has_keyword(parent, name) for name in _AXIS_KEYWORDS)
+
+        if isinstance(parent, ast.Assign) and parent.value is node:
+            # 行筛选后的表赋给新名称，后续对该名称的使用同样需要检查
+            if all(isinstance(target, ast.Name) for target in parent.targets):
+                self.names.update(target.id for target in parent.targets)
+                return True
+        return False
+
+    def check(self, tree: ast.AST) -> bool:
+        checked = set()
+        while True:
+            pending = [
+                node for node in ast.walk(tree)
+                if isinstance(node, ast.Name) and node.id in self.names
+                and isinstance(node.ctx, ast.Load) and node not in checked
+            ]
+            if not pending:
+                return True
+            for node in pending:
+                checked.add(node)
+                if not self._consumed_safely(self._climb(node)):
+                    return False
+
+
+def referenced_columns(code: str, columns: Sequence) -> Optional[List]:
+    """返回代码引用的列（按原始列顺序），无法静态确定时返回 None
+
+    代码中所有与列名相同的字符串常量都视为引用（覆盖 x='a'、groupby('a') 等写法），
+    列名为非字符串（如无表头文件的整数列名）时不裁剪。
+    """
+    if not columns or not all(isinstance(col, str) for col in columns):
+        return None
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    available = set(columns)
+    usage = _FrameUsage(tree, available)
+    if not usage.check(tree):
+        return None
+
+    referenced = set(usage.referenced)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value in available:
+            referenced.add(node.value)
+    if not referenced & available:
+        return None
+    return [col for col in columns if col in referenced]
+
@@ -0,0 +1,136 @@
+"""压缩文件与归档读取模块
+
+识别 .csv.gz、.json.zst 等复合后缀，以流的方式边解压边交给解析器，不落地临时文件。
+tar 归档中的成员用虚拟路径 "归档路径::成员路径" 表示，例如 exports.tar::2024/sales.parquet。
+Excel 工作表用 "工作簿路径#工作表名" 表示，例如 report.xlsx#销售，两者可以组合。
+zstd 需要安装可选依赖 zstandard。
+"""
+import bz2
+import gzip
+import lzma
+import os
+import re
+import tarfile
+from contextlib import contextmanager
+from typing import IO, Iterator, List, Optional, Sequence, Tuple, Union
+
+COMPRESSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+ARCHIVE_SUFFIXES = ['.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz']
+MEMBER_SEPARATOR = '::'
+SHEET_SEPARATOR = '#'
+_SHEET_PATH_PATTERN = re.compile(r'^(.*?\.(?:xlsx|xls)(?:\.\w+)?)#(.+)$', re.IGNORECASE | re.DOTALL)
+
+
+def split_sheet(path: str) -> Tuple[str, Optional[str]]:
+    """拆分工作表路径，返回 (工作簿路径, 工作表名)，非工作表路径的工作表名为 None"""
+    match = _SHEET_PATH_PATTERN.match(path)
+    if match:
+        return match.group(1), match.group(2)
+    return path, None
+
+
+def split_member(path: str) -> Tuple[str, Optional[str]]:
+    """拆分虚拟路径，返回 (磁盘上的文件, 归档成员)，普通路径的成员为 None"""
+    path = split_sheet(path)[0]
+    if MEMBER_SEPARATOR in path:
+        archive, member = path.split(MEMBER_SEPARATOR, 1)
+        return archive, member
+    return path, None
+
+
+def physical_path(path: str) -> str:
+    """虚拟路径对应的磁盘文件，用于 stat 和缓存键"""
+    return split_member(path)[0]
+
+
+def is_archive(path: str) -> bool:
+    return MEMBER_SEPARATOR not in path and path.lower().endswith(tuple(ARCHIVE_SUFFIXES))
+
+
+def data_suffix(path: str) -> Tuple[str, Optional[str]]:
+    """返回 (数据格式后缀, 压缩格式)，如 'a.csv.gz' -> ('.csv', 'gzip')，工作表取工作簿的后缀"""
+    archive, member = split_member(path)
+    name = os.path.basename(member or archive).lower()
+    compression = None
+    for suffix, kind in COMPRESSIONS.items():
+        if name.endswith(suffix):
+            compression = kind
+            name = name[:-len(suffix)]
+            break
+    return os.path.splitext(name)[1], compression
+
+
+def is_plain(path: str) -> bool:
+    """磁盘上的未压缩文件，可以直接交给解析器按路径读取"""
+    return split_sheet(path)[1] is None and split_member(path)[1] is None and data_suffix(path)[1] is None
+
+
+def compound_suffixes(suffixes: Sequence[str]) -> List[str]:
+    """数据格式后缀与压缩后缀的全部组合，另加归档后缀，供目录扫描使用"""
+    compound = [suffix + compressed for suffix in suffixes for compressed in COMPRESSIONS]
+    return list(suffixes) + compound + ARCHIVE_SUFFIXES
+
+
+def _decompress(raw: IO[bytes], compression: Optional[str]) -> IO[bytes]:
+    if compression is None:
+        return raw
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw)
+    if compression == 'bz2':
+        return bz2.BZ2File(raw)
+    if compression == 'xz':
+        return lzma.LZMAFile(raw)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("读取 .zst 文件需要安装 zstandard: pip install zstandard")
+    return zstandard.ZstdDecompressor().stream_reader(raw)
+
+
+@contextmanager
+def open_source(path: str) -> Iterator[Union[str, IO[bytes]]]:
+    """打开数据源
+
+    未压缩的普通文件直接返回路径，使 pandas/pyarrow 使用各自最快的按路径读取方式；
+    压缩文件和归档成员返回边读边解压的二进制流。工作表路径打开其所在的工作簿。
+    """
+    path = split_sheet(path)[0]
+    if is_plain(path):
+        yield path
+        return
+
+    archive, member = split_member(path)
+    compression = data_suffix(path)[1]
+    with open(archive, 'rb') if member is None else tarfile.open(archive, 'r:*') as container:
+        if member is None:
+            raw = container
+        else:
+            raw = container.extractfile(member)
+            if raw is None:
+                raise FileNotFoundError(f"归档中不存在文件: {path}")
+        stream = _decompress(raw, compression)
+        try:
+            yield stream
+        finally:
+            if stream is not raw:
+                stream.close()
+
+
+def read_head(path: str, size: int) -> bytes:
+    """读取数据源（解压后）开头的 size 个字节"""
+    with open_source(path) as source:
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                return f.read(size)
+        return source.read(size)
+
+
+def list_archive_members(archive: str, suffixes: Sequence[str]) -> List[str]:
+    """列出归档中后缀受支持的文件，返回虚拟路径"""
+    lowered = tuple(suffix.lower() for suffix in suffixes)
+    with tarfile.open(archive, 'r:*') as tar:
+        return [
+            f"{archive}{MEMBER_SEPARATOR}{info.name}"
+            for info in tar.getmembers()
+            if info.isfile() and info.name.lower().endswith(lowered)
+        ]
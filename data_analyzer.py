@@ -1,68 +1,296 @@
+import hashlib
+import io
+import os
+import tarfile
+import warnings
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Any, Union
+from typing import Dict, List, Any, Union, Optional, Iterator
+
+from .process_runner import run_in_processes
+from .streaming_stats import DataFrameProfiler
+from .dialect_sniffer import sniff_file, read_csv_kwargs
+from .analysis_cache import AnalysisCache, DEFAULT_CACHE_MAX_BYTES
+from .directory_scanner import DirectoryScanner
+from .sketches import CategoricalSketch, QuantileSketch, numeric_quantile_result, sketch_seed
+from . import arrow_engine
+from .arrow_engine import ENGINES, JSON_LINES_SUFFIXES
+from .compressed_io import (
+    compound_suffixes, data_suffix, is_archive, is_plain, list_archive_members,
+    open_source, physical_path, ARCHIVE_SUFFIXES
+)
+from .excel_reader import EXCEL_SUFFIXES, is_workbook, iter_sheet, list_sheets, read_sheet
+from .parquet_dataset import dataset_signature, group_partitioned, open_dataset, profile_dataset, read_dataset
+
+DEFAULT_CHUNKSIZE = 100_000
+# 统计时每个列块的最大单元格数
+STATS_BLOCK_CELLS = 5_000_000
+# 近似模式下每次送入草图的行数
+SKETCH_SLICE_ROWS = 1_000_000
+# 判断文件是否只追加时比对的末尾字节数
+APPEND_CHECK_BYTES = 4096
 
 
 class DataAnalyzer:
-    def __init__(self):
-        self.supported_formats = ['.csv', '.xlsx', '.xls', '.json', '.parquet', '.txt']
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        cache_hash_content: bool = False,
+        approximate: bool = False,
+        scan_include: Optional[List[str]] = None,
+        scan_exclude: Optional[List[str]] = None,
+        scan_max_depth: Optional[int] = None,
+        scan_manifest: Optional[str] = None,
+        compact: bool = False,
+        category_threshold: float = 0.5,
+        arrow_strings: bool = False,
+        engine: str = 'pandas',
+        arrow_dtypes: bool = False,
+        partitioned_datasets: bool = True
+    ):
+        """
+        Args:
+            cache_dir: 分析结果缓存目录，为None时不启用缓存
+            cache_max_bytes: 缓存总大小上限，超出后按LRU淘汰
+            cache_hash_content: 缓存键是否包含文件内容哈希（更可靠但需完整读取文件）
+            approximate: 近似统计模式，唯一值数、高频值和中位数/分位数改用草图估计，
+                并在统计结果的 error_bounds 中给出误差界
+            scan_include: 扫描目录时只收集匹配这些 glob 的文件
+            scan_exclude: 扫描目录时跳过的目录/文件 glob，默认跳过 .git、__pycache__ 等
+            scan_max_depth: 扫描目录的最大深度
+            scan_manifest: 扫描清单文件，再次扫描时跳过修改时间未变的目录
+            compact: 读取后压缩内存（数值降精度、低基数字符串转category）
+            category_threshold: 唯一值占比低于该值的字符串列转为category
+            arrow_strings: 压缩时其余字符串列使用Arrow字符串类型
+            engine: 文本数据读取引擎，'pandas' 或 'pyarrow'（多线程解析 CSV 和 JSON Lines）
+            arrow_dtypes: 保留 Arrow 数据类型（pd.ArrowDtype），不转换为 numpy 类型
+            partitioned_datasets: 扫描目录时把 Hive 分区目录（year=2024/month=05/...）中的
+                Parquet 文件合并为一个数据集
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"不支持的读取引擎: {engine}，可选: {', '.join(ENGINES)}")
+        self.supported_formats = ['.csv', '.xlsx', '.xls', '.json', '.jsonl', '.ndjson', '.parquet', '.txt']
+        # 扫描目录时还需识别压缩文件（如 .csv.gz）和 tar 归档
+        self.scan_suffixes = compound_suffixes(self.supported_formats)
+        self.cache = AnalysisCache(cache_dir, cache_max_bytes, cache_hash_content) if cache_dir else None
+        self.approximate = approximate
+        self.compact = compact
+        self.category_threshold = category_threshold
+        self.arrow_strings = arrow_strings
+        self.engine = engine
+        self.arrow_dtypes = arrow_dtypes
+        self.partitioned_datasets = partitioned_datasets
+        self.scanner = DirectoryScanner(
+            self.scan_suffixes,
+            include=scan_include,
+            exclude=scan_exclude,
+            max_depth=scan_max_depth,
+            manifest_path=scan_manifest
+        )
     
     def scan_directory(self, directory: str) -> List[str]:
-        """扫描目录下所有支持的数据文件"""
-        dir_path = Path(directory)
-        if not dir_path.is_dir():
-            return []
+        """扫描目录下所有支持的数据文件（单次遍历，遵循包含/排除规则）
         
-        files = []
-        for ext in self.supported_formats:
-            files.extend([str(f) for f in dir_path.rglob(f'*{ext}')])
-        return sorted(files)
+        tar 归档展开为其中的数据文件，Excel 工作簿展开为各个工作表，分区数据集合并为数据集根目录。
+        """
+        resolved = []
+        for file_path in self.scanner.scan(directory):
+            resolved.extend(self._expand_containers(file_path))
+        if self.partitioned_datasets:
+            resolved = group_partitioned(resolved, directory)
+        return resolved
+    
+    def _expand_containers(self, file_path: str) -> List[str]:
+        if not is_archive(file_path):
+            return self._expand_workbook(file_path)
+        member_suffixes = [s for s in self.scan_suffixes if s not in ARCHIVE_SUFFIXES]
+        try:
+            members = list_archive_members(file_path, member_suffixes)
+        except (OSError, EOFError, tarfile.TarError) as e:
+            warnings.warn(f"无法读取归档 {file_path}: {e}")
+            return []
+        return [path for member in members for path in self._expand_workbook(member)]
+    
+    def _expand_workbook(self, file_path: str) -> List[str]:
+        """工作簿展开为各个工作表路径，无法读取工作表列表时保留原路径，由读取时报告错误"""
+        if not is_workbook(file_path):
+            return [file_path]
+        try:
+            return list_sheets(file_path)
+        except Exception as e:
+            warnings.warn(f"无法读取工作簿 {file_path}: {e}")
+            return [file_path]
     
     def resolve_paths(self, paths: List[str]) -> List[str]:
-        """解析路径，支持文件和文件夹混合输入"""
+        """解析路径，支持文件、文件夹、分区数据集、归档成员（归档::成员）和工作表（工作簿#工作表）混合输入"""
         resolved = []
         for path_str in paths:
             path = Path(path_str)
             if path.is_dir():
                 resolved.extend(self.scan_directory(path_str))
             elif path.is_file():
-                resolved.append(str(path))
+                resolved.extend(self._expand_containers(str(path)))
+            elif physical_path(path_str) != path_str and os.path.isfile(physical_path(path_str)):
+                resolved.append(path_str)
         return resolved
     
-    def read_data(self, file_path: str) -> pd.DataFrame:
-        path = Path(file_path)
-        if not path.exists():
+    def read_data(self, file_path: str, columns: Optional[List] = None, filter=None) -> pd.DataFrame:
+        """读取数据文件，启用 compact 时对结果做内存压缩
+        
+        columns 不为None时只读取这些列（CSV 使用 usecols，Parquet 使用列投影）。
+        filter 为分区数据集的 pyarrow 过滤表达式，用于跳过无关的分区文件和行组。
+        """
+        if os.path.isdir(file_path):
+            df = read_dataset(file_path, columns, filter, self.arrow_dtypes)
+        else:
+            df = self._read_file(file_path, columns)
+        if self.compact:
+            df = self.compact_dataframe(df)
+        return df
+    
+    def _check_source(self, file_path: str) -> str:
+        """检查数据源是否存在，返回数据格式后缀（压缩文件取解压后的后缀）"""
+        if not os.path.exists(physical_path(file_path)):
             raise FileNotFoundError(f"文件不存在: {file_path}")
+        return data_suffix(file_path)[0]
+    
+    def _read_file(self, file_path: str, columns: Optional[List] = None) -> pd.DataFrame:
+        suffix = self._check_source(file_path)
+        if suffix not in self.supported_formats:
+            raise ValueError(f"不支持的文件格式: {suffix}")
         
-        suffix = path.suffix.lower()
+        if suffix in EXCEL_SUFFIXES:
+            return read_sheet(file_path, columns)
+        
+        dialect = self.sniff_dialect(file_path) if suffix in ['.csv', '.txt'] else None
+        json_lines = suffix in JSON_LINES_SUFFIXES or (
+            suffix == '.json' and self.engine == 'pyarrow' and arrow_engine.is_json_lines(file_path)
+        )
+        
+        # 压缩文件和归档成员以流的方式边解压边解析
+        with open_source(file_path) as source:
+            if dialect is not None:
+                if self.engine == 'pyarrow' and arrow_engine.supports_dialect(dialect):
+                    df = arrow_engine.read_csv(source, dialect, columns, self.arrow_dtypes)
+                else:
+                    df = pd.read_csv(source, usecols=columns, **read_csv_kwargs(dialect))
+                df.attrs['dialect'] = dialect
+                return df
+            elif json_lines:
+                if self.engine == 'pyarrow':
+                    return arrow_engine.read_json_lines(source, columns, self.arrow_dtypes)
+                df = pd.read_json(source, lines=True)
+                return df if columns is None else df[list(columns)]
+            elif suffix == '.json':
+                df = pd.read_json(source)
+                return df if columns is None else df[list(columns)]
+            else:
+                if self.arrow_dtypes:
+                    return pd.read_parquet(source, columns=columns, dtype_backend='pyarrow')
+                return pd.read_parquet(source, columns=columns)
+    
+    def compact_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """压缩DataFrame内存占用
         
-        if suffix == '.csv':
+        - 整数列降为能容纳取值范围的最小整数类型
+        - 浮点列在不损失精度时降为 float32
+        - 唯一值比例低于 category_threshold 的字符串列转为 category
+        - 启用 arrow_strings 时其余字符串列转为 Arrow 字符串类型
+        
+        压缩前后的内存字节数记录在 df.attrs['memory']。
+        """
+        before = int(df.memory_usage(deep=True).sum())
+        attrs = dict(df.attrs)
+        columns = {}
+        for i, (col, dtype) in enumerate(df.dtypes.items()):
+            series = df.iloc[:, i]
             try:
-                return pd.read_csv(file_path)
-            except:
-                try:
-                    return pd.read_csv(file_path, sep='\t')
-                except:
-                    return pd.read_csv(file_path, sep=';')
-        elif suffix in ['.xlsx', '.xls']:
-            return pd.read_excel(file_path)
-        elif suffix == '.json':
-            return pd.read_json(file_path)
+                if pd.api.types.is_bool_dtype(dtype):
+                    pass
+                elif pd.api.types.is_integer_dtype(dtype):
+                    downcast = 'unsigned' if len(series) and series.min() >= 0 else 'integer'
+                    columns[i] = pd.to_numeric(series, downcast=downcast)
+                elif pd.api.types.is_float_dtype(dtype) and dtype == np.float64:
+                    narrowed = series.astype(np.float32)
+                    if np.array_equal(narrowed.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+                        columns[i] = narrowed
+                elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+                    if len(series) and series.nunique() / len(series) < self.category_threshold:
+                        columns[i] = series.astype('category')
+                    elif self.arrow_strings:
+                        columns[i] = series.astype(pd.StringDtype('pyarrow'))
+            except (TypeError, ValueError, OverflowError, ImportError):
+                # 混合类型等无法转换的列保持原样（Arrow转换错误同样继承自这些异常）
+                continue
+        
+        if columns:
+            df = df.copy(deep=False)
+            for i, series in columns.items():
+                df.isetitem(i, series)
+        df.attrs = attrs
+        df.attrs['memory'] = {'before': before, 'after': int(df.memory_usage(deep=True).sum())}
+        return df
+    
+    def sniff_dialect(self, file_path: str) -> Dict[str, Any]:
+        """探测文本表格的编码、分隔符、表头和小数点，.txt 默认按制表符分隔"""
+        default_sep = '\t' if data_suffix(file_path)[0] == '.txt' else ','
+        return sniff_file(file_path, default_sep)
+    
+    def read_data_chunks(self, file_path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+        """按块读取数据，CSV/TXT/JSON Lines/Parquet/.xlsx 逐块读取，其余格式整体读取后作为单块返回
+        
+        压缩文件边解压边解析，内存中只有当前数据块。
+        """
+        suffix = self._check_source(file_path)
+        
+        if os.path.isdir(file_path):
+            for batch in open_dataset(file_path).to_batches(batch_size=chunksize):
+                yield batch.to_pandas(types_mapper=pd.ArrowDtype) if self.arrow_dtypes else batch.to_pandas()
+        elif suffix in ['.csv', '.txt']:
+            dialect = self.sniff_dialect(file_path)
+            with open_source(file_path) as source:
+                with pd.read_csv(source, chunksize=chunksize, **read_csv_kwargs(dialect)) as reader:
+                    for chunk in reader:
+                        chunk.attrs['dialect'] = dialect
+                        yield chunk
+        elif suffix in EXCEL_SUFFIXES:
+            yield from iter_sheet(file_path, chunksize)
+        elif suffix in JSON_LINES_SUFFIXES:
+            with open_source(file_path) as source:
+                if self.engine == 'pyarrow':
+                    yield from arrow_engine.iter_json_lines(source, self.arrow_dtypes)
+                else:
+                    with pd.read_json(source, lines=True, chunksize=chunksize) as reader:
+                        yield from reader
         elif suffix == '.parquet':
-            return pd.read_parquet(file_path)
-        elif suffix == '.txt':
-            try:
-                return pd.read_csv(file_path, sep='\t')
-            except:
-                try:
-                    return pd.read_csv(file_path, sep=',')
-                except:
-                    return pd.read_csv(file_path, sep='\s+')
+            import pyarrow.parquet as pq
+            with open_source(file_path) as source:
+                parquet_file = pq.ParquetFile(source)
+                for batch in parquet_file.iter_batches(batch_size=chunksize):
+                    yield batch.to_pandas(types_mapper=pd.ArrowDtype) if self.arrow_dtypes else batch.to_pandas()
         else:
-            raise ValueError(f"不支持的文件格式: {suffix}")
+            yield self.read_data(file_path)
+    
+    def analyze_file_streaming(self, file_path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Dict[str, Any]:
+        """单遍流式分析文件，内存中只保留当前数据块和增量统计"""
+        profiler = DataFrameProfiler(self.approximate)
+        read_info = {}
+        for chunk in self.read_data_chunks(file_path, chunksize):
+            profiler.update(chunk)
+            read_info = chunk.attrs
+        return self._attach_read_info(profiler.result(), read_info)
+    
+    def _attach_read_info(self, analysis: Dict[str, Any], read_info: Dict[str, Any]) -> Dict[str, Any]:
+        """把读取阶段记录在 DataFrame.attrs 中的信息（如探测到的格式）写入分析结果"""
+        for key in ('dialect', 'memory'):
+            if key in read_info:
+                analysis[key] = read_info[key]
+        return analysis
     
     def analyze_dataframe(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """分析DataFrame：数值列在二维数组上向量化统计，分类列批量计数"""
         analysis = {
             'shape': df.shape,
             'columns': list(df.columns),
@@ -72,66 +300,384 @@ class DataAnalyzer:
             'categorical_columns': [],
             'datetime_columns': [],
             'statistics': {},
-            'sample_data': df.head(3).to_dict('records')
+            'sample_data': self._sample_records(df)
         }
         
-        for col in df.columns:
-            if pd.api.types.is_numeric_dtype(df[col]):
+        numeric_idx, categorical_idx = [], []
+        for i, (col, dtype) in enumerate(df.dtypes.items()):
+            if pd.api.types.is_numeric_dtype(dtype):
                 analysis['numeric_columns'].append(col)
-                analysis['statistics'][col] = {
-                    'mean': float(df[col].mean()) if not df[col].isna().all() else None,
-                    'std': float(df[col].std()) if not df[col].isna().all() else None,
-                    'min': float(df[col].min()) if not df[col].isna().all() else None,
-                    'max': float(df[col].max()) if not df[col].isna().all() else None,
-                    'median': float(df[col].median()) if not df[col].isna().all() else None
-                }
-            elif pd.api.types.is_datetime64_any_dtype(df[col]):
+                numeric_idx.append(i)
+            elif pd.api.types.is_datetime64_any_dtype(dtype):
                 analysis['datetime_columns'].append(col)
             else:
                 analysis['categorical_columns'].append(col)
-                unique_count = df[col].nunique()
-                analysis['statistics'][col] = {
-                    'unique_count': int(unique_count),
-                    'top_values': df[col].value_counts().head(5).to_dict()
-                }
+                categorical_idx.append(i)
+        
+        statistics = {}
+        if self.approximate:
+            statistics.update(self._numeric_statistics(df, numeric_idx, with_median=False))
+            self._add_approximate_quantiles(df, numeric_idx, statistics)
+            statistics.update(self._approximate_categorical_statistics(df, categorical_idx))
+        else:
+            statistics.update(self._numeric_statistics(df, numeric_idx))
+            statistics.update(self._categorical_statistics(df, categorical_idx))
+        analysis['statistics'] = {col: statistics[col] for col in df.columns if col in statistics}
         
         return analysis
     
-    def analyze_multiple_files(self, file_paths: List[str]) -> Dict[str, Dict[str, Any]]:
-        results = {}
-        for file_path in file_paths:
-            try:
-                df = self.read_data(file_path)
-                analysis = self.analyze_dataframe(df)
-                results[file_path] = {
-                    'success': True,
-                    'data': df,
-                    'analysis': analysis
+    def _sample_records(self, df: pd.DataFrame, n: int = 3) -> List[Dict[str, Any]]:
+        """取前n行样例，直接从二维数组构造，避免宽表上逐列装箱；缺失值（NaN、NaT、pd.NA）统一为None"""
+        head = df.head(n).astype(object)
+        head = head.where(head.notna(), None)
+        return [dict(zip(head.columns, row)) for row in head.to_numpy().tolist()]
+    
+    def _column_blocks(self, indices: List[int], n_rows: int) -> Iterator[List[int]]:
+        """按单元格数量把列切分成块，限制宽表转换为二维数组时的峰值内存"""
+        block_size = max(1, STATS_BLOCK_CELLS // max(n_rows, 1))
+        for start in range(0, len(indices), block_size):
+            yield indices[start:start + block_size]
+    
+    def _numeric_statistics(
+        self,
+        df: pd.DataFrame,
+        indices: List[int],
+        with_median: bool = True
+    ) -> Dict[Any, Dict[str, Any]]:
+        """在数值列组成的二维数组上一次性计算均值、标准差、最值和中位数"""
+        statistics = {}
+        if len(df) == 0:
+            empty = dict.fromkeys(['mean', 'std', 'min', 'max', 'median'])
+            return {df.columns[i]: dict(empty) for i in indices}
+        for block in self._column_blocks(indices, len(df)):
+            values = df.iloc[:, block].to_numpy(dtype=float, na_value=np.nan)
+            with warnings.catch_warnings():
+                # 全空列和单值列会触发 RuntimeWarning，结果按原逻辑处理
+                warnings.simplefilter('ignore', RuntimeWarning)
+                counts = np.count_nonzero(~np.isnan(values), axis=0)
+                block_stats = {
+                    'mean': np.nanmean(values, axis=0),
+                    'std': np.nanstd(values, axis=0, ddof=1),
+                    'min': np.nanmin(values, axis=0),
+                    'max': np.nanmax(values, axis=0),
+                    'median': self._column_medians(values, counts) if with_median else np.full(len(block), np.nan)
                 }
-            except Exception as e:
-                results[file_path] = {
+            for j, col in enumerate(df.columns[block]):
+                statistics[col] = {
+                    name: float(stat[j]) if counts[j] > 0 else None
+                    for name, stat in block_stats.items()
+                }
+        return statistics
+    
+    def _column_medians(self, values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """按列排序（NaN排在末尾）后按有效值个数取中位数，避免 nanmedian 的逐列回退"""
+        ordered = np.sort(values, axis=0)
+        lower = np.clip((counts - 1) // 2, 0, None)
+        upper = np.clip(counts // 2, 0, None)
+        low_values = np.take_along_axis(ordered, lower[None, :], axis=0)[0]
+        high_values = np.take_along_axis(ordered, upper[None, :], axis=0)[0]
+        return (low_values + high_values) / 2
+    
+    def _row_slices(self, df: pd.DataFrame, position: int) -> Iterator[pd.Series]:
+        """按行切片返回某一列，限制草图更新时的临时内存"""
+        for start in range(0, len(df), SKETCH_SLICE_ROWS):
+            yield df.iloc[start:start + SKETCH_SLICE_ROWS, position]
+    
+    def _add_approximate_quantiles(self, df: pd.DataFrame, indices: List[int], statistics: Dict[Any, Dict[str, Any]]):
+        """用分位数草图估计中位数和分位数，替代精确排序"""
+        for i in indices:
+            col = df.columns[i]
+            if statistics[col]['mean'] is None:
+                continue
+            sketch = QuantileSketch(seed=sketch_seed(col))
+            for series in self._row_slices(df, i):
+                sketch.update(series.to_numpy(dtype=float, na_value=np.nan))
+            statistics[col].update(numeric_quantile_result(sketch))
+    
+    def _approximate_categorical_statistics(self, df: pd.DataFrame, indices: List[int]) -> Dict[Any, Dict[str, Any]]:
+        """用 HyperLogLog 估计唯一值数，用 Misra-Gries 摘要估计高频值"""
+        statistics = {}
+        for i in indices:
+            sketch = CategoricalSketch()
+            for series in self._row_slices(df, i):
+                sketch.update(series)
+            statistics[df.columns[i]] = sketch.result()
+        return statistics
+    
+    def _categorical_statistics(self, df: pd.DataFrame, indices: List[int]) -> Dict[Any, Dict[str, Any]]:
+        """对分类列逐列编码，一次排序得到每列的唯一值数量和前5高频值
+        
+        各列单独编码再按偏移合并编码，相等但类型不同的值（如 1 与 True）不会在不同列之间混用。
+        """
+        statistics = {}
+        n_rows = len(df)
+        for block in self._column_blocks(indices, n_rows):
+            values = df.iloc[:, block].to_numpy(dtype=object)
+            n_cols = len(block)
+            column_codes, column_uniques, offset = [], [], 0
+            for j in range(n_cols):
+                codes, uniques = pd.factorize(values[:, j])
+                column_codes.append(np.where(codes >= 0, codes + offset, -1))
+                column_uniques.append(np.asarray(uniques, dtype=object))
+                offset += len(uniques)
+            codes = np.concatenate(column_codes)
+            uniques = np.concatenate(column_uniques)
+            col_ids = np.repeat(np.arange(n_cols), n_rows)
+            valid = codes >= 0
+            n_uniques = max(len(uniques), 1)
+            keys, key_counts = np.unique(col_ids[valid] * n_uniques + codes[valid], return_counts=True)
+            key_cols = keys // n_uniques
+            key_codes = keys % n_uniques
+            
+            # 按 (列, 频次降序, 首次出现顺序) 排序后，每列的前5项即为高频值
+            order = np.lexsort((key_codes, -key_counts, key_cols))
+            unique_counts = np.bincount(key_cols, minlength=n_cols)
+            starts = np.concatenate(([0], np.cumsum(unique_counts)[:-1]))
+            
+            for j, col in enumerate(df.columns[block]):
+                top = order[starts[j]:starts[j] + min(5, unique_counts[j])]
+                statistics[col] = {
+                    'unique_count': int(unique_counts[j]),
+                    'top_values': {uniques[key_codes[k]]: int(key_counts[k]) for k in top}
+                }
+        return statistics
+    
+    def analyze_file(
+        self,
+        file_path: str,
+        streaming: bool = False,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        keep_data: bool = True
+    ) -> Dict[str, Any]:
+        """读取并分析单个文件，返回 {success, data, analysis} 结构
+        
+        streaming=True 时按块分析，不保留完整数据，data 为 None。
+        keep_data=False 时只返回分析结果，data 为 None（缓存命中时也不读取数据副本）。
+        启用缓存时，文件未变化则直接返回缓存结果（cached=True）。
+        分区数据集只由 Parquet 元数据生成分析结果，data 为 None，数据在使用时按需读取。
+        """
+        need_data = keep_data and not streaming
+        try:
+            if os.path.isdir(file_path):
+                return {'success': True, 'data': None, 'analysis': profile_dataset(file_path)}
+            
+            if self.cache is not None:
+                cached = self.cache.get(file_path, with_data=need_data)
+                if cached is not None and (not need_data or cached['data'] is not None):
+                    return {
+                        'success': True,
+                        'data': cached['data'],
+                        'analysis': cached['analysis'],
+                        'cached': True
+                    }
+            
+            if streaming:
+                df = None
+                analysis = self.analyze_file_streaming(file_path, chunksize)
+            else:
+                df = self.read_data(file_path)
+                analysis = self._attach_read_info(self.analyze_dataframe(df), df.attrs)
+            
+            if self.cache is not None:
+                self.cache.put(file_path, analysis, df)
+            return {
+                'success': True,
+                'data': df if keep_data else None,
+                'analysis': analysis
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def file_state(self, file_path: str) -> Dict[str, Any]:
+        """记录文件大小、修改时间和末尾字节的哈希，用于判断之后的修改是否只是追加"""
+        if os.path.isdir(file_path):
+            size, mtime_ns = dataset_signature(file_path)
+            return {'size': size, 'mtime_ns': mtime_ns, 'tail_hash': None, 'ends_with_newline': False}
+        stat = os.stat(physical_path(file_path))
+        if not is_plain(file_path):
+            return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'tail_hash': None, 'ends_with_newline': False}
+        with open(file_path, 'rb') as f:
+            f.seek(max(stat.st_size - APPEND_CHECK_BYTES, 0))
+            tail = f.read(APPEND_CHECK_BYTES)
+        return {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'tail_hash': hashlib.blake2b(tail, digest_size=16).hexdigest(),
+            'ends_with_newline': tail.endswith(b'\n')
+        }
+    
+    def _is_append(self, file_path: str, previous: Dict[str, Any]) -> bool:
+        """文件变大、原有内容末尾未变且原内容以完整行结束时视为只追加"""
+        if not previous['ends_with_newline']:
+            return False
+        if os.path.getsize(file_path) <= previous['size']:
+            return False
+        with open(file_path, 'rb') as f:
+            f.seek(max(previous['size'] - APPEND_CHECK_BYTES, 0))
+            tail = f.read(min(previous['size'], APPEND_CHECK_BYTES))
+            f.seek(-1, os.SEEK_END)
+            ends_with_newline = f.read(1) == b'\n'
+        return ends_with_newline and hashlib.blake2b(tail, digest_size=16).hexdigest() == previous['tail_hash']
+    
+    def read_appended(self, file_path: str, offset: int, df: pd.DataFrame) -> pd.DataFrame:
+        """按 df 的格式解析文件从 offset 开始追加的行，并与 df 拼接"""
+        dialect = df.attrs['dialect']
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        kwargs = read_csv_kwargs(dialect)
+        kwargs['header'] = None
+        tail = pd.read_csv(io.BytesIO(data), names=list(df.columns), **kwargs)
+        combined = pd.concat([df, tail], ignore_index=True)
+        combined.attrs = {'dialect': dialect}
+        if self.compact:
+            combined = self.compact_dataframe(combined)
+        return combined
+    
+    def reload_file(
+        self,
+        file_path: str,
+        previous: Optional[Dict[str, Any]] = None,
+        df: Optional[pd.DataFrame] = None,
+        **options
+    ) -> Dict[str, Any]:
+        """重新分析发生变化的文件
+        
+        previous 为变化前的 file_state。对只追加的 CSV/TXT，若 df 是变化前完整读取的数据，
+        只解析新增的行（结果中 appended_rows 为新增行数），否则按 options 调用 analyze_file。
+        """
+        try:
+            appendable = (
+                previous is not None
+                and df is not None
+                and 'dialect' in df.attrs
+                and not df.attrs['dialect']['encoding'].startswith('utf-16')
+                and self._is_append(file_path, previous)
+            )
+        except OSError as e:
+            return {'success': False, 'error': str(e)}
+        if not appendable:
+            return self.analyze_file(file_path, **options)
+        
+        try:
+            combined = self.read_appended(file_path, previous['size'], df)
+            analysis = self._attach_read_info(self.analyze_dataframe(combined), combined.attrs)
+            if self.cache is not None:
+                self.cache.put(file_path, analysis, combined)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+        return {
+            'success': True,
+            'data': combined,
+            'analysis': analysis,
+            'appended_rows': len(combined) - len(df)
+        }
+    
+    def materialize(self, file_path: str, columns: Optional[List] = None, filter=None) -> pd.DataFrame:
+        """获取完整数据（或 columns 指定的列），优先使用缓存中的列式副本
+        
+        filter 只对分区数据集有效，筛选后的数据不经过缓存。
+        """
+        if filter is not None:
+            return self.read_data(file_path, columns, filter)
+        if self.cache is not None and not os.path.isdir(file_path):
+            cached = self.cache.get(file_path, with_data=True, columns=columns)
+            if cached is not None and cached['data'] is not None:
+                return cached['data']
+        return self.read_data(file_path, columns)
+    
+    def analyze_multiple_files(
+        self,
+        file_paths: List[str],
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        streaming: bool = False,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        keep_data: bool = True
+    ) -> Dict[str, Dict[str, Any]]:
+        """批量读取并分析文件
+        
+        parallel=True 时每个文件在独立子进程中处理，max_workers 控制并发数
+        （默认CPU核数），timeout 为单个文件的超时秒数。超时或崩溃的文件
+        记为失败，不影响同批次的其他文件。结果按输入顺序返回。
+        
+        streaming=True 时按 chunksize 行分块单遍统计，结果中的 data 为 None。
+        keep_data=False 时只返回分析结果，并行模式下也不会把数据传回主进程。
+        """
+        if not parallel:
+            return {
+                file_path: self.analyze_file(file_path, streaming, chunksize, keep_data)
+                for file_path in file_paths
+            }
+        
+        results = {file_path: None for file_path in file_paths}
+        tasks = [(file_path, streaming, chunksize, keep_data) for file_path in file_paths]
+        for index, status, payload in run_in_processes(self.analyze_file, tasks, max_workers, timeout):
+            if status == 'ok':
+                results[file_paths[index]] = payload
+            else:
+                results[file_paths[index]] = {
                     'success': False,
-                    'error': str(e)
+                    'error': payload
                 }
         return results
     
     def generate_summary(self, analysis: Dict[str, Any]) -> str:
         summary = []
         summary.append(f"数据集形状: {analysis['shape'][0]}行 × {analysis['shape'][1]}列")
-        summary.append(f"\n列名: {', '.join(analysis['columns'])}")
+        summary.append(f"\n列名: {', '.join(map(str, analysis['columns']))}")
         
         if analysis['numeric_columns']:
-            summary.append(f"\n数值列 ({len(analysis['numeric_columns'])}): {', '.join(analysis['numeric_columns'])}")
+            summary.append(f"\n数值列 ({len(analysis['numeric_columns'])}): {', '.join(map(str, analysis['numeric_columns']))}")
         
         if analysis['categorical_columns']:
-            summary.append(f"\n分类列 ({len(analysis['categorical_columns'])}): {', '.join(analysis['categorical_columns'])}")
+            summary.append(f"\n分类列 ({len(analysis['categorical_columns'])}): {', '.join(map(str, analysis['categorical_columns']))}")
         
         if analysis['datetime_columns']:
-            summary.append(f"\n时间列 ({len(analysis['datetime_columns'])}): {', '.join(analysis['datetime_columns'])}")
+            summary.append(f"\n时间列 ({len(analysis['datetime_columns'])}): {', '.join(map(str, analysis['datetime_columns']))}")
         
         missing = {k: v for k, v in analysis['missing_values'].items() if v > 0}
         if missing:
             summary.append(f"\n缺失值: {missing}")
         
+        dataset = analysis.get('dataset')
+        if dataset:
+            summary.append(f"\n分区数据集: {dataset['files']}个文件, {dataset['row_groups']}个行组 (统计信息来自Parquet元数据)")
+            for name, values in dataset['partition_values'].items():
+                shown = ', '.join(map(str, values[:10])) + (' ...' if len(values) > 10 else '')
+                summary.append(f"  分区列 {name} ({len(values)}): {shown}")
+            if dataset['time']:
+                summary.append(f"  数据最新时间: {dataset['time']['latest']}")
+        
+        approximate = self._approximate_summary(analysis)
+        if approximate:
+            summary.append("\n近似统计 (草图估计，区间为95%置信区间):")
+            summary.extend(approximate)
+        
         return '\n'.join(summary)
+    
+    def _approximate_summary(self, analysis: Dict[str, Any]) -> List[str]:
+        """列出近似统计量及其误差界，避免把估计值当作精确值交给LLM"""
+        lines = []
+        for col, stats in analysis['statistics'].items():
+            bounds = stats.get('error_bounds')
+            if not bounds:
+                continue
+            if 'unique_count' in bounds:
+                low, high = bounds['unique_count']
+                lines.append(
+                    f"  {col}: 唯一值≈{stats['unique_count']} [{low}, {high}]，"
+                    f"高频值计数最多低估 {bounds['top_values_max_undercount']}"
+                )
+            elif stats.get('median') is not None:
+                low, high = bounds['median']
+                lines.append(
+                    f"  {col}: 中位数≈{stats['median']:.4g} [{low:.4g}, {high:.4g}]，"
+                    f"秩误差±{bounds['rank_error']:.2%}"
+                )
+        return lines
 
@@ -0,0 +1,134 @@
+"""文本表格格式探测模块
+
+只读取文件开头的少量字节，推断编码、分隔符、是否有表头以及小数点符号，
+使 read_data 只需完整解析一次文件。
+"""
+import codecs
+import csv
+import re
+from collections import Counter
+from typing import Dict, Any, List, Tuple
+
+from .compressed_io import read_head
+
+SNIFF_BYTES = 64 * 1024
+SNIFF_MAX_LINES = 50
+CANDIDATE_SEPARATORS = [',', '\t', ';', '|']
+CANDIDATE_ENCODINGS = ['utf-8', 'gb18030']
+WHITESPACE_SEPARATOR = r'\s+'
+
+_NUMBER_PATTERN = re.compile(r'^[+-]?(\d+([.,]\d*)?|[.,]\d+)([eE][+-]?\d+)?$')
+_COMMA_DECIMAL_PATTERN = re.compile(r'^[+-]?\d+,\d+$')
+_DOT_DECIMAL_PATTERN = re.compile(r'^[+-]?\d+\.\d+$')
+
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def _detect_encoding(sample: bytes, truncated: bool) -> Tuple[str, str]:
+    """返回 (编码, 解码后的文本)，截断的样本允许末尾出现不完整的多字节字符"""
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            return encoding, decoder.decode(sample, final=not truncated)
+
+    for encoding in CANDIDATE_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            return encoding, decoder.decode(sample, final=not truncated)
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1', sample.decode('latin-1')
+
+
+def _field_counts(lines: List[str], sep: str) -> List[int]:
+    if sep == WHITESPACE_SEPARATOR:
+        return [len(line.split()) for line in lines]
+    return [len(row) for row in csv.reader(lines, delimiter=sep)]
+
+
+def _detect_separator(lines: List[str], default_sep: str) -> str:
+    """选择各行字段数最一致、且字段数最多的分隔符"""
+    best_sep, best_score = default_sep, (0.0, 1)
+    candidates = [default_sep] + [s for s in CANDIDATE_SEPARATORS if s != default_sep]
+    for sep in candidates + [WHITESPACE_SEPARATOR]:
+        counts = _field_counts(lines, sep)
+        if not counts:
+            continue
+        mode, frequency = Counter(counts).most_common(1)[0]
+        if mode < 2:
+            continue
+        score = (frequency / len(counts), mode)
+        # 空白分隔只在其他候选都不成立时使用
+        if sep == WHITESPACE_SEPARATOR and best_score[1] > 1:
+            continue
+        if score > best_score:
+            best_sep, best_score = sep, score
+    return best_sep
+
+
+def _split_rows(lines: List[str], sep: str) -> List[List[str]]:
+    if sep == WHITESPACE_SEPARATOR:
+        return [line.split() for line in lines]
+    return list(csv.reader(lines, delimiter=sep))
+
+
+def _detect_header(rows: List[List[str]]) -> bool:
+    """首行所有字段都是数字时认为没有表头"""
+    if len(rows) < 2 or not rows[0]:
+        return True
+    return not all(_NUMBER_PATTERN.match(field.strip()) for field in rows[0])
+
+
+def _detect_decimal(rows: List[List[str]], sep: str) -> str:
+    """逗号作为分隔符时小数点只能是'.'，否则按样本中两种写法的出现次数判断"""
+    if sep == ',':
+        return '.'
+    comma = dot = 0
+    for row in rows:
+        for field in row:
+            field = field.strip()
+            if _COMMA_DECIMAL_PATTERN.match(field):
+                comma += 1
+            elif _DOT_DECIMAL_PATTERN.match(field):
+                dot += 1
+    return ',' if comma > dot else '.'
+
+
+def sniff_bytes(sample: bytes, truncated: bool, default_sep: str = ',') -> Dict[str, Any]:
+    """根据文件开头的字节样本推断表格格式"""
+    encoding, text = _detect_encoding(sample, truncated)
+    lines = text.splitlines()
+    if truncated and len(lines) > 1:
+        # 最后一行可能被截断
+        lines = lines[:-1]
+    lines = [line for line in lines if line.strip()][:SNIFF_MAX_LINES]
+
+    sep = _detect_separator(lines, default_sep)
+    rows = _split_rows(lines, sep)
+    return {
+        'encoding': encoding,
+        'sep': sep,
+        'header': _detect_header(rows),
+        'decimal': _detect_decimal(rows, sep),
+    }
+
+
+def sniff_file(file_path: str, default_sep: str = ',') -> Dict[str, Any]:
+    """读取文件（压缩文件和归档成员按解压后的内容）开头 SNIFF_BYTES 字节并推断表格格式"""
+    sample = read_head(file_path, SNIFF_BYTES + 1)
+    truncated = len(sample) > SNIFF_BYTES
+    return sniff_bytes(sample[:SNIFF_BYTES], truncated, default_sep)
+
+
+def read_csv_kwargs(dialect: Dict[str, Any]) -> Dict[str, Any]:
+    """把探测结果转换为 pd.read_csv 的参数"""
+    return {
+        'sep': dialect['sep'],
+        'encoding': dialect['encoding'],
+        'header': 0 if dialect['header'] else None,
+        'decimal': dialect['decimal'],
+    }
@@ -0,0 +1,140 @@
+"""目录扫描模块
+
+基于 os.scandir 单次遍历目录树，支持包含/排除规则和最大深度。
+可选的清单文件记录每个目录的修改时间和其中的数据文件，再次扫描时
+修改时间未变的目录直接复用记录，只需 stat 目录本身而不必重新列出。
+"""
+import json
+import os
+from fnmatch import fnmatch
+from typing import Dict, List, Optional, Sequence, Set
+
+MANIFEST_VERSION = 1
+DEFAULT_EXCLUDES = [
+    '.git', '.svn', '.hg', '__pycache__', 'node_modules',
+    '.venv', 'venv', '.ipynb_checkpoints', '.pytest_cache',
+]
+
+
+class DirectoryScanner:
+    def __init__(
+        self,
+        suffixes: Sequence[str],
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        max_depth: Optional[int] = None,
+        manifest_path: Optional[str] = None
+    ):
+        """
+        Args:
+            suffixes: 需要收集的文件后缀（不区分大小写）
+            include: 文件相对路径需匹配其中至少一个 glob 才会被收集，为None时不限制
+            exclude: 匹配任一 glob（按名称或相对路径）的目录和文件被跳过，
+                为None时使用 DEFAULT_EXCLUDES
+            max_depth: 最大递归深度，0 表示只扫描根目录本身
+            manifest_path: 扫描清单文件路径，为None时每次都完整遍历
+        """
+        self.suffixes = suffixes
+        self.include = include
+        self.exclude = list(DEFAULT_EXCLUDES if exclude is None else exclude)
+        self.exclude_paths: Set[str] = set()
+        self.max_depth = max_depth
+        self.manifest_path = manifest_path
+        self.last_stats = {}
+
+    def _options_signature(self) -> List:
+        return [MANIFEST_VERSION, sorted(s.lower() for s in self.suffixes), sorted(self.exclude), sorted(self.exclude_paths)]
+
+    def _excluded(self, name: str, rel_path: str, abs_path: str) -> bool:
+        if abs_path in self.exclude_paths:
+            return True
+        return any(fnmatch(name, pattern) or fnmatch(rel_path, pattern) for pattern in self.exclude)
+
+    def _included(self, rel_path: str) -> bool:
+        if not self.include:
+            return True
+        name = os.path.basename(rel_path)
+        return any(fnmatch(rel_path, pattern) or fnmatch(name, pattern) for pattern in self.include)
+
+    def _matches_suffix(self, name: str) -> bool:
+        lower = name.lower()
+        return any(lower.endswith(suffix.lower()) for suffix in self.suffixes)
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('options') != self._options_signature():
+            return {}
+        return manifest.get('dirs', {})
+
+    def _save_manifest(self, root: str, previous: Dict[str, Dict], visited: Dict[str, Dict]):
+        prefix = root.rstrip(os.sep) + os.sep
+        dirs = {d: entry for d, entry in previous.items() if d != root and not d.startswith(prefix)}
+        dirs.update(visited)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'options': self._options_signature(), 'dirs': dirs}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _list_directory(self, directory: str, root: str) -> Dict:
+        files, subdirs = [], []
+        with os.scandir(directory) as it:
+            for entry in it:
+                rel_path = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                if self._excluded(entry.name, rel_path, entry.path):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file() and self._matches_suffix(entry.name):
+                    files.append(entry.name)
+        return {'files': files, 'subdirs': subdirs}
+
+    def scan(self, directory: str) -> List[str]:
+        """扫描目录，返回排序后的数据文件路径"""
+        root = os.path.abspath(directory)
+        if not os.path.isdir(root):
+            return []
+
+        previous = self._load_manifest()
+        visited = {}
+        results = []
+        listed = reused = 0
+
+        stack = [(root, 0)]
+        while stack:
+            current, depth = stack.pop()
+            try:
+                mtime_ns = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+
+            entry = previous.get(current)
+            if entry is not None and entry['mtime_ns'] == mtime_ns:
+                reused += 1
+            else:
+                try:
+                    entry = dict(self._list_directory(current, root), mtime_ns=mtime_ns)
+                except OSError:
+                    continue
+                listed += 1
+            visited[current] = entry
+
+            for name in entry['files']:
+                rel_path = os.path.relpath(os.path.join(current, name), root)
+                if self._included(rel_path.replace(os.sep, '/')):
+                    # 保持与输入目录一致的相对/绝对路径形式
+                    results.append(os.path.join(directory, rel_path))
+            if self.max_depth is None or depth < self.max_depth:
+                for name in entry['subdirs']:
+                    stack.append((os.path.join(current, name), depth + 1))
+
+        if self.manifest_path:
+            self._save_manifest(root, previous, visited)
+
+        self.last_stats = {'dirs_listed': listed, 'dirs_reused': reused, 'files': len(results)}
+        return sorted(results)
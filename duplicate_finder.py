@@ -0,0 +1,82 @@
+"""重复文件检测模块
+
+按 (大小, 格式后缀) 分组，组内比较文件开头、中间和末尾的抽样哈希；
+抽样哈希相同且文件大于抽样范围时，再用完整内容哈希确认。
+"""
+import hashlib
+import os
+from typing import Dict, List
+
+from .analysis_cache import file_content_hash
+from .compressed_io import data_suffix, split_member, split_sheet
+
+SAMPLE_BYTES = 64 * 1024
+SAMPLE_COUNT = 3
+
+
+def sampled_hash(file_path: str, size: int) -> str:
+    """文件开头、中间和末尾各 SAMPLE_BYTES 字节的哈希，小文件即为完整内容的哈希"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        if size <= SAMPLE_BYTES * SAMPLE_COUNT:
+            digest.update(f.read())
+        else:
+            step = (size - SAMPLE_BYTES) // (SAMPLE_COUNT - 1)
+            for i in range(SAMPLE_COUNT):
+                f.seek(i * step)
+                digest.update(f.read(SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def _is_single_file(path: str) -> bool:
+    """磁盘上的单个文件（可以是压缩文件），归档成员、工作表和数据集目录不参与去重"""
+    return split_sheet(path)[1] is None and split_member(path)[1] is None and os.path.isfile(path)
+
+
+def find_duplicates(file_paths: List[str]) -> Dict[str, str]:
+    """找出内容完全相同的文件，返回 {重复文件: 首次出现的文件}"""
+    groups: Dict[tuple, List[str]] = {}
+    for path in file_paths:
+        if not _is_single_file(path):
+            continue
+        try:
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"无法读取文件 {path}，跳过重复检测: {e}")
+            continue
+        groups.setdefault((size, data_suffix(path)), []).append(path)
+
+    duplicates = {}
+    for (size, _), paths in groups.items():
+        if len(paths) < 2:
+            continue
+        by_sample: Dict[str, List[str]] = {}
+        for path in paths:
+            try:
+                by_sample.setdefault(sampled_hash(path, size), []).append(path)
+            except OSError as e:
+                print(f"无法读取文件 {path}，跳过重复检测: {e}")
+                continue
+        for candidates in by_sample.values():
+            if len(candidates) < 2:
+                continue
+            if size <= SAMPLE_BYTES * SAMPLE_COUNT:
+                originals = {'': candidates[0]}
+                keys = [''] * len(candidates)
+            else:
+                # 抽样哈希相同只说明可能重复，用完整内容确认
+                hashed = []
+                for path in candidates:
+                    try:
+                        hashed.append((file_content_hash(path), path))
+                    except OSError as e:
+                        print(f"无法读取文件 {path}，跳过重复检测: {e}")
+                keys = [key for key, _ in hashed]
+                candidates = [path for _, path in hashed]
+                originals = {}
+                for key, path in zip(keys, candidates):
+                    originals.setdefault(key, path)
+            for key, path in zip(keys, candidates):
+                if originals[key] != path:
+                    duplicates[path] = originals[key]
+    return duplicates
@@ -0,0 +1,131 @@
+"""Excel 工作簿读取模块
+
+工作簿中的每个工作表作为独立的数据集，路径形如 report.xlsx#销售。
+安装了 python-calamine 时使用 calamine 引擎解析，否则使用 openpyxl 的只读模式；
+流式读取 .xlsx 时逐行迭代工作表，内存中只保留当前数据块。
+"""
+import hashlib
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from .compressed_io import SHEET_SEPARATOR, data_suffix, is_plain, open_source, split_sheet
+
+EXCEL_SUFFIXES = ['.xlsx', '.xls']
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+# 工作表内容之外影响解析结果的部件：共享字符串和单元格格式（决定日期识别）
+_SHARED_PARTS = ['xl/sharedStrings.xml', 'xl/styles.xml']
+
+
+def is_workbook(path: str) -> bool:
+    return split_sheet(path)[1] is None and data_suffix(path)[0] in EXCEL_SUFFIXES
+
+
+def excel_engine() -> Optional[str]:
+    """安装了 python-calamine 时返回 'calamine'，否则交给 pandas 选择默认引擎"""
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return None
+    return 'calamine'
+
+
+def list_sheets(workbook: str) -> List[str]:
+    """列出工作簿中的工作表，返回工作表路径；只读取工作簿目录，不解析工作表内容"""
+    with open_source(workbook) as source:
+        with pd.ExcelFile(source, engine=excel_engine()) as book:
+            names = book.sheet_names
+    return [f"{workbook}{SHEET_SEPARATOR}{name}" for name in names]
+
+
+def read_sheet(path: str, columns: Optional[List] = None) -> pd.DataFrame:
+    """读取单个工作表，非工作表路径读取第一个工作表"""
+    workbook, sheet = split_sheet(path)
+    with open_source(workbook) as source:
+        return pd.read_excel(
+            source,
+            sheet_name=sheet if sheet is not None else 0,
+            usecols=columns,
+            engine=excel_engine()
+        )
+
+
+def iter_sheet(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """按块读取工作表，.xlsx 使用 openpyxl 只读模式逐行迭代，其余格式整体读取"""
+    workbook, sheet = split_sheet(path)
+    if data_suffix(workbook)[0] != '.xlsx':
+        yield read_sheet(path)
+        return
+
+    import openpyxl
+
+    with open_source(workbook) as source:
+        book = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            worksheet = book[sheet] if sheet is not None else book.worksheets[0]
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+            batch = []
+            for row in rows:
+                batch.append(row[:len(columns)])
+                if len(batch) >= chunksize:
+                    yield pd.DataFrame(batch, columns=columns).infer_objects()
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=columns).infer_objects()
+        finally:
+            book.close()
+
+
+def sheet_fingerprint(path: str) -> Optional[str]:
+    """工作表内容的指纹，由 .xlsx 压缩包中工作表部件和共享部件的 CRC 与大小组成
+
+    只修改其他工作表时指纹不变；无法确定时返回 None，调用方应回退到整个工作簿的身份。
+    """
+    workbook, sheet = split_sheet(path)
+    if sheet is None or not is_plain(workbook) or data_suffix(workbook)[0] != '.xlsx':
+        return None
+    try:
+        with zipfile.ZipFile(workbook) as archive:
+            part = _sheet_part(archive, sheet)
+            if part is None:
+                return None
+            identity = []
+            for name in [part] + _SHARED_PARTS:
+                try:
+                    info = archive.getinfo(name)
+                except KeyError:
+                    continue
+                identity.append(f"{name}:{info.CRC}:{info.file_size}")
+    except (OSError, KeyError, zipfile.BadZipFile, ET.ParseError):
+        return None
+    return hashlib.blake2b('|'.join(identity).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _sheet_part(archive: zipfile.ZipFile, sheet: str) -> Optional[str]:
+    """由 workbook.xml 及其关系文件找到工作表对应的 XML 部件"""
+    workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+    relation = None
+    for element in workbook.iter(f'{_MAIN_NS}sheet'):
+        if element.get('name') == sheet:
+            relation = element.get(f'{_REL_NS}id')
+            break
+    if relation is None:
+        return None
+    relations = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    for element in relations.iter(f'{_PACKAGE_REL_NS}Relationship'):
+        if element.get('Id') == relation:
+            target = element.get('Target')
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', target))
+    return None
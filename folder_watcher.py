@@ -0,0 +1,164 @@
+"""文件夹监视模块
+
+记录被监视文件的大小和修改时间，对比前后两次快照得到新增、修改和删除的文件。
+Linux 下通过 inotify 在目录发生变化时立即唤醒，其他平台或 inotify 不可用时按固定间隔轮询。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .compressed_io import physical_path
+from .parquet_dataset import dataset_signature
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (
+    _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+    | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """基于 ctypes 的最小 inotify 封装，只用于在目录变化时唤醒"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("找不到 libc")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.watches: Dict[str, int] = {}
+
+    def watch(self, directory: str):
+        if directory in self.watches:
+            return
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd >= 0:
+            self.watches[directory] = wd
+
+    def wait(self, timeout: float) -> bool:
+        """等待事件，返回是否发生了变化；读出并丢弃所有待处理事件"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            # 被删除目录的监视会自动失效，下次轮询时重新添加
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                if mask & _IN_DELETE_SELF:
+                    self.watches = {d: w for d, w in self.watches.items() if w != wd}
+                offset += _EVENT_HEADER.size + length
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    def __init__(
+        self,
+        sources: List[str],
+        resolve: Callable[[List[str]], List[str]],
+        baseline: Optional[Dict[str, Tuple[int, int]]] = None,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        use_inotify: bool = True
+    ):
+        """
+        Args:
+            sources: 被监视的文件和文件夹
+            resolve: 把 sources 解析为数据文件列表的函数（如 DataAnalyzer.resolve_paths）
+            baseline: 初始快照 {文件路径: (大小, 修改时间ns)}，为None时以当前状态为准
+                （分区数据集为目录下文件的总大小和最新修改时间）
+            interval: 轮询间隔秒数，inotify 可用时为最长等待时间
+            use_inotify: 是否尝试使用 inotify
+        """
+        self.sources = list(sources)
+        self.resolve = resolve
+        self.interval = interval
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = _Inotify()
+            except (OSError, AttributeError):
+                self.inotify = None
+        self.snapshot = self._take_snapshot() if baseline is None else dict(baseline)
+        self._watch_directories()
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self.inotify is not None else 'polling'
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for file_path in self.resolve(self.sources):
+            try:
+                if os.path.isdir(file_path):
+                    # 分区数据集以目录下所有文件的总大小和最新修改时间为准
+                    snapshot[file_path] = dataset_signature(file_path)
+                    continue
+                stat = os.stat(physical_path(file_path))
+            except OSError:
+                continue
+            snapshot[file_path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def _watch_directories(self):
+        if self.inotify is None:
+            return
+        directories = set()
+        for source in self.sources:
+            if os.path.isdir(source):
+                for root, dirs, _ in os.walk(source):
+                    directories.add(os.path.abspath(root))
+            else:
+                directories.add(os.path.dirname(os.path.abspath(physical_path(source))))
+        for directory in directories:
+            self.inotify.watch(directory)
+
+    def poll(self) -> Dict[str, List[str]]:
+        """对比快照，返回 {'added', 'modified', 'removed'} 三类文件列表"""
+        current = self._take_snapshot()
+        changes = {
+            'added': sorted(p for p in current if p not in self.snapshot),
+            'modified': sorted(p for p in current if p in self.snapshot and current[p] != self.snapshot[p]),
+            'removed': sorted(p for p in self.snapshot if p not in current),
+        }
+        self.snapshot = current
+        self._watch_directories()
+        return changes
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """阻塞到目录可能发生变化或超时；轮询模式下总是等待整个间隔"""
+        timeout = self.interval if timeout is None else timeout
+        if self.inotify is not None:
+            return self.inotify.wait(timeout)
+        time.sleep(timeout)
+        return True
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
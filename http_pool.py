@@ -0,0 +1,130 @@
+"""HTTP 连接池模块
+
+所有线程共享同一个 keep-alive 连接池，每个线程使用各自的 requests.Session，
+避免 Session 中的 Cookie 等状态在线程间竞争。
+每次请求分别记录建立连接（TCP+TLS 握手）、等待首字节和传输响应体的耗时。
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DEFAULT_POOL_SIZE = 10
+
+# 当前线程正在进行的请求的耗时记录，由连接对象在握手时累加
+_current = threading.local()
+
+
+def _record_connect(seconds: float):
+    timing = getattr(_current, 'timing', None)
+    if timing is not None:
+        timing['connect'] += seconds
+        timing['new_connections'] += 1
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+class PooledSession:
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE):
+        """
+        Args:
+            pool_size: 每个主机保持的最大连接数，应不小于并发请求的线程数
+        """
+        self.pool_size = pool_size
+        self.adapter = _TimedAdapter(pool_maxsize=pool_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'new_connections': 0}
+
+    def session(self) -> requests.Session:
+        """当前线程的 Session，挂载共享的连接池"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+            self._local.session = session
+        return session
+
+    @contextmanager
+    def stream(self, url: str, **kwargs: Any) -> Iterator[Tuple[requests.Response, Dict[str, float]]]:
+        """发送 POST 请求，在收到响应头后产出 (响应, 耗时)，由调用方逐步读取响应体
+
+        耗时包含 connect（新建连接的握手时间，复用连接时为0）、ttfb（发出请求到收到响应头，
+        不含握手）、new_connections，退出时补充 transfer（读取响应体）和 total。
+        提前退出时连接被关闭而不是放回连接池。
+        """
+        timing = {'connect': 0.0, 'new_connections': 0}
+        _current.timing = timing
+        start = time.perf_counter()
+        try:
+            response = self.session().post(url, stream=True, **kwargs)
+        finally:
+            _current.timing = None
+        headers_received = time.perf_counter()
+        timing['ttfb'] = headers_received - start - timing['connect']
+        try:
+            yield response, timing
+        finally:
+            response.close()
+            end = time.perf_counter()
+            timing['transfer'] = end - headers_received
+            timing['total'] = end - start
+            with self._lock:
+                self.stats['requests'] += 1
+                self.stats['new_connections'] += timing['new_connections']
+
+    def post(self, url: str, **kwargs: Any) -> Tuple[requests.Response, Dict[str, float]]:
+        """发送 POST 请求并读取完整响应体，返回 (响应, 耗时)，耗时各项同 stream"""
+        with self.stream(url, **kwargs) as (response, timing):
+            response.content
+        return response, timing
+
+    def close(self):
+        self.adapter.close()
+
+
+def format_timing(timing: Dict[str, float]) -> str:
+    parts = [f"连接 {timing['connect']:.2f}s", f"首字节 {timing['ttfb']:.2f}s"]
+    if 'first_token' in timing:
+        parts.append(f"首段文本 {timing['first_token']:.2f}s")
+    parts += [f"传输 {timing['transfer']:.2f}s", f"共 {timing['total']:.2f}s"]
+    if timing['new_connections'] == 0:
+        parts.append("复用连接")
+    if timing.get('stopped_early'):
+        parts.append("代码块结束后提前断开")
+    return ', '.join(parts)
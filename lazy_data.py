@@ -0,0 +1,114 @@
+"""延迟加载的数据容器模块
+
+加载阶段只登记文件路径，DataFrame 在第一次被访问时才读取。
+延迟读取的数据按最近最少使用的顺序保留，总内存超过预算时淘汰最久未用的，
+下次访问时重新读取；直接赋值的数据不受预算约束，始终保留。
+"""
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator, Optional
+
+import pandas as pd
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """DataFrame 占用的内存字节数（含字符串等对象）"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class LazyDataStore(MutableMapping):
+    def __init__(self, loader: Callable[[str], pd.DataFrame], memory_budget: Optional[int] = None):
+        """
+        Args:
+            loader: 根据文件路径读取 DataFrame 的函数
+            memory_budget: 延迟读取数据的内存上限（字节），为None时不淘汰
+        """
+        self.loader = loader
+        self.memory_budget = memory_budget
+        # 保持登记顺序，与加载文件的顺序一致
+        self._keys: Dict[str, None] = {}
+        self._pinned: Dict[str, pd.DataFrame] = {}
+        self._loaded: 'OrderedDict[str, pd.DataFrame]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self.stats = {'loads': 0, 'evictions': 0}
+
+    def register(self, key: str):
+        """登记一个延迟读取的文件，已读取的旧数据一并丢弃"""
+        self._keys[key] = None
+        self._pinned.pop(key, None)
+        self._drop_loaded(key)
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._pinned or key in self._loaded
+
+    def peek(self, key: str) -> Optional[pd.DataFrame]:
+        """返回已在内存中的数据，不触发读取，也不改变LRU顺序"""
+        if key in self._pinned:
+            return self._pinned[key]
+        return self._loaded.get(key)
+
+    def refresh(self, key: str, df: pd.DataFrame):
+        """更新数据，延迟读取的数据仍受内存预算约束，其余按直接赋值处理"""
+        if key not in self._loaded:
+            self[key] = df
+            return
+        self._loaded[key] = df
+        self._loaded.move_to_end(key)
+        self._sizes[key] = frame_memory(df)
+        self._evict(keep=key)
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        if key in self._pinned:
+            return self._pinned[key]
+        if key in self._loaded:
+            self._loaded.move_to_end(key)
+            return self._loaded[key]
+        if key not in self._keys:
+            raise KeyError(key)
+
+        df = self.loader(key)
+        self.stats['loads'] += 1
+        self._loaded[key] = df
+        self._sizes[key] = frame_memory(df)
+        self._evict(keep=key)
+        return df
+
+    def __setitem__(self, key: str, df: pd.DataFrame):
+        self._drop_loaded(key)
+        self._keys[key] = None
+        self._pinned[key] = df
+
+    def __delitem__(self, key: str):
+        if key not in self._keys:
+            raise KeyError(key)
+        del self._keys[key]
+        self._pinned.pop(key, None)
+        self._drop_loaded(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def memory_usage(self) -> int:
+        """当前延迟读取部分占用的内存字节数"""
+        return sum(self._sizes.values())
+
+    def _drop_loaded(self, key: str):
+        self._loaded.pop(key, None)
+        self._sizes.pop(key, None)
+
+    def _evict(self, keep: str):
+        """超出预算时淘汰最久未用的数据，刚读取的数据即使单独超出预算也保留"""
+        if self.memory_budget is None:
+            return
+        while self.memory_usage() > self.memory_budget and len(self._loaded) > 1:
+            oldest = next(iter(self._loaded))
+            if oldest == keep:
+                break
+            self._drop_loaded(oldest)
+            self.stats['evictions'] += 1
@@ -0,0 +1,176 @@
+"""LLM 响应缓存模块
+
+以模型、消息、temperature 和 max_tokens 的规范化哈希为键缓存回复文本。
+内存中保留最近使用的若干条（LRU），指定缓存目录时同时写入 SQLite 数据库，
+跨进程和多次运行复用；超过有效期的条目视为未命中，总大小超过上限时按最近最少使用的顺序淘汰。
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+DEFAULT_MEMORY_ENTRIES = 128
+DATABASE_NAME = 'llm_responses.sqlite'
+
+
+def request_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+    """请求的规范化哈希，键顺序和空白不影响结果"""
+    identity = {
+        'model': model,
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': max_tokens,
+    }
+    canonical = json.dumps(identity, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl: Optional[float] = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES
+    ):
+        """
+        Args:
+            cache_dir: SQLite 数据库所在目录，为None时只使用内存缓存
+            ttl: 条目有效期（秒），为None时永不过期
+            max_bytes: 磁盘缓存的大小上限
+            memory_entries: 内存中保留的条目数
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'bypassed': 0, 'stores': 0}
+
+        self._db = None
+        if cache_dir is not None:
+            path = Path(cache_dir).expanduser()
+            path.mkdir(parents=True, exist_ok=True)
+            # 多个线程共用一个连接，由 _lock 串行化；其他进程通过 SQLite 的文件锁协调
+            self._db = sqlite3.connect(str(path / DATABASE_NAME), timeout=30, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS responses ('
+                    'key TEXT PRIMARY KEY, response TEXT NOT NULL, '
+                    'created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)'
+                )
+
+    @property
+    def hits(self) -> int:
+        return self.stats['memory_hits'] + self.stats['disk_hits']
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存的回复，未命中或已过期时返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self._touch(key, now)
+                    self.stats['memory_hits'] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT response, created FROM responses WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    self._touch(key, now)
+                    self._remember(key, row[1], row[0])
+                    self.stats['disk_hits'] += 1
+                    return row[0]
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key: str, response: str):
+        """写入回复，磁盘缓存超过上限时淘汰"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, response)
+            self.stats['stores'] += 1
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO responses (key, response, created, accessed, size) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        (key, response, now, now, len(response.encode('utf-8')))
+                    )
+                self._evict(now)
+
+    def record_bypass(self):
+        """记录一次跳过缓存的请求"""
+        with self._lock:
+            self.stats['bypassed'] += 1
+
+    def _touch(self, key: str, now: float):
+        """更新磁盘条目的访问时间，供LRU淘汰使用"""
+        if self._db is not None:
+            with self._db:
+                self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+
+    def _remember(self, key: str, created: float, response: str):
+        self._memory[key] = (created, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float):
+        """删除过期条目，总大小仍超过上限时从最久未访问的条目开始删除"""
+        with self._db:
+            if self.ttl is not None:
+                self._db.execute('DELETE FROM responses WHERE created < ?', (now - self.ttl,))
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            stale = []
+            for key, size in self._db.execute('SELECT key, size FROM responses ORDER BY accessed'):
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            self._db.executemany('DELETE FROM responses WHERE key = ?', stale)
+
+    def size(self) -> int:
+        """磁盘缓存占用的字节数（按回复文本计）"""
+        if self._db is None:
+            return 0
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute('DELETE FROM responses')
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def summary(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
@@ -1,99 +1,24 @@
 import requests
 import json
-from typing import List, Dict, Any, Optional
-
-
-class DeepSeekClient:
-    def __init__(self, api_key: str, base_url: str = "https://api.deepseek.com/v1"):
-        self.api_key = api_key
-        self.base_url = base_url
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-    
-    # def chat_completion(
-    #     self, 
-    #     messages: List[Dict[str, str]], 
-    #     model: str = "deepseek-chat",
-    #     temperature: float = 0.7,
-    #     max_tokens: int = 4000,
-    #     stream: bool = False
-    # ) -> str:
-    #     url = f"{self.base_url}/chat/completions"
-    #     payload = {
-    #         "model": model,
-    #         "messages": messages,
-    #         "temperature": temperature,
-    #         "max_tokens": max_tokens,
-    #         "stream": stream
-    #     }
-        
-    #     try:
-    #         response = requests.post(url, headers=self.headers, json=payload, timeout=60)
-    #         response.raise_for_status()
-    #         result = response.json()
-    #         return result['choices'][0]['message']['content']
-    #     except requests.exceptions.RequestException as e:
-    #         raise Exception(f"API请求失败: {str(e)}")
-    def chat_completion(
-        self, 
-        messages: List[Dict[str, str]], 
-        model: str = "deepseek-chat",
-        temperature: float = 0.7,
-        max_tokens: int = 4000,
-        stream: bool = False,
-        timeout: int = 600,  # 增加到120秒
-        max_retries: int = 2  # 添加重试机制
-    ) -> str:
-        url = f"{self.base_url}/chat/completions"
-        payload = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "stream": stream
-        }
-        
-        for attempt in range(max_retries):
-            try:
-                print(f"正在调用API... (尝试 {attempt + 1}/{max_retries})")
-                response = requests.post(
-                    url, 
-                    headers=self.headers, 
-                    json=payload, 
-                    timeout=timeout
-                )
-                response.raise_for_status()
-                result = response.json()
-                return result['choices'][0]['message']['content']
-                
-            except requests.exceptions.Timeout:
-                if attempt < max_retries - 1:
-                    print(f"请求超时，正在重试... ({attempt + 1}/{max_retries})")
-                    continue
-                else:
-                    raise Exception("API请求超时，请检查网络连接或稍后重试")
-                    
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    print(f"请求失败，正在重试... ({attempt + 1}/{max_retries}): {str(e)}")
-                    continue
-                else:
-                    raise Exception(f"API请求失败: {str(e)}")
-    
-    def generate_visualization_code(
-        self, 
-        data_summary: str, 
-        user_requirements: Optional[str] = None,
-        previous_code: Optional[str] = None,
-        feedback: Optional[str] = None,
-        allow_multiple: bool = True,
-        num_files: int = 1
-    ) -> str:
-        """生成可视化代码，支持单图或多图"""
-        
-        system_prompt = f"""You are an expert data visualization specialist. Your goal: Create beautiful, insightful visualizations that help users understand data structure, patterns, and key insights at a glance.
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from .http_pool import DEFAULT_POOL_SIZE, format_timing
+from .llm_transport import create_transport
+from .llm_cache import LLMCache, DEFAULT_TTL, DEFAULT_MAX_BYTES, request_key
+from .token_usage import UsageTotals, format_usage, parse_usage
+from .call_ledger import CallLedger
+from .rate_limit import RateLimiter, RETRYABLE_STATUS, backoff_delay, estimate_tokens, parse_retry_after
+from .sse_stream import CodeFenceTracker, event_content, iter_sse_events
+
+
+# 系统提示是每次调用都相同的静态前缀，放在消息最前面并保持逐字节不变，以命中服务端的上下文缓存；
+# 随调用变化的数据摘要、需求和反馈都放在最后
+VISUALIZATION_SYSTEM_PROMPT = """You are an expert data visualization specialist. Your goal: Create beautiful, insightful visualizations that help users understand data structure, patterns, and key insights at a glance.
 
 CORE PRINCIPLES:
 
@@ -209,51 +134,7 @@ Common Patterns:
 
 Output: Executable Python code in ```python``` blocks."""
 
-        user_message = f"""Data Summary:
-{data_summary}
-
-"""
-        
-        if user_requirements:
-            user_message += f"User Requirements:\n{user_requirements}\n\n"
-            user_message += "IMPORTANT: Follow user requirements while maintaining beauty, clarity, and comparison features.\n\n"
-        else:
-            user_message += """NO specific requirements provided - Use your expertise to:
-1. Select the MOST INSIGHTFUL chart type for this data
-2. Create meaningful COMPARISONS (across categories, time, groups)
-3. Add STATISTICAL INSIGHTS (means, medians, trends)
-4. Make it BEAUTIFUL and EASY TO UNDERSTAND
-5. Help users discover PATTERNS and draw CONCLUSIONS
-
-Think: "What would make this data most valuable and understandable to the user?"
-"""
-        
-        if previous_code and feedback:
-            user_message += f"Previous Code:\n```python\n{previous_code}\n```\n\n"
-            user_message += f"User Feedback:\n{feedback}\n\n"
-            user_message += "Improve the code based on feedback while maintaining quality."
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ]
-        
-        response = self.chat_completion(messages, temperature=0.3)
-        
-        # 提取代码块
-        code = self._extract_code_block(response)
-        return code
-    
-    def generate_combined_visualization_code(
-        self,
-        combined_summary: str,
-        user_requirements: Optional[str] = None,
-        num_datasets: int = 1,
-        data_dict: Optional[Dict] = None
-    ) -> str:
-        """生成多数据集综合可视化代码，智能判断是否需要多图"""
-        
-        system_prompt = """You are an elite data visualization expert specializing in multi-dataset comparative analysis. Your mission: Create stunning, insightful visualizations that make data comparisons crystal clear and patterns immediately obvious.
+COMBINED_VISUALIZATION_SYSTEM_PROMPT = """You are an elite data visualization expert specializing in multi-dataset comparative analysis. Your mission: Create stunning, insightful visualizations that make data comparisons crystal clear and patterns immediately obvious.
 
 === CORE OBJECTIVES ===
 
@@ -421,23 +302,476 @@ for filename, df in data_dict.items():
 
 Output: Beautiful, executable Python code in ```python``` blocks."""
 
-        user_message = f"""Combined Data Summary:
-{combined_summary}
 
-Number of datasets: {num_datasets}
+class DeepSeekClient:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.deepseek.com/v1",
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_concurrency: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        cache_ttl: Optional[float] = DEFAULT_TTL,
+        cache_max_bytes: int = DEFAULT_MAX_BYTES,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        retry_after_max: float = 60.0,
+        ledger_path: Optional[str] = None,
+        prices: Optional[Dict[str, float]] = None,
+        transport: str = 'http',
+        fixture_dir: Optional[str] = None,
+        replay_latency: float = 0.0,
+        replay_token_delay: float = 0.0
+    ):
+        """
+        Args:
+            pool_size: 连接池中每个主机的最大连接数
+            max_concurrency: 异步接口（*_async）同时进行的请求数上限，默认等于 pool_size
+            cache_dir: 启用响应缓存，相同请求直接返回缓存的回复（内存LRU + 该目录下的SQLite数据库）
+            cache_ttl: 缓存条目有效期（秒），为None时永不过期
+            cache_max_bytes: 磁盘缓存的大小上限
+            requests_per_minute / tokens_per_minute: 客户端限流，同一台机器上使用相同接口地址和密钥的
+                线程和进程共享配额；为None时不限制
+            backoff_base / backoff_max: 重试退避的初始和最大等待时间（秒）
+            retry_after_max: 服务端 Retry-After 的上限（秒），超过时只等待该时长
+            ledger_path: 调用记录追加写入的 JSON Lines 文件，为None时只保存在内存中（self.ledger）
+            prices: 每百万 token 的单价，用于在调用记录中计算费用（见 CallLedger）
+            transport: 'http' 直接请求接口，'record' 请求接口并把回复录制到 fixture_dir，
+                'replay' 从 fixture_dir 回放回复、不访问网络（见 llm_transport）
+            fixture_dir: record / replay 模式的夹具目录
+            replay_latency / replay_token_delay: 回放时模拟的首字节时间和每块输出间隔（秒）
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        # keep-alive 连接池（或录制/回放夹具的传输对象），重试和后续调用复用已建立的连接，可在多个线程间共享
+        self.http = create_transport(transport, pool_size, fixture_dir, replay_latency, replay_token_delay)
+        self.last_timing = None
+        # 最近一次调用和整个会话的 token 用量，输入 token 分为命中/未命中服务端上下文缓存两部分
+        self.last_usage = None
+        self.usage = UsageTotals()
+        self.max_concurrency = max_concurrency or pool_size
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = LLMCache(cache_dir, ttl=cache_ttl, max_bytes=cache_max_bytes)
+        self.limiter = None
+        if requests_per_minute is not None or tokens_per_minute is not None:
+            self.limiter = RateLimiter(requests_per_minute, tokens_per_minute, scope=f"{base_url}|{api_key}")
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        # throttled: 因本地限流而等待的调用数，rate_limited: 收到429的次数，retried: 重试次数
+        self.call_stats = {'throttled': 0, 'throttle_wait': 0.0, 'rate_limited': 0, 'retried': 0}
+        self._stats_lock = threading.Lock()
+        self.ledger = CallLedger(ledger_path, prices)
+    
+    # def chat_completion(
+    #     self, 
+    #     messages: List[Dict[str, str]], 
+    #     model: str = "deepseek-chat",
+    #     temperature: float = 0.7,
+    #     max_tokens: int = 4000,
+    #     stream: bool = False
+    # ) -> str:
+    #     url = f"{self.base_url}/chat/completions"
+    #     payload = {
+    #         "model": model,
+    #         "messages": messages,
+    #         "temperature": temperature,
+    #         "max_tokens": max_tokens,
+    #         "stream": stream
+    #     }
+        
+    #     try:
+    #         response = requests.post(url, headers=self.headers, json=payload, timeout=60)
+    #         response.raise_for_status()
+    #         result = response.json()
+    #         return result['choices'][0]['message']['content']
+    #     except requests.exceptions.RequestException as e:
+    #         raise Exception(f"API请求失败: {str(e)}")
+    def chat_completion(
+        self, 
+        messages: List[Dict[str, str]], 
+        model: str = "deepseek-chat",
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        stream: bool = False,
+        timeout: int = 600,  # 增加到120秒
+        max_retries: int = 2,  # 添加重试机制
+        on_code_delta: Optional[Callable[[str], None]] = None,
+        on_code_complete: Optional[Callable[[str], None]] = None,
+        stop_after_code: bool = False,
+        fresh: bool = False,
+        purpose: Optional[str] = None
+    ) -> str:
+        """调用 chat completions 接口，返回回复文本
+        
+        stream=True 时以 SSE 流式接收：on_code_delta 在第一个 Python 代码块的内容到达时被逐段调用，
+        on_code_complete 在代码块结束标记到达时以完整代码调用；stop_after_code=True 时随即断开，
+        不再接收代码块之后的文本。
+        启用缓存时相同的请求直接返回缓存的回复（回调同样被调用）；fresh=True 时跳过缓存重新请求，
+        新的回复会替换缓存中的旧回复。
+        只重试超时、连接错误、429 和 5xx，重试前按带抖动的指数退避等待，429/503 带有 Retry-After 时
+        至少等待该时长（不超过 retry_after_max）；其他错误（如 400、401）立即失败。
+        每次调用（包括命中缓存和失败的调用）在 self.ledger 中记录一条，purpose 标明调用用途。
+        """
+        call = self.ledger.start(purpose, model, stream)
+        try:
+            return self._chat_completion(
+                call, messages, model, temperature, max_tokens, stream, timeout, max_retries,
+                on_code_delta, on_code_complete, stop_after_code, fresh
+            )
+        except Exception as e:
+            call['error'] = str(e)
+            raise
+        finally:
+            self.ledger.finish(call)
+    
+    def _chat_completion(
+        self,
+        call: Dict[str, Any],
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+        timeout: int,
+        max_retries: int,
+        on_code_delta: Optional[Callable[[str], None]],
+        on_code_complete: Optional[Callable[[str], None]],
+        stop_after_code: bool,
+        fresh: bool
+    ) -> str:
+        url = f"{self.base_url}/chat/completions"
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+        if stream:
+            # 在最后一个事件中返回 token 用量（提前断开时收不到）
+            payload["stream_options"] = {"include_usage": True}
+        
+        key = None
+        if self.cache is not None:
+            key = request_key(model, messages, temperature, max_tokens)
+            if fresh:
+                self.cache.record_bypass()
+            else:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    print("命中响应缓存，跳过API调用")
+                    call['cached'] = True
+                    return self._replay(cached, on_code_delta, on_code_complete)
+        
+        estimated_tokens = estimate_tokens(json.dumps(messages, ensure_ascii=False))
+        for attempt in range(max_retries):
+            call['retries'] = attempt
+            call['throttle_wait'] += self._throttle(estimated_tokens)
+            try:
+                print(f"正在调用API... (尝试 {attempt + 1}/{max_retries})")
+                if stream:
+                    with self.http.stream(url, headers=self.headers, json=payload, timeout=timeout) as (response, timing):
+                        response.raise_for_status()
+                        content, usage = self._read_stream(
+                            response, timing, on_code_delta, on_code_complete, stop_after_code
+                        )
+                    self.last_timing = timing
+                    print(f"API耗时: {format_timing(timing)}")
+                    self._record_call(call, timing, self._record_usage(usage, estimated_tokens), estimated_tokens, content)
+                    return self._store(key, content)
+                
+                response, timing = self.http.post(
+                    url, 
+                    headers=self.headers, 
+                    json=payload, 
+                    timeout=timeout
+                )
+                self.last_timing = timing
+                print(f"API耗时: {format_timing(timing)}")
+                response.raise_for_status()
+                result = response.json()
+                content = result['choices'][0]['message']['content']
+                self._record_call(
+                    call, timing, self._record_usage(result.get('usage'), estimated_tokens), estimated_tokens, content
+                )
+                return self._store(key, content)
+                
+            except requests.exceptions.RequestException as e:
+                retryable, retry_after = self._classify_error(e)
+                timed_out = isinstance(e, requests.exceptions.Timeout)
+                if not retryable or attempt == max_retries - 1:
+                    if timed_out:
+                        raise Exception("API请求超时，请检查网络连接或稍后重试")
+                    raise Exception(f"API请求失败: {str(e)}")
+                
+                delay = backoff_delay(
+                    attempt, self.backoff_base, self.backoff_max, retry_after, self.retry_after_max
+                )
+                reason = "请求超时" if timed_out else f"请求失败: {str(e)}"
+                print(f"{reason}，{delay:.1f}秒后重试... ({attempt + 1}/{max_retries})")
+                self._count('retried')
+                time.sleep(delay)
+    
+    def _throttle(self, tokens: int) -> float:
+        """按本地限流配额等待，返回等待的秒数"""
+        if self.limiter is None:
+            return 0.0
+        waited = self.limiter.acquire(tokens)
+        if waited:
+            print(f"已达到本地限流配额，等待了 {waited:.1f}秒")
+            self._count('throttled')
+            self._count('throttle_wait', waited)
+        return waited
+    
+    def _classify_error(self, error: requests.exceptions.RequestException) -> Tuple[bool, Optional[float]]:
+        """判断请求错误是否可以重试，返回 (是否重试, Retry-After 秒数)"""
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            if status == 429:
+                self._count('rate_limited')
+            if status not in RETRYABLE_STATUS:
+                return False, None
+            return True, parse_retry_after(error.response.headers.get('Retry-After'))
+        transient = (
+            requests.exceptions.Timeout,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.ChunkedEncodingError
+        )
+        return isinstance(error, transient), None
+    
+    def _count(self, name: str, amount: float = 1):
+        with self._stats_lock:
+            self.call_stats[name] += amount
+    
+    def _read_stream(
+        self,
+        response: requests.Response,
+        timing: Dict[str, Any],
+        on_code_delta: Optional[Callable[[str], None]],
+        on_code_complete: Optional[Callable[[str], None]],
+        stop_after_code: bool
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """逐个读取 SSE 事件并拼接回复文本，记录首个文本到达的时间，返回 (回复文本, usage)"""
+        start = time.perf_counter()
+        tracker = CodeFenceTracker()
+        usage = None
+        for event in iter_sse_events(response):
+            usage = event.get('usage') or usage
+            delta = event_content(event)
+            if not delta:
+                continue
+            timing.setdefault('first_token', time.perf_counter() - start)
+            code_delta = tracker.feed(delta)
+            if code_delta and on_code_delta:
+                on_code_delta(code_delta)
+            if tracker.complete:
+                if on_code_complete:
+                    on_code_complete(tracker.code)
+                    on_code_complete = None
+                if stop_after_code:
+                    # 代码块之后只有说明文字，提前断开以节省输出token和等待时间
+                    timing['stopped_early'] = True
+                    break
+        return tracker.text, usage
+    
+    def _record_usage(self, usage: Optional[Dict[str, Any]], estimated_tokens: int = 0) -> Optional[Dict[str, int]]:
+        """解析并累计 token 用量，并按实际用量修正限流时预估的 token 数，返回解析后的用量"""
+        parsed = parse_usage(usage)
+        self.last_usage = parsed
+        self.usage.add(parsed)
+        if parsed is not None:
+            print(f"Token用量: {format_usage(parsed)}")
+            if self.limiter is not None:
+                self.limiter.adjust(parsed['prompt_tokens'] + parsed['completion_tokens'] - estimated_tokens)
+        return parsed
+    
+    def _record_call(
+        self,
+        call: Dict[str, Any],
+        timing: Dict[str, Any],
+        usage: Optional[Dict[str, int]],
+        prompt_tokens: int,
+        content: str
+    ):
+        """把成功的那次请求的耗时和 token 用量写入调用记录
+        
+        没有 usage 时（流式接收在代码块结束后提前断开，或接口不返回 usage）按预估的输入 token 数
+        和收到的文本估算，全部输入按未命中缓存计，并标记 usage_estimated。
+        """
+        call['ttfb'] = timing['connect'] + timing['ttfb']
+        call['request_seconds'] = timing['total']
+        if 'first_token' in timing:
+            call['first_token'] = call['ttfb'] + timing['first_token']
+        call['stopped_early'] = bool(timing.get('stopped_early'))
+        if usage is None:
+            usage = {
+                'prompt_tokens': prompt_tokens,
+                'cache_hit_tokens': 0,
+                'cache_miss_tokens': prompt_tokens,
+                'completion_tokens': estimate_tokens(content),
+            }
+            call['usage_estimated'] = True
+        call.update(usage)
+    
+    def _replay(
+        self,
+        text: str,
+        on_code_delta: Optional[Callable[[str], None]],
+        on_code_complete: Optional[Callable[[str], None]]
+    ) -> str:
+        """以缓存的回复调用流式回调"""
+        tracker = CodeFenceTracker()
+        code_delta = tracker.feed(text)
+        if code_delta and on_code_delta:
+            on_code_delta(code_delta)
+        if tracker.complete and on_code_complete:
+            on_code_complete(tracker.code)
+        return text
+    
+    def _store(self, key: Optional[str], content: str) -> str:
+        if key is not None:
+            self.cache.put(key, content)
+        return content
+    
+    def _code_stream_options(
+        self,
+        on_code_delta: Optional[Callable[[str], None]],
+        on_code_complete: Optional[Callable[[str], None]]
+    ) -> Dict[str, Any]:
+        """提供了回调时使用流式接收，并在代码块结束后停止"""
+        if on_code_delta is None and on_code_complete is None:
+            return {}
+        return {
+            'stream': True,
+            'on_code_delta': on_code_delta,
+            'on_code_complete': on_code_complete,
+            'stop_after_code': True
+        }
+    
+    def _run_async(self, func: Callable, *args, **kwargs):
+        """在工作线程中执行阻塞的请求，线程数即并发上限，所有线程共享同一个连接池"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix='llm')
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def chat_completion_async(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """chat_completion 的异步版本，参数相同；超过 max_concurrency 的请求排队等待
+        
+        流式回调在工作线程中被调用。
+        """
+        return await self._run_async(self.chat_completion, messages, **kwargs)
+    
+    async def generate_visualization_code_async(self, data_summary: str, **kwargs) -> str:
+        """generate_visualization_code 的异步版本"""
+        return await self._run_async(self.generate_visualization_code, data_summary, **kwargs)
+    
+    async def generate_combined_visualization_code_async(self, combined_summary: str, **kwargs) -> str:
+        """generate_combined_visualization_code 的异步版本"""
+        return await self._run_async(self.generate_combined_visualization_code, combined_summary, **kwargs)
+    
+    async def suggest_visualizations_async(self, data_summary: str, fresh: bool = False) -> List[str]:
+        """suggest_visualizations 的异步版本"""
+        return await self._run_async(self.suggest_visualizations, data_summary, fresh=fresh)
+    
+    def close(self):
+        """关闭连接池、异步接口使用的线程和响应缓存"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.http.close()
+        if self.cache is not None:
+            self.cache.close()
+    
+    def generate_visualization_code(
+        self, 
+        data_summary: str, 
+        user_requirements: Optional[str] = None,
+        previous_code: Optional[str] = None,
+        feedback: Optional[str] = None,
+        allow_multiple: bool = True,
+        num_files: int = 1,
+        on_code_delta: Optional[Callable[[str], None]] = None,
+        on_code_complete: Optional[Callable[[str], None]] = None,
+        fresh: bool = False,
+        purpose: str = 'generate',
+        temperature: float = 0.3
+    ) -> str:
+        """生成可视化代码，支持单图或多图；提供回调时流式接收，fresh=True 时跳过响应缓存（见 chat_completion）
+
+        purpose 记入调用记录，根据反馈修改代码时为 'refine'；同时请求多个候选代码时以不同的 temperature 区分。
+        """
+        # 静态的说明在前，数据摘要和需求在后，重试时追加的代码和反馈放在最后，与首次调用共享最长的前缀
+        if user_requirements:
+            user_message = "IMPORTANT: Follow user requirements while maintaining beauty, clarity, and comparison features.\n\n"
+        else:
+            user_message = """NO specific requirements provided - Use your expertise to:
+1. Select the MOST INSIGHTFUL chart type for this data
+2. Create meaningful COMPARISONS (across categories, time, groups)
+3. Add STATISTICAL INSIGHTS (means, medians, trends)
+4. Make it BEAUTIFUL and EASY TO UNDERSTAND
+5. Help users discover PATTERNS and draw CONCLUSIONS
+
+Think: "What would make this data most valuable and understandable to the user?"
 
 """
         
+        user_message += f"Data Summary:\n{data_summary}\n\n"
         if user_requirements:
             user_message += f"User Requirements:\n{user_requirements}\n\n"
-            user_message += """IMPORTANT: Follow requirements while ensuring:
+        
+        if previous_code and feedback:
+            user_message += f"Previous Code:\n```python\n{previous_code}\n```\n\n"
+            user_message += f"User Feedback:\n{feedback}\n\n"
+            user_message += "Improve the code based on feedback while maintaining quality."
+        
+        messages = [
+            {"role": "system", "content": VISUALIZATION_SYSTEM_PROMPT},
+            {"role": "user", "content": user_message}
+        ]
+        
+        response = self.chat_completion(
+            messages, temperature=temperature, fresh=fresh, purpose=purpose,
+            **self._code_stream_options(on_code_delta, on_code_complete)
+        )
+        
+        # 提取代码块
+        code = self._extract_code_block(response)
+        return code
+    
+    def generate_combined_visualization_code(
+        self,
+        combined_summary: str,
+        user_requirements: Optional[str] = None,
+        num_datasets: int = 1,
+        data_dict: Optional[Dict] = None,
+        on_code_delta: Optional[Callable[[str], None]] = None,
+        on_code_complete: Optional[Callable[[str], None]] = None,
+        fresh: bool = False,
+        purpose: str = 'combined'
+    ) -> str:
+        """生成多数据集综合可视化代码，智能判断是否需要多图；提供回调时流式接收，fresh=True 时跳过响应缓存"""
+        # 与 generate_visualization_code 相同，静态的说明在前，随调用变化的内容在后
+        if user_requirements:
+            user_message = """IMPORTANT: Follow requirements while ensuring:
 - Beautiful, professional appearance
 - Clear comparisons between datasets
 - Statistical insights and patterns
 - Easy-to-understand visual story
 """
         else:
-            user_message += """NO specific requirements - This is your chance to shine! Create the BEST comparative visualization by:
+            user_message = """NO specific requirements - This is your chance to shine! Create the BEST comparative visualization by:
 
 1. UNDERSTAND: What's the most important comparison here?
 2. CHOOSE: What chart type makes comparison effortless?
@@ -462,19 +796,32 @@ Final check before generating code:
 ✓ Are insights highlighted?
 ✓ Can user draw conclusions easily?
 
-Now generate the visualization code!"""
+"""
+        
+        user_message += f"""Number of datasets: {num_datasets}
+
+Combined Data Summary:
+{combined_summary}
+
+"""
+        if user_requirements:
+            user_message += f"User Requirements:\n{user_requirements}\n\n"
+        user_message += "Now generate the visualization code!"
         
         messages = [
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": COMBINED_VISUALIZATION_SYSTEM_PROMPT},
             {"role": "user", "content": user_message}
         ]
         
-        response = self.chat_completion(messages, temperature=0.3, max_tokens=6000)
+        response = self.chat_completion(
+            messages, temperature=0.3, max_tokens=6000, fresh=fresh, purpose=purpose,
+            **self._code_stream_options(on_code_delta, on_code_complete)
+        )
         code = self._extract_code_block(response)
         return code
     
-    def suggest_visualizations(self, data_summary: str) -> List[str]:
-        """建议适合的可视化类型"""
+    def suggest_visualizations(self, data_summary: str, fresh: bool = False) -> List[str]:
+        """建议适合的可视化类型，fresh=True 时跳过响应缓存"""
         system_prompt = "你是一个数据可视化顾问，根据数据特征建议最合适的可视化类型。"
         user_message = f"""数据摘要：
 {data_summary}
@@ -487,7 +834,7 @@ Now generate the visualization code!"""
             {"role": "user", "content": user_message}
         ]
         
-        response = self.chat_completion(messages, temperature=0.5)
+        response = self.chat_completion(messages, temperature=0.5, fresh=fresh, purpose='suggest')
         suggestions = [line.strip() for line in response.split('\n') if line.strip() and '-' in line]
         return suggestions
     
@@ -0,0 +1,280 @@
+"""LLM 请求传输模块
+
+DeepSeekClient 通过传输对象发送 chat completions 请求，传输对象提供与 PooledSession 相同的
+stream / post / close 接口和 stats 统计，有三种模式：
+- http：PooledSession 直接请求接口
+- record：请求接口，并把请求和完整回复保存到夹具目录，以请求的规范化哈希为文件名
+- replay：从夹具目录读取回复，按设定的延迟模拟首字节时间和逐块输出，不访问网络
+夹具目录也可以由 mock_server 作为本地 /v1/chat/completions 接口提供，
+使 CI 和性能基准测试可以在没有网络的环境中运行完整的流程。
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from .http_pool import PooledSession, DEFAULT_POOL_SIZE
+from .llm_cache import request_key
+
+TRANSPORTS = ['http', 'record', 'replay']
+# 回放时每块输出的字符数
+DEFAULT_CHUNK_CHARS = 16
+
+
+def fixture_key(payload: Dict[str, Any]) -> str:
+    """请求体对应的夹具键，与响应缓存的键相同，是否流式不影响结果"""
+    return request_key(
+        payload.get('model'), payload.get('messages', []), payload.get('temperature'), payload.get('max_tokens')
+    )
+
+
+class FixtureStore:
+    """夹具目录：每个请求一个 JSON 文件，包含请求、回复文本、usage 和录制时的耗时"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, payload: Dict[str, Any], content: str, usage: Optional[Dict[str, Any]], latency: float) -> str:
+        """保存一次请求的回复，返回夹具键；先写入临时文件再替换，并发录制时不会读到不完整的文件"""
+        key = fixture_key(payload)
+        fixture = {
+            'key': key,
+            'request': {name: payload.get(name) for name in ('model', 'messages', 'temperature', 'max_tokens')},
+            'response': {'content': content, 'usage': usage},
+            'latency': latency,
+            'recorded': time.time(),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path(key))
+        return key
+
+    def keys(self) -> List[str]:
+        return sorted(path.stem for path in self.directory.glob('*.json'))
+
+
+def completion_body(content: str, usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """非流式请求的响应体"""
+    body = {'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}]}
+    if usage is not None:
+        body['usage'] = usage
+    return body
+
+
+def completion_events(
+    content: str,
+    usage: Optional[Dict[str, Any]],
+    chunk_chars: int = DEFAULT_CHUNK_CHARS
+) -> List[Dict[str, Any]]:
+    """流式请求的 SSE 事件：每块 chunk_chars 个字符，usage 不为None时以最后一个事件返回"""
+    events = [
+        {'choices': [{'index': 0, 'delta': {'content': content[i:i + chunk_chars]}}]}
+        for i in range(0, len(content), chunk_chars)
+    ]
+    if usage is not None:
+        events.append({'choices': [], 'usage': usage})
+    return events
+
+
+def wants_usage(payload: Dict[str, Any]) -> bool:
+    return bool((payload.get('stream_options') or {}).get('include_usage'))
+
+
+class FixtureResponse:
+    """由夹具构造的响应，提供客户端用到的 requests.Response 接口
+
+    流式响应在读取时逐块产出，块间等待 token_delay 秒。
+    """
+
+    def __init__(
+        self,
+        status_code: int,
+        url: str,
+        body: Optional[Dict[str, Any]] = None,
+        events: Optional[List[Dict[str, Any]]] = None,
+        token_delay: float = 0.0
+    ):
+        self.status_code = status_code
+        self.url = url
+        self.headers = {'Content-Type': 'text/event-stream' if events is not None else 'application/json'}
+        self._body = body
+        self._events = events
+        self.token_delay = token_delay
+
+    @property
+    def content(self) -> bytes:
+        return json.dumps(self._body, ensure_ascii=False).encode('utf-8')
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8')
+
+    def json(self) -> Dict[str, Any]:
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            message = (self._body or {}).get('error', {}).get('message', '')
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error: {message} for url: {self.url}", response=self)
+
+    def iter_lines(self, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        for i, event in enumerate(self._events or []):
+            if i:
+                time.sleep(self.token_delay)
+            yield b"data: " + json.dumps(event, ensure_ascii=False).encode('utf-8')
+            yield b""
+        yield b"data: [DONE]"
+
+    def close(self):
+        pass
+
+
+class _FixtureTransport(ABC):
+    """以夹具应答请求的传输对象的公共部分，子类实现 _respond"""
+
+    def __init__(self, store: FixtureStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'new_connections': 0}
+
+    @abstractmethod
+    def _respond(self, url: str, payload: Dict[str, Any], timing: Dict[str, Any], **kwargs: Any):
+        """返回请求的响应，可在 timing 中补充 connect 和 new_connections"""
+
+    @contextmanager
+    def stream(self, url: str, json: Dict[str, Any] = None, **kwargs: Any) -> Iterator[Tuple[Any, Dict[str, float]]]:
+        """与 PooledSession.stream 相同：产出 (响应, 耗时)，退出时补充 transfer 和 total"""
+        timing = {'connect': 0.0, 'new_connections': 0}
+        start = time.perf_counter()
+        response = self._respond(url, json or {}, timing, **kwargs)
+        headers_received = time.perf_counter()
+        timing['ttfb'] = headers_received - start - timing['connect']
+        try:
+            yield response, timing
+        finally:
+            response.close()
+            end = time.perf_counter()
+            timing['transfer'] = end - headers_received
+            timing['total'] = end - start
+            with self._lock:
+                self.stats['requests'] += 1
+                self.stats['new_connections'] += timing['new_connections']
+
+    def post(self, url: str, **kwargs: Any) -> Tuple[Any, Dict[str, float]]:
+        with self.stream(url, **kwargs) as (response, timing):
+            response.content
+        return response, timing
+
+    def close(self):
+        pass
+
+
+class ReplayTransport(_FixtureTransport):
+    def __init__(
+        self,
+        store: FixtureStore,
+        latency: float = 0.0,
+        token_delay: float = 0.0,
+        chunk_chars: int = DEFAULT_CHUNK_CHARS
+    ):
+        """
+        Args:
+            store: 夹具目录
+            latency: 模拟的首字节时间（秒）
+            token_delay: 模拟的每块输出间隔（秒），非流式请求等待生成全部分块的时间后一次性返回
+            chunk_chars: 每块输出的字符数
+        """
+        super().__init__(store)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.chunk_chars = chunk_chars
+        self.stats['missing'] = 0
+
+    def _respond(self, url: str, payload: Dict[str, Any], timing: Dict[str, Any], **kwargs: Any) -> FixtureResponse:
+        fixture = self.store.get(fixture_key(payload))
+        if fixture is None:
+            with self._lock:
+                self.stats['missing'] += 1
+            body = {'error': {'message': f"夹具目录 {self.store.directory} 中没有该请求，请先以 record 模式录制", 'code': 404}}
+            return FixtureResponse(404, url, body=body)
+        content = fixture['response']['content']
+        usage = fixture['response'].get('usage')
+        time.sleep(self.latency)
+        if payload.get('stream'):
+            events = completion_events(content, usage if wants_usage(payload) else None, self.chunk_chars)
+            return FixtureResponse(200, url, events=events, token_delay=self.token_delay)
+        time.sleep(self.token_delay * -(-len(content) // self.chunk_chars))
+        return FixtureResponse(200, url, body=completion_body(content, usage))
+
+
+class RecordTransport(_FixtureTransport):
+    def __init__(self, store: FixtureStore, inner: Optional[PooledSession] = None):
+        """
+        Args:
+            store: 夹具目录
+            inner: 实际发送请求的传输对象，默认为新的 PooledSession
+
+        录制时总是以非流式请求取得完整回复（流式接收提前断开时得不到完整回复），
+        再按原请求是否流式返回给客户端。
+        """
+        super().__init__(store)
+        self.inner = inner or PooledSession()
+
+    def _respond(self, url: str, payload: Dict[str, Any], timing: Dict[str, Any], **kwargs: Any):
+        forwarded = dict(payload, stream=False)
+        forwarded.pop('stream_options', None)
+        response, inner_timing = self.inner.post(url, json=forwarded, **kwargs)
+        timing['connect'] = inner_timing['connect']
+        timing['new_connections'] = inner_timing['new_connections']
+        if response.status_code >= 400:
+            # 错误响应不录制，交给客户端按原样处理（重试等）
+            return response
+        body = response.json()
+        content = body['choices'][0]['message']['content']
+        usage = body.get('usage')
+        self.store.put(payload, content, usage, inner_timing['total'])
+        if payload.get('stream'):
+            return FixtureResponse(200, url, events=completion_events(content, usage if wants_usage(payload) else None))
+        return FixtureResponse(200, url, body=completion_body(content, usage))
+
+    def close(self):
+        self.inner.close()
+
+
+def create_transport(
+    mode: str = 'http',
+    pool_size: int = DEFAULT_POOL_SIZE,
+    fixture_dir: Optional[str] = None,
+    latency: float = 0.0,
+    token_delay: float = 0.0
+):
+    """按模式创建传输对象，record 和 replay 模式需要 fixture_dir"""
+    if mode not in TRANSPORTS:
+        raise ValueError(f"不支持的传输模式: {mode}，可选: {', '.join(TRANSPORTS)}")
+    if mode == 'http':
+        return PooledSession(pool_size)
+    if fixture_dir is None:
+        raise ValueError(f"{mode} 模式需要指定夹具目录 fixture_dir")
+    store = FixtureStore(fixture_dir)
+    if mode == 'record':
+        return RecordTransport(store, PooledSession(pool_size))
+    return ReplayTransport(store, latency, token_delay)
@@ -0,0 +1,207 @@
+"""
+本地 OpenAI 兼容替身接口
+
+实现 /v1/chat/completions，回复固定文本或从 record 模式录制的夹具目录中读取，
+可模拟响应延迟、流式输出、服务端上下文缓存、错误响应和限流，供测试和性能基准测试使用。
+
+用法:
+    python -m fig_agent.mock_server --fixtures ./fixtures --port 8000 --delay 0.5 --token-delay 0.01
+
+随后以 DeepSeekClient(api_key, base_url='http://127.0.0.1:8000/v1') 请求该接口。
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from fig_agent.llm_transport import FixtureStore, completion_body, completion_events, fixture_key, wants_usage
+
+# 替身接口按字符数估算 token 数，并以 CACHE_BLOCK_TOKENS 个 token 为单位模拟服务端的前缀上下文缓存
+CHARS_PER_TOKEN = 4
+CACHE_BLOCK_TOKENS = 64
+
+
+class ChatCompletionHandler(BaseHTTPRequestHandler):
+    """等待 delay 秒后返回回复：fixtures 不为None时为夹具中录制的回复（没有时返回404），
+    responder 不为None时为 responder(请求体) 的返回值，否则为固定的 reply
+
+    请求中 stream=true 时以 SSE 分块返回，每块 chunk_chars 个字符，块间间隔 token_delay 秒；
+    非流式请求同样等待生成全部分块所需的时间后一次性返回。
+    响应带有 DeepSeek 格式的 usage：消息前缀与之前的请求相同的部分计为缓存命中。
+    failures 中的状态码依次作为最先几个请求的错误响应（带 Retry-After: retry_after）；
+    requests_per_second 不为None时以令牌桶模拟服务端限流，超出时返回429和需要等待的秒数。
+    """
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分两次写出，关闭 Nagle 算法避免与延迟确认叠加出额外的 40ms
+    disable_nagle_algorithm = True
+    delay = 0.0
+    reply = 'ok'
+    fixtures: Optional[FixtureStore] = None
+    responder = None
+    chunk_chars = 16
+    token_delay = 0.0
+    prefix_cache = set()
+    lock = threading.Lock()
+    failures = []
+    retry_after = None
+    requests_per_second = None
+    bucket = {}
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f"unknown path: {self.path}", 'code': 404}})
+            return
+        error = self._error()
+        if error is not None:
+            self._send_error(*error)
+            return
+        reply = self._reply(request)
+        if reply is None:
+            self._send_json(404, {'error': {'message': 'no fixture recorded for this request', 'code': 404}})
+            return
+        time.sleep(self.delay)
+        usage = self._usage(request, reply)
+        if request.get('stream'):
+            self._send_stream(reply, usage if wants_usage(request) else None)
+            return
+        time.sleep(self.token_delay * -(-len(reply) // self.chunk_chars))
+        self._send_json(200, completion_body(reply, usage))
+
+    def _reply(self, request: Dict[str, Any]) -> Optional[str]:
+        if self.responder is not None:
+            return self.responder(request)
+        if self.fixtures is None:
+            return self.reply
+        fixture = self.fixtures.get(fixture_key(request))
+        return None if fixture is None else fixture['response']['content']
+
+    def _error(self):
+        """返回 (状态码, Retry-After) 表示本次请求应失败，否则返回 None"""
+        with self.lock:
+            if self.failures:
+                return self.failures.pop(0), self.retry_after
+            if self.requests_per_second is None:
+                return None
+            now = time.monotonic()
+            level = min(
+                self.requests_per_second,
+                self.bucket.get('level', self.requests_per_second)
+                + (now - self.bucket.get('updated', now)) * self.requests_per_second
+            )
+            self.bucket['updated'] = now
+            if level >= 1:
+                self.bucket['level'] = level - 1
+                return None
+            self.bucket['level'] = level
+            return 429, f"{(1 - level) / self.requests_per_second:.3f}"
+
+    def _send_error(self, status: int, retry_after: str = None):
+        self._send_json(status, {'error': {'message': 'stand-in error', 'code': status}}, retry_after)
+
+    def _send_json(self, status: int, body: Dict[str, Any], retry_after: str = None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if retry_after is not None:
+            self.send_header('Retry-After', str(retry_after))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _usage(self, request: Dict[str, Any], reply: str) -> Dict[str, int]:
+        """估算 token 数，并查找与之前请求相同的最长前缀（按块对齐）作为缓存命中部分"""
+        prompt = ''.join(f"{m.get('role')}\n{m.get('content')}\n" for m in request.get('messages', []))
+        block_chars = CACHE_BLOCK_TOKENS * CHARS_PER_TOKEN
+        digest = hashlib.sha1()
+        prefixes = []
+        for start in range(0, len(prompt) - block_chars + 1, block_chars):
+            digest.update(prompt[start:start + block_chars].encode('utf-8'))
+            prefixes.append(digest.hexdigest())
+        with self.lock:
+            hit_blocks = 0
+            while hit_blocks < len(prefixes) and prefixes[hit_blocks] in self.prefix_cache:
+                hit_blocks += 1
+            self.prefix_cache.update(prefixes)
+        prompt_tokens = -(-len(prompt) // CHARS_PER_TOKEN)
+        hit = hit_blocks * CACHE_BLOCK_TOKENS
+        completion = -(-len(reply) // CHARS_PER_TOKEN)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion,
+            'total_tokens': prompt_tokens + completion,
+            'prompt_cache_hit_tokens': hit,
+            'prompt_cache_miss_tokens': prompt_tokens - hit,
+        }
+
+    def _send_stream(self, reply: str, usage: Dict[str, int] = None):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for event in completion_events(reply, usage, self.chunk_chars):
+                self._write_chunk(f"data: {json.dumps(event)}\n\n")
+                time.sleep(self.token_delay)
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端在代码块结束后提前断开
+            self.close_connection = True
+
+    def _write_chunk(self, text: str):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            # 客户端关闭了空闲的 keep-alive 连接
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def start_chat_server(delay: float = 0.0, host: str = '127.0.0.1', port: int = 0, **options):
+    """在后台线程中启动替身接口，返回 (server, chat completions 地址)；options 为 ChatCompletionHandler 的属性"""
+    if isinstance(options.get('fixtures'), str):
+        options['fixtures'] = FixtureStore(options['fixtures'])
+    if options.get('responder') is not None:
+        options['responder'] = staticmethod(options['responder'])
+    handler = type('Handler', (ChatCompletionHandler,), dict(
+        options, delay=delay, prefix_cache=set(), lock=threading.Lock(),
+        failures=list(options.get('failures', [])), bucket={}
+    ))
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1/chat/completions"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FigAgent 本地 OpenAI 兼容替身接口')
+    parser.add_argument('--fixtures', default=None, help='record 模式录制的夹具目录，不指定时总是回复 --reply')
+    parser.add_argument('--reply', default='ok')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--delay', type=float, default=0.0, help='首字节前的延迟（秒）')
+    parser.add_argument('--token-delay', type=float, default=0.0, help='流式输出每块的间隔（秒）')
+    args = parser.parse_args()
+
+    server, url = start_chat_server(
+        args.delay, host=args.host, port=args.port,
+        reply=args.reply, fixtures=args.fixtures, token_delay=args.token_delay
+    )
+    print(f"替身接口已启动: {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
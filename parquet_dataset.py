@@ -0,0 +1,372 @@
+"""Hive 分区 Parquet 数据集模块
+
+把 year=2024/month=05/part-*.parquet 这类分区目录识别为一张逻辑表：
+  - 扫描结果中同一数据集下的文件合并为数据集根目录
+  - 由 Parquet 文件尾部的元数据（行数、最值、缺失数）和分区取值生成分析结果，无需读取数据
+  - 从用户需求中解析时间窗口（如"最近3个月"），转换为分区过滤和行组统计过滤条件
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PARTITION_DIR_PATTERN = re.compile(r'^[^=]+=[^=]*$')
+TIME_PARTITION_KEYS = ['year', 'month', 'day']
+# 分区键对应的时间周期，用于计算最新分区的结束时间
+PERIOD_OFFSETS = {'year': 'years', 'month': 'months', 'day': 'days'}
+DATE_PARTITION_KEYS = ['date', 'dt', 'ds']
+
+_CHINESE_DIGITS = {'一': 1, '两': 2, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+# 时间窗口必须带有明确的数量，避免把"recent years"、"last day of each month"、"近年来"等普通描述当成筛选条件
+_WINDOW_PATTERNS = [
+    re.compile(r'\b(?:last|past|previous|recent)\s+(\d+)\s*(day|week|month|quarter|year)s?\b', re.IGNORECASE),
+    re.compile(r'(?:最近|(?<![接靠附])近|过去|最后)\s*(\d+|[一两二三四五六七八九十]+)\s*个?\s*(天|日|周|星期|月|季度|年)'),
+]
+_UNITS = {
+    'day': 'days', '天': 'days', '日': 'days',
+    'week': 'weeks', '周': 'weeks', '星期': 'weeks',
+    'month': 'months', '月': 'months',
+    'quarter': 'quarters', '季度': 'quarters',
+    'year': 'years', '年': 'years',
+}
+
+
+def is_partition_dir(name: str) -> bool:
+    return bool(PARTITION_DIR_PATTERN.match(name))
+
+
+def dataset_root(file_path: str, top: Optional[str] = None) -> Optional[str]:
+    """文件位于 key=value 分区目录中时，返回最外层分区目录的上一级（数据集根目录）
+
+    top 为扫描起点，数据集根目录不会超出该目录。
+    """
+    top = os.path.normpath(top) if top else None
+    directory = os.path.dirname(os.path.normpath(file_path))
+    root = None
+    while directory and directory != top and is_partition_dir(os.path.basename(directory)):
+        root = os.path.dirname(directory) or os.curdir
+        directory = root
+    return root
+
+
+def group_partitioned(paths: List[str], top: Optional[str] = None) -> List[str]:
+    """把分区数据集中的 Parquet 文件合并为数据集根目录，其余路径保持原样和原顺序"""
+    grouped, emitted = [], set()
+    for path in paths:
+        root = dataset_root(path, top) if path.lower().endswith('.parquet') else None
+        if root is None:
+            grouped.append(path)
+        elif root not in emitted:
+            emitted.add(root)
+            grouped.append(root)
+    return grouped
+
+
+def dataset_signature(path: str) -> Tuple[int, int]:
+    """数据集目录下所有文件的总大小和最新修改时间，用于判断数据集是否变化"""
+    size, mtime_ns = 0, 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            stat = os.stat(os.path.join(directory, name))
+            size += stat.st_size
+            mtime_ns = max(mtime_ns, stat.st_mtime_ns)
+    return size, mtime_ns
+
+
+def open_dataset(path: str):
+    import pyarrow.dataset as ds
+    return ds.dataset(path, format='parquet', partitioning='hive')
+
+
+def _empty_frame(schema) -> pd.DataFrame:
+    return schema.empty_table().to_pandas()
+
+
+def _weighted_numeric_stats(values: np.ndarray, weights: np.ndarray) -> Dict[str, Optional[float]]:
+    total = weights.sum()
+    mean = float((values * weights).sum() / total)
+    variance = float((weights * (values - mean) ** 2).sum() / (total - 1)) if total > 1 else float('nan')
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    median = float(values[order][np.searchsorted(cumulative, total / 2)])
+    return {
+        'mean': mean,
+        'std': float(np.sqrt(variance)),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'median': median
+    }
+
+
+def profile_dataset(path: str) -> Dict[str, Any]:
+    """由文件尾部元数据和分区取值生成与 analyze_dataframe 同结构的分析结果
+
+    分区列的统计是精确的；普通数值列只有最值（来自行组统计），
+    均值、标准差、中位数和分类列的取值分布需要读取数据，记为 None。
+    """
+    import pyarrow.dataset as ds
+
+    dataset = open_dataset(path)
+    schema = dataset.schema
+    partition_columns = list(dataset.partitioning.schema.names) if dataset.partitioning else []
+
+    row_count = files = row_groups = 0
+    minimums, maximums, nulls = {}, {}, {}
+    complete = {name: True for name in schema.names}
+    partition_rows = {name: {} for name in partition_columns}
+    fragment_keys = []
+
+    for fragment in dataset.get_fragments():
+        metadata = fragment.metadata
+        files += 1
+        row_count += metadata.num_rows
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        fragment_keys.append(keys)
+        for key, value in keys.items():
+            counts = partition_rows[key]
+            counts[value] = counts.get(value, 0) + metadata.num_rows
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            row_groups += 1
+            for j in range(row_group.num_columns):
+                column = row_group.column(j)
+                name = column.path_in_schema
+                stats = column.statistics
+                if stats is None or not stats.has_min_max:
+                    complete[name] = False
+                    continue
+                minimums[name] = stats.min if name not in minimums else min(minimums[name], stats.min)
+                maximums[name] = stats.max if name not in maximums else max(maximums[name], stats.max)
+                if stats.has_null_count:
+                    nulls[name] = nulls.get(name, 0) + stats.null_count
+
+    dtypes = _empty_frame(schema).dtypes.to_dict()
+    analysis = {
+        'shape': (row_count, len(schema.names)),
+        'columns': list(schema.names),
+        'dtypes': dtypes,
+        # 没有统计信息的列按无缺失处理
+        'missing_values': {name: int(nulls.get(name, 0)) for name in schema.names},
+        'numeric_columns': [],
+        'categorical_columns': [],
+        'datetime_columns': [],
+        'statistics': {},
+        'sample_data': dataset.head(3).to_pandas().to_dict('records') if row_count else []
+    }
+
+    for name, dtype in dtypes.items():
+        counts = partition_rows.get(name)
+        if pd.api.types.is_numeric_dtype(dtype):
+            analysis['numeric_columns'].append(name)
+            if counts:
+                values = np.array(list(counts), dtype=float)
+                weights = np.array(list(counts.values()), dtype=float)
+                analysis['statistics'][name] = _weighted_numeric_stats(values, weights)
+            else:
+                known = complete[name] and name in minimums
+                analysis['statistics'][name] = {
+                    'mean': None,
+                    'std': None,
+                    # Parquet 统计中的 0.0 最小值按规范写为 -0.0
+                    'min': float(minimums[name]) + 0.0 if known else None,
+                    'max': float(maximums[name]) + 0.0 if known else None,
+                    'median': None
+                }
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            analysis['datetime_columns'].append(name)
+        else:
+            analysis['categorical_columns'].append(name)
+            if counts:
+                top = sorted(counts.items(), key=lambda item: -item[1])[:5]
+                analysis['statistics'][name] = {'unique_count': len(counts), 'top_values': dict(top)}
+            else:
+                analysis['statistics'][name] = {'unique_count': None, 'top_values': {}}
+
+    analysis['dataset'] = {
+        'files': files,
+        'row_groups': row_groups,
+        'partition_columns': partition_columns,
+        'partition_values': {name: pd.Series(list(counts), dtype=object).sort_values().tolist() for name, counts in partition_rows.items()},
+        'time': _time_info(schema, partition_columns, partition_rows, fragment_keys, maximums, complete),
+        'source': 'parquet_metadata'
+    }
+    return analysis
+
+
+def _time_info(schema, partition_columns, partition_rows, fragment_keys, maximums, complete) -> Optional[Dict[str, Any]]:
+    """找出可用于时间过滤的分区或列，记录数据中的最新时间"""
+    import pyarrow as pa
+
+    lowered = {name.lower(): name for name in partition_columns}
+    keys = []
+    for key in TIME_PARTITION_KEYS:
+        if key not in lowered:
+            break
+        keys.append(lowered[key])
+    info = {'partitions': keys, 'date_partition': None, 'column': None, 'latest': None, 'end': None}
+
+    # latest 为数据中的最新时间，ends 为最新一期数据的结束时间（不含），时间窗口从后者往前计算，
+    # 例如按月分区时最新分区为5月，"最近3个月"为3-5月而不是从5月1日往前的2-5月
+    latest, ends = [], []
+    if keys:
+        partition_date = _latest_partition_date(keys, fragment_keys)
+        if partition_date is not None:
+            latest.append(partition_date)
+            ends.append(partition_date + pd.DateOffset(**{PERIOD_OFFSETS[keys[-1].lower()]: 1}))
+        else:
+            info['partitions'] = []
+    for key in DATE_PARTITION_KEYS:
+        if key in lowered:
+            name = lowered[key]
+            dates = pd.to_datetime(pd.Series([str(v) for v in partition_rows[name]], dtype=object), errors='coerce')
+            if len(dates) and dates.notna().all():
+                info['date_partition'] = name
+                latest.append(dates.max())
+                ends.append(dates.max() + pd.DateOffset(days=1))
+            break
+    for field in schema:
+        if field.name in partition_columns or not complete[field.name] or field.name not in maximums:
+            continue
+        maximum = pd.Timestamp(maximums[field.name]).tz_localize(None)
+        if pa.types.is_timestamp(field.type):
+            info['column'] = field.name
+            info['column_type'] = {'unit': field.type.unit, 'tz': field.type.tz}
+            ends.append(maximum)
+        elif pa.types.is_date(field.type):
+            info['column'] = field.name
+            info['column_type'] = {'unit': 'date', 'tz': None}
+            ends.append(maximum + pd.DateOffset(days=1))
+        else:
+            continue
+        latest.append(maximum)
+        break
+
+    if not latest:
+        return None
+    info['latest'] = max(latest).isoformat()
+    info['end'] = max(ends).isoformat()
+    return info
+
+
+def _latest_partition_date(keys: List[str], fragment_keys: List[Dict[str, Any]]) -> Optional[pd.Timestamp]:
+    """由各文件的 year/month/day 分区取值组合出最新日期"""
+    latest = None
+    for partition in fragment_keys:
+        try:
+            parts = [int(partition[key]) for key in keys]
+        except (KeyError, TypeError, ValueError):
+            continue
+        year, month, day = (parts + [1, 1])[:3]
+        date = pd.Timestamp(year=year, month=month, day=day)
+        latest = date if latest is None or date > latest else latest
+    return latest
+
+
+def parse_chinese_number(text: str) -> Optional[int]:
+    """解析一到九十九的中文数字，如 '三'、'十五'、'二十'、'二十五'，无法解析时返回 None"""
+    if '十' not in text:
+        return _CHINESE_DIGITS.get(text)
+    tens, _, ones = text.partition('十')
+    if (tens and tens not in _CHINESE_DIGITS) or (ones and ones not in _CHINESE_DIGITS):
+        return None
+    return (_CHINESE_DIGITS[tens] if tens else 1) * 10 + (_CHINESE_DIGITS[ones] if ones else 0)
+
+
+def _match_time_window(text: Optional[str]) -> Optional[Tuple[str, pd.DateOffset]]:
+    """返回 (需求中匹配的时间窗口原文, 窗口长度)"""
+    if not text:
+        return None
+    for pattern in _WINDOW_PATTERNS:
+        for match in pattern.finditer(text):
+            amount, unit = match.group(1), _UNITS[match.group(2).lower()]
+            n = int(amount) if amount.isdigit() else parse_chinese_number(amount)
+            if not n:
+                continue
+            if unit == 'quarters':
+                return match.group(0), pd.DateOffset(months=3 * n)
+            return match.group(0), pd.DateOffset(**{unit: n})
+    return None
+
+
+def parse_time_window(text: Optional[str]) -> Optional[pd.DateOffset]:
+    """解析需求中的时间窗口，如 'last 3 months'、'最近两周'、'过去二十天'；没有明确数量时返回 None"""
+    matched = _match_time_window(text)
+    return None if matched is None else matched[1]
+
+
+def build_time_filter(analysis: Dict[str, Any], requirements: Optional[str]):
+    """根据需求中的时间窗口生成 pyarrow 过滤表达式，时间窗口以最新一期数据的结束时间为终点
+
+    分区条件用于跳过整个文件，时间列条件借助行组统计跳过行组；无法解析时返回 None。
+    """
+    info = analysis.get('dataset', {}).get('time')
+    matched = _match_time_window(requirements)
+    if not info or matched is None:
+        return None
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    phrase, window = matched
+    cutoff = pd.Timestamp(info.get('end') or info['latest']) - window
+    # 筛选条件由需求文本推断，输出出来，避免用户没有意图的窗口悄悄丢弃数据
+    print(f"按需求中的时间窗口“{phrase}”筛选数据: 只读取 {cutoff:%Y-%m-%d %H:%M:%S} 及之后的数据")
+    conditions = []
+
+    keys = info['partitions']
+    if keys:
+        types = analysis['dtypes']
+        parts = [cutoff.year, cutoff.month, cutoff.day][:len(keys)]
+
+        def value(key, number):
+            return number if pd.api.types.is_numeric_dtype(types[key]) else f"{number:02d}"
+
+        # (year > y) | (year == y & month > m) | ... | (year == y & month == m & day >= d)
+        expression = None
+        for level, key in enumerate(keys):
+            prefix = [ds.field(k) == value(k, parts[i]) for i, k in enumerate(keys[:level])]
+            last = level == len(keys) - 1
+            term = ds.field(key) >= value(key, parts[level]) if last else ds.field(key) > value(key, parts[level])
+            for condition in prefix:
+                term = condition & term
+            expression = term if expression is None else expression | term
+        conditions.append(expression)
+
+    if info['date_partition']:
+        conditions.append(ds.field(info['date_partition']) >= cutoff.strftime('%Y-%m-%d'))
+
+    if info['column']:
+        column_type = info['column_type']
+        if column_type['unit'] == 'date':
+            scalar = pa.scalar(cutoff.date(), type=pa.date32())
+        else:
+            if column_type['tz'] is not None:
+                cutoff = cutoff.tz_localize(column_type['tz'])
+            scalar = pa.scalar(cutoff.to_pydatetime(), type=pa.timestamp(column_type['unit'], column_type['tz']))
+        conditions.append(ds.field(info['column']) >= scalar)
+
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
+
+
+def read_dataset(
+    path: str,
+    columns: Optional[List] = None,
+    filter=None,
+    arrow_dtypes: bool = False
+) -> pd.DataFrame:
+    """读取数据集，filter 用于跳过不相关的分区文件和行组
+
+    实际读取的文件数记录在 df.attrs['dataset_read']。
+    """
+    dataset = open_dataset(path)
+    total = sum(1 for _ in dataset.get_fragments())
+    selected = total if filter is None else sum(1 for _ in dataset.get_fragments(filter=filter))
+    table = dataset.to_table(columns=columns, filter=filter)
+    df = table.to_pandas(types_mapper=pd.ArrowDtype) if arrow_dtypes else table.to_pandas()
+    df.attrs['dataset_read'] = {'files': selected, 'total_files': total, 'filter': None if filter is None else str(filter)}
+    return df
@@ -0,0 +1,193 @@
+"""子进程任务调度模块
+
+每个任务在独立的子进程中运行，超时的任务会被终止，崩溃的任务只影响自身，
+不会拖住同一批次中的其他任务。任务的参数可以事先给出（run_in_processes），
+也可以由 future 陆续产生（run_when_ready）。
+"""
+import os
+import time
+import multiprocessing
+import queue
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple
+
+
+def _child_main(conn, func: Callable, args: tuple):
+    """子进程入口：执行任务并把结果通过管道发回"""
+    try:
+        payload = ('ok', func(*args))
+    except BaseException as e:
+        payload = ('error', f"{type(e).__name__}: {str(e)}")
+    try:
+        conn.send(payload)
+    except Exception as e:
+        # 结果无法序列化时退化为错误信息
+        conn.send(('error', f"结果传输失败: {type(e).__name__}: {str(e)}"))
+    finally:
+        conn.close()
+
+
+def _start(ctx, func: Callable, args: tuple, index: int, timeout: Optional[float], running: dict):
+    """启动一个子进程运行任务，登记到 running: conn -> (序号, 进程, 截止时间)"""
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child_main, args=(child_conn, func, args), daemon=True)
+    process.start()
+    child_conn.close()
+    deadline = time.monotonic() + timeout if timeout else None
+    running[parent_conn] = (index, process, deadline)
+
+
+def _wait_time(running: dict) -> Optional[float]:
+    deadlines = [d for _, _, d in running.values() if d is not None]
+    return max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+
+def _collect(conn, running: dict) -> Tuple[int, str, Any]:
+    """读取已结束的子进程的结果"""
+    index, process, _ = running.pop(conn)
+    try:
+        status, result = conn.recv()
+    except (EOFError, OSError):
+        process.join()
+        status, result = 'crashed', f"子进程异常退出 (exitcode={process.exitcode})"
+    conn.close()
+    process.join()
+    return index, status, result
+
+
+def _expire(running: dict, timeout: Optional[float]) -> Iterator[Tuple[int, str, Any]]:
+    """终止超过截止时间的子进程"""
+    now = time.monotonic()
+    for conn, (index, process, deadline) in list(running.items()):
+        if deadline is not None and now >= deadline:
+            del running[conn]
+            process.terminate()
+            process.join()
+            conn.close()
+            yield index, 'timeout', f"执行超时 (>{timeout}秒)"
+
+
+def _terminate(running: dict):
+    for conn, (_, process, _) in running.items():
+        process.terminate()
+        process.join()
+        conn.close()
+    running.clear()
+
+
+def run_in_processes(
+    func: Callable,
+    tasks: Sequence[tuple],
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> Iterator[Tuple[int, str, Any]]:
+    """并发执行任务，按完成顺序产出 (任务序号, 状态, 结果)
+
+    状态取值:
+      - 'ok': 结果为 func 的返回值
+      - 'error': func 抛出异常，结果为错误信息
+      - 'timeout': 单个任务运行超过 timeout 秒，子进程已被终止
+      - 'crashed': 子进程异常退出（如段错误、被系统杀死）
+
+    提前关闭生成器（如拿到首个成功结果后 break）会终止所有仍在运行的子进程。
+    """
+    ctx = multiprocessing.get_context()
+    max_workers = max(1, max_workers or os.cpu_count() or 1)
+    pending = deque(enumerate(tasks))
+    running = {}  # conn -> (序号, 进程, 截止时间)
+
+    try:
+        while pending or running:
+            while pending and len(running) < max_workers:
+                index, args = pending.popleft()
+                _start(ctx, func, args, index, timeout, running)
+
+            for conn in wait(list(running.keys()), timeout=_wait_time(running)):
+                yield _collect(conn, running)
+            yield from _expire(running, timeout)
+    finally:
+        _terminate(running)
+
+
+def _clean_context(preload: Sequence[str] = ()):
+    """不继承当前进程线程状态的进程上下文
+
+    当前进程中有其他线程（如正在进行的HTTP请求）时 fork 出的子进程可能继承被占用的锁而死锁。
+    支持 forkserver 时子进程从单独的服务进程 fork，该进程预先导入 preload 中的模块，
+    启动开销远小于 spawn；否则使用 spawn。func 和参数需要可以序列化。
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        # 只在服务进程启动前生效
+        ctx.set_forkserver_preload(list(preload))
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+
+def run_when_ready(
+    func: Callable,
+    futures: Sequence[Future],
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    preload: Sequence[str] = ()
+) -> Iterator[Tuple[int, str, Any]]:
+    """futures 中的每一个完成时，以其结果（参数元组）在子进程中运行 func，按完成顺序产出 (序号, 状态, 结果)
+
+    用于参数陆续到达的任务（如并发请求的多个候选代码）。同时运行的子进程超过 max_workers
+    （默认为CPU核数）时，后到达的任务按到达顺序排队。状态取值同 run_in_processes，
+    另有 'failed'：future 抛出异常，结果为错误信息，不启动子进程。
+    产生 future 的线程在子进程启动时仍在运行，因此子进程不直接 fork 当前进程（见 _clean_context），
+    preload 为子进程预先导入的模块。
+    提前关闭生成器会终止所有仍在运行的子进程，并取消尚未开始的 future。
+    """
+    ctx = _clean_context(preload)
+    max_workers = max(1, max_workers or os.cpu_count() or 1)
+    pending = deque()
+    # future 完成时的回调在其他线程中执行，通过管道唤醒等待子进程结果的主循环
+    wake_reader, wake_writer = ctx.Pipe(duplex=False)
+    ready = queue.SimpleQueue()
+    running = {}
+
+    def notify(index: int):
+        def callback(_):
+            ready.put(index)
+            try:
+                wake_writer.send(None)
+            except OSError:
+                pass  # 生成器已关闭
+        return callback
+
+    for index, future in enumerate(futures):
+        future.add_done_callback(notify(index))
+    waiting = len(futures)
+
+    try:
+        while waiting or pending or running:
+            while not ready.empty():
+                index = ready.get()
+                waiting -= 1
+                try:
+                    pending.append((index, futures[index].result()))
+                except BaseException as e:
+                    yield index, 'failed', f"{type(e).__name__}: {str(e)}"
+            while pending and len(running) < max_workers:
+                index, args = pending.popleft()
+                _start(ctx, func, args, index, timeout, running)
+            if not waiting and not pending and not running:
+                break
+
+            for conn in wait([wake_reader, *running.keys()], timeout=_wait_time(running)):
+                if conn is wake_reader:
+                    while wake_reader.poll():
+                        wake_reader.recv()
+                else:
+                    yield _collect(conn, running)
+            yield from _expire(running, timeout)
+    finally:
+        for future in futures:
+            future.cancel()
+        _terminate(running)
+        wake_writer.close()
+        wake_reader.close()
@@ -0,0 +1,210 @@
+"""请求限流与重试退避模块
+
+RateLimiter 以令牌桶限制每分钟的请求数和 token 数。桶的状态保存在临时目录下的文件中，
+通过文件锁在同一台机器的多个进程间共享（不支持文件锁的平台上只在进程内共享）。
+重试的等待时间按带随机抖动的指数退避计算，服务端返回 Retry-After 时至少等待该时长（有上限）。
+"""
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# 可以重试的HTTP状态码：限流和服务端暂时不可用
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# token 数未知时按每4个字符一个 token 估算
+CHARS_PER_TOKEN = 4
+# 桶的容量为多少秒的配额：容量越小，请求越均匀地分布在一分钟内
+DEFAULT_BURST_SECONDS = 1.0
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或HTTP日期），无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def backoff_delay(
+    attempt: int,
+    base: float,
+    cap: float,
+    retry_after: Optional[float] = None,
+    retry_after_max: Optional[float] = None
+) -> float:
+    """第 attempt 次重试（从0开始）前的等待时间
+
+    在 [0, min(cap, base * 2^attempt)] 中均匀抽样（full jitter），避免多个客户端同时重试；
+    有 Retry-After 时先等待该时长（不超过 retry_after_max），再加上同样的随机抖动，
+    避免所有客户端在同一时刻醒来。
+    """
+    jitter = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        if retry_after_max is not None:
+            # 服务端可能返回很长的 Retry-After（或很远的HTTP日期），不能让调用无限期挂起
+            retry_after = min(retry_after, retry_after_max)
+        return retry_after + jitter
+    return jitter
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        scope: str = 'default',
+        state_dir: Optional[str] = None,
+        burst_seconds: float = DEFAULT_BURST_SECONDS
+    ):
+        """
+        Args:
+            requests_per_minute: 每分钟最多发出的请求数，为None时不限制
+            tokens_per_minute: 每分钟最多消耗的 token 数，为None时不限制
+            scope: 共享同一组配额的标识（如接口地址和API密钥），相同 scope 的进程共享桶的状态
+            state_dir: 状态文件所在目录，默认为系统临时目录
+            burst_seconds: 桶的容量，以多少秒的配额计；空闲后最多可以连续发出这么多配额的请求
+        """
+        self.limits = {'requests': requests_per_minute, 'tokens': tokens_per_minute}
+        self.capacity = {
+            name: None if limit is None else max(1.0, limit * burst_seconds / 60.0)
+            for name, limit in self.limits.items()
+        }
+        digest = hashlib.sha256(scope.encode('utf-8')).hexdigest()[:16]
+        self.state_path = os.path.join(state_dir or tempfile.gettempdir(), f"fig_agent_ratelimit_{digest}.json")
+        self._lock = threading.Lock()
+        self._state = None
+
+    def acquire(self, tokens: int = 0) -> float:
+        """取得一次请求和 tokens 个 token 的配额，配额不足时等待，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            wait = self._try_take({'requests': 1, 'tokens': tokens})
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            waited += wait
+        return waited
+
+    def adjust(self, tokens: int):
+        """按实际用量修正 acquire 时预估的 token 数，正数表示多用、负数表示退还"""
+        if not tokens or self.limits['tokens'] is None:
+            return
+
+        def charge(levels: Dict[str, float]):
+            levels['tokens'] -= tokens
+
+        self._update(charge)
+
+    def _try_take(self, amounts: Dict[str, int]) -> float:
+        """配额足够时扣除并返回0，否则不扣除，返回需要等待的秒数"""
+        result = {}
+
+        def take(levels: Dict[str, float]):
+            wait = 0.0
+            for name, amount in amounts.items():
+                limit = self.limits[name]
+                if limit is None:
+                    continue
+                # 单次需求超过桶容量时只要求桶满，避免永远等待
+                needed = min(amount, self.capacity[name])
+                if levels[name] < needed:
+                    wait = max(wait, (needed - levels[name]) * 60.0 / limit)
+            if wait == 0.0:
+                for name, amount in amounts.items():
+                    levels[name] -= amount
+            result['wait'] = wait
+
+        self._update(take)
+        return result['wait']
+
+    def _update(self, change):
+        """在线程锁和文件锁内读取桶的状态、按经过的时间补充配额、修改并写回"""
+        with self._lock:
+            with self._locked_state_file() as f:
+                now = time.time()
+                state = f.read() or {'updated': now}
+                elapsed = max(0.0, now - state['updated'])
+                levels = {}
+                for name, limit in self.limits.items():
+                    level = state.get(name)
+                    if limit is None:
+                        levels[name] = 0.0
+                    elif level is None:
+                        levels[name] = self.capacity[name]
+                    else:
+                        levels[name] = min(self.capacity[name], level + elapsed * limit / 60.0)
+                change(levels)
+                state = {name: level for name, level in levels.items() if self.limits[name] is not None}
+                f.write(dict(state, updated=now))
+
+    def _locked_state_file(self):
+        return _StateFile(self.state_path) if fcntl is not None else _MemoryState(self)
+
+
+class _StateFile:
+    """以排他文件锁打开的状态文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __enter__(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self.file = os.fdopen(fd, 'r+')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+    def read(self) -> Optional[Dict[str, float]]:
+        self.file.seek(0)
+        try:
+            return json.loads(self.file.read())
+        except ValueError:
+            return None
+
+    def write(self, state: Dict[str, float]):
+        self.file.seek(0)
+        self.file.truncate()
+        self.file.write(json.dumps(state))
+        self.file.flush()
+
+
+class _MemoryState:
+    """没有文件锁时的进程内状态"""
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def read(self) -> Optional[Dict[str, float]]:
+        return self.limiter._state
+
+    def write(self, state: Dict[str, float]):
+        self.limiter._state = state
@@ -0,0 +1,230 @@
+"""近似统计草图模块
+
+为超大表和高基数列提供固定内存的可合并统计：
+  - HyperLogLog: 唯一值数量
+  - MisraGries: 高频值及其计数
+  - QuantileSketch: 基于随机优先级的均匀样本，估计中位数与分位数
+
+每个草图都给出误差界，写入分析结果的 error_bounds 字段。
+"""
+import math
+import zlib
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+HLL_PRECISION = 14
+HEAVY_HITTERS_CAPACITY = 64
+QUANTILE_SAMPLE_SIZE = 4096
+CONFIDENCE = 0.95
+# 95%置信水平对应的正态分布分位点
+_Z_95 = 1.96
+PERCENTILES = [0.05, 0.25, 0.75, 0.95]
+
+
+def sketch_seed(name: Any) -> int:
+    """由列名得到固定的随机种子，同一列每次分析的近似分位数相同，不同列的随机序列相互独立"""
+    return zlib.crc32(str(name).encode('utf-8'))
+
+
+def _hash_values(values: pd.Index) -> np.ndarray:
+    """把一组互不相同的值哈希为 uint64，与数据块的切分方式无关"""
+    return pd.util.hash_array(values.to_numpy(dtype=object), categorize=False)
+
+
+class HyperLogLog:
+    """HyperLogLog 基数估计，标准误差约为 1.04/sqrt(2^precision)
+
+    原始估计在 2.5m~5m（m 为寄存器数）区间有明显偏差，因此不同哈希值数量不超过 5m 时
+    同时保存去重后的哈希值并给出精确计数，超过后才只使用寄存器。
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+        self.exact_limit = 5 * len(self.registers)
+        self.exact = np.empty(0, dtype=np.uint64)
+
+    def update_hashes(self, hashes: np.ndarray):
+        if len(hashes) == 0:
+            return
+        self._update_exact(hashes)
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # rho = 剩余位中最低位1的位置（从1开始计数），全0时取最大值
+        lowest_bit = rest & (~rest + np.uint64(1))
+        _, exponent = np.frexp(lowest_bit.astype(np.float64))
+        rho = np.where(rest == 0, 64 - p + 1, exponent).astype(np.uint8)
+        np.maximum.at(self.registers, index, rho)
+
+    def _update_exact(self, hashes: Optional[np.ndarray]):
+        if self.exact is None:
+            return
+        if hashes is None:
+            self.exact = None
+            return
+        self.exact = np.union1d(self.exact, hashes)
+        if len(self.exact) > self.exact_limit:
+            self.exact = None
+
+    def merge(self, other: 'HyperLogLog'):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        self._update_exact(other.exact)
+
+    @property
+    def relative_error(self) -> float:
+        if self.exact is not None:
+            return 0.0
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self) -> float:
+        if self.exact is not None:
+            return float(len(self.exact))
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros > 0:
+            # 小基数时使用线性计数修正
+            return m * math.log(m / zeros)
+        return float(raw)
+
+
+class MisraGries:
+    """可合并的 Misra-Gries 高频项摘要
+
+    每个计数都是真实计数的下界，低估量不超过 max_error（<= 总数/(容量+1)）。
+    """
+
+    def __init__(self, capacity: int = HEAVY_HITTERS_CAPACITY):
+        self.capacity = capacity
+        self.counters = {}
+        self.max_error = 0
+
+    def update_counts(self, counts: Dict[Any, int]):
+        for value, count in counts.items():
+            self.counters[value] = self.counters.get(value, 0) + int(count)
+        if len(self.counters) > self.capacity:
+            ordered = sorted(self.counters.values(), reverse=True)
+            cut = ordered[self.capacity]
+            self.max_error += cut
+            self.counters = {v: c - cut for v, c in self.counters.items() if c > cut}
+
+    def merge(self, other: 'MisraGries'):
+        self.max_error += other.max_error
+        self.update_counts(other.counters)
+
+    def top(self, n: int = 5) -> Dict[Any, int]:
+        return dict(sorted(self.counters.items(), key=lambda item: -item[1])[:n])
+
+
+class QuantileSketch:
+    """为每个值分配随机优先级，保留优先级最小的 sample_size 个值，构成可合并的均匀样本
+
+    分位数的秩误差由 DKW 不等式给出: eps = sqrt(ln(2/delta) / (2n))。
+    随机数序列由 seed 决定，相同的数据得到相同的结果（分析摘要会写入LLM提示，需要可复现）；
+    合并的两个草图必须使用不同的种子，使随机数序列相互独立。seed 为None时每次独立取种子。
+    """
+
+    def __init__(self, sample_size: int = QUANTILE_SAMPLE_SIZE, seed: Optional[int] = 0):
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.priorities = np.empty(0, dtype=np.float64)
+        self.values = np.empty(0, dtype=np.float64)
+        self.count = 0
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self._absorb(self.rng.random(len(values)), values)
+
+    def merge(self, other: 'QuantileSketch'):
+        self.count += other.count
+        self._absorb(other.priorities, other.values)
+
+    def _absorb(self, priorities: np.ndarray, values: np.ndarray):
+        priorities = np.concatenate([self.priorities, priorities])
+        values = np.concatenate([self.values, values])
+        if len(values) > self.sample_size:
+            keep = np.argpartition(priorities, self.sample_size)[:self.sample_size]
+            priorities, values = priorities[keep], values[keep]
+        self.priorities, self.values = priorities, values
+
+    @property
+    def rank_error(self) -> float:
+        """样本即全量时误差为0"""
+        if self.count <= self.sample_size or len(self.values) == 0:
+            return 0.0
+        return math.sqrt(math.log(2 / (1 - CONFIDENCE)) / (2 * len(self.values)))
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.values) == 0:
+            return None
+        return float(np.quantile(self.values, min(max(q, 0.0), 1.0)))
+
+    def quantile_bounds(self, q: float):
+        eps = self.rank_error
+        return self.quantile(q - eps), self.quantile(q + eps)
+
+
+class CategoricalSketch:
+    """分类列的近似统计：缺失数、HyperLogLog 唯一值数、Misra-Gries 高频值"""
+
+    def __init__(self):
+        self.null_count = 0
+        self.hll = HyperLogLog()
+        self.heavy_hitters = MisraGries()
+
+    def update(self, series: pd.Series):
+        counts = series.value_counts()
+        self.null_count += len(series) - int(counts.sum())
+        # HyperLogLog 只关心出现过哪些值，对去重后的值哈希即可
+        self.hll.update_hashes(_hash_values(counts.index))
+        self.heavy_hitters.update_counts(self._candidate_counts(counts))
+
+    def _candidate_counts(self, counts: pd.Series) -> Dict[Any, int]:
+        """只取可能留在摘要中的计数
+
+        不在现有摘要中、且排在本块前 2k+2 名之后的值，合并后的计数不会超过
+        第 k+1 大的计数，必然被 Misra-Gries 淘汰，跳过它们不改变结果。
+        """
+        capacity = self.heavy_hitters.capacity
+        candidates = counts.head(2 * capacity + 2).to_dict()
+        tracked = [value for value in self.heavy_hitters.counters if value not in candidates]
+        if tracked:
+            for value, count in counts.reindex(tracked).dropna().items():
+                candidates[value] = int(count)
+        return candidates
+
+    def merge(self, other: 'CategoricalSketch'):
+        self.null_count += other.null_count
+        self.hll.merge(other.hll)
+        self.heavy_hitters.merge(other.heavy_hitters)
+
+    def result(self) -> Dict[str, Any]:
+        estimate = self.hll.estimate()
+        margin = _Z_95 * self.hll.relative_error
+        return {
+            'unique_count': int(round(estimate)),
+            'top_values': self.heavy_hitters.top(5),
+            'error_bounds': {
+                'confidence': CONFIDENCE,
+                'unique_count': (int(estimate * (1 - margin)), int(math.ceil(estimate * (1 + margin)))),
+                'top_values_max_undercount': int(self.heavy_hitters.max_error)
+            }
+        }
+
+
+def numeric_quantile_result(sketch: QuantileSketch) -> Dict[str, Any]:
+    """由分位数草图生成中位数、分位数及其置信区间"""
+    return {
+        'median': sketch.quantile(0.5),
+        'percentiles': {f"{int(q * 100)}%": sketch.quantile(q) for q in PERCENTILES},
+        'error_bounds': {
+            'confidence': CONFIDENCE,
+            'rank_error': sketch.rank_error,
+            'median': sketch.quantile_bounds(0.5)
+        }
+    }
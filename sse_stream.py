@@ -0,0 +1,78 @@
+"""流式回复解析模块
+
+解析 chat completions 接口的 server-sent events 流，并在回复文本到达的过程中
+增量识别第一个 Python 代码块，使调用方可以边接收边输出代码，并在代码块结束时停止接收。
+"""
+import json
+import re
+from typing import Any, Dict, Iterator, Optional
+
+_OPENING_FENCE = re.compile(r'```[ \t]*(?:python|py)[ \t]*\r?\n', re.IGNORECASE)
+_CLOSING_FENCE = '\n```'
+
+
+def iter_sse_events(response) -> Iterator[Dict[str, Any]]:
+    """逐个产出 SSE 流中的 JSON 事件，遇到 [DONE] 结束"""
+    for line in response.iter_lines(chunk_size=None):
+        if not line.startswith(b'data:'):
+            continue
+        data = line[5:].strip()
+        if data == b'[DONE]':
+            return
+        if data:
+            yield json.loads(data)
+
+
+def event_content(event: Dict[str, Any]) -> str:
+    """事件中新增的回复文本"""
+    choices = event.get('choices') or []
+    if not choices:
+        return ''
+    return (choices[0].get('delta') or {}).get('content') or ''
+
+
+class CodeFenceTracker:
+    """增量识别回复中第一个 ```python 代码块"""
+
+    def __init__(self):
+        self.text = ''
+        self.code_start: Optional[int] = None
+        self.code_end: Optional[int] = None
+        self._emitted = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.code_end is not None
+
+    @property
+    def code(self) -> Optional[str]:
+        if self.code_start is None:
+            return None
+        end = self.code_end if self.code_end is not None else len(self.text)
+        return self.text[self.code_start:end].strip()
+
+    def feed(self, delta: str) -> str:
+        """追加一段回复文本，返回其中新增的代码文本（可能为空）"""
+        self.text += delta
+        if self.complete:
+            return ''
+        if self.code_start is None:
+            match = _OPENING_FENCE.search(self.text)
+            if match is None:
+                return ''
+            self.code_start = self._emitted = match.end()
+
+        # 从代码块开头前一个字符起查找，允许代码块为空
+        close = self.text.find(_CLOSING_FENCE, self.code_start - 1)
+        if close != -1:
+            self.code_end = close
+            end = close
+        else:
+            # 末尾可能是尚未到齐的结束标记（换行加若干反引号），暂不输出
+            end = len(self.text)
+            newline = self.text.rfind('\n', self._emitted)
+            if newline != -1 and set(self.text[newline + 1:]) <= {'`'}:
+                end = newline
+        new = self.text[self._emitted:end]
+        self._emitted = max(self._emitted, end)
+        return new
@@ -0,0 +1,177 @@
+"""可合并的增量统计模块
+
+按块读取数据时逐块更新统计量，任意两个累加器都可以合并，
+因此无需把整张表放进内存即可得到 analyze_dataframe 同结构的分析结果。
+"""
+from collections import Counter
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from .sketches import CategoricalSketch, QuantileSketch, numeric_quantile_result, sketch_seed
+
+
+class NumericAccumulator:
+    """数值列累加器：计数、均值、方差（Chan并行合并公式）、最值、缺失数
+
+    approximate=True 时额外维护分位数草图，给出近似中位数和分位数，seed 为草图的随机种子。
+    """
+
+    def __init__(self, approximate: bool = False, seed: int = 0):
+        self.quantiles = QuantileSketch(seed=seed) if approximate else None
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.null_count = 0
+
+    def update(self, series: pd.Series):
+        values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        valid = values[~np.isnan(values)]
+        self.null_count += len(values) - len(valid)
+        if len(valid) == 0:
+            return
+        if self.quantiles is not None:
+            self.quantiles.update(valid)
+
+        chunk = NumericAccumulator()
+        chunk.count = len(valid)
+        chunk.mean = float(valid.mean())
+        chunk.m2 = float(((valid - chunk.mean) ** 2).sum())
+        chunk.min = float(valid.min())
+        chunk.max = float(valid.max())
+        self.merge(chunk, include_nulls=False)
+
+    def merge(self, other: 'NumericAccumulator', include_nulls: bool = True):
+        if include_nulls:
+            self.null_count += other.null_count
+            if self.quantiles is not None and other.quantiles is not None:
+                self.quantiles.merge(other.quantiles)
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def result(self) -> Dict[str, Optional[float]]:
+        if self.count == 0:
+            return {'mean': None, 'std': None, 'min': None, 'max': None, 'median': None}
+        result = {
+            'mean': self.mean,
+            'std': float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else float('nan'),
+            'min': self.min,
+            'max': self.max,
+            # 精确中位数需要全量数据，流式模式下仅在近似模式中给出估计值
+            'median': None
+        }
+        if self.quantiles is not None:
+            result.update(numeric_quantile_result(self.quantiles))
+        return result
+
+
+class CategoricalAccumulator:
+    """分类列累加器：值计数与缺失数"""
+
+    def __init__(self):
+        self.value_counts = Counter()
+        self.null_count = 0
+
+    def update(self, series: pd.Series):
+        self.null_count += int(series.isna().sum())
+        self.value_counts.update(series.value_counts().to_dict())
+
+    def merge(self, other: 'CategoricalAccumulator'):
+        self.null_count += other.null_count
+        self.value_counts.update(other.value_counts)
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            'unique_count': len(self.value_counts),
+            'top_values': dict(self.value_counts.most_common(5))
+        }
+
+
+class DataFrameProfiler:
+    """逐块累积整张表的统计信息，列类型以首个数据块为准
+
+    approximate=True 时分类列改用草图统计，数值列附带近似分位数。
+    """
+
+    def __init__(self, approximate: bool = False):
+        self.approximate = approximate
+        self.row_count = 0
+        self.columns = []
+        self.dtypes = {}
+        self.sample_data = []
+        self.numeric = {}
+        self.categorical = {}
+        self.datetime = {}
+
+    def update(self, chunk: pd.DataFrame):
+        if not self.columns:
+            self.columns = list(chunk.columns)
+            self.dtypes = chunk.dtypes.to_dict()
+            self.sample_data = chunk.head(3).to_dict('records')
+            for col in self.columns:
+                if pd.api.types.is_numeric_dtype(chunk[col]):
+                    self.numeric[col] = NumericAccumulator(self.approximate, sketch_seed(col))
+                elif pd.api.types.is_datetime64_any_dtype(chunk[col]):
+                    self.datetime[col] = 0
+                elif self.approximate:
+                    self.categorical[col] = CategoricalSketch()
+                else:
+                    self.categorical[col] = CategoricalAccumulator()
+
+        self.row_count += len(chunk)
+        for col, acc in self.numeric.items():
+            acc.update(chunk[col])
+        for col, acc in self.categorical.items():
+            acc.update(chunk[col])
+        for col in self.datetime:
+            self.datetime[col] += int(chunk[col].isna().sum())
+
+    def merge(self, other: 'DataFrameProfiler'):
+        """合并另一个分块的统计（两者列结构需一致）"""
+        if not self.columns:
+            self.__dict__.update(other.__dict__)
+            return
+        self.row_count += other.row_count
+        for col, acc in self.numeric.items():
+            acc.merge(other.numeric[col])
+        for col, acc in self.categorical.items():
+            acc.merge(other.categorical[col])
+        for col in self.datetime:
+            self.datetime[col] += other.datetime[col]
+
+    def result(self) -> Dict[str, Any]:
+        """输出与 DataAnalyzer.analyze_dataframe 相同结构的分析结果"""
+        missing = {}
+        statistics = {}
+        for col in self.columns:
+            if col in self.numeric:
+                missing[col] = self.numeric[col].null_count
+                statistics[col] = self.numeric[col].result()
+            elif col in self.categorical:
+                missing[col] = self.categorical[col].null_count
+                statistics[col] = self.categorical[col].result()
+            else:
+                missing[col] = self.datetime[col]
+
+        return {
+            'shape': (self.row_count, len(self.columns)),
+            'columns': list(self.columns),
+            'dtypes': dict(self.dtypes),
+            'missing_values': missing,
+            'numeric_columns': list(self.numeric),
+            'categorical_columns': list(self.categorical),
+            'datetime_columns': list(self.datetime),
+            'statistics': statistics,
+            'sample_data': self.sample_data,
+            'streamed': True
+        }
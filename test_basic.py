@@ -139,6 +139,1286 @@ def test_data_loading():
     return True
 
 
+def test_parallel_loading():
+    """测试并行加载"""
+    print("\n" + "="*60)
+    print("测试4: 并行加载多个文件")
+    print("="*60)
+    
+    test_dir = Path("./test_data_parallel")
+    test_dir.mkdir(exist_ok=True)
+    
+    paths = []
+    for i in range(4):
+        path = test_dir / f"part_{i}.csv"
+        pd.DataFrame({'x': range(20), 'y': np.random.randn(20)}).to_csv(path, index=False)
+        paths.append(str(path))
+    bad_path = test_dir / "broken.parquet"
+    bad_path.write_bytes(b"not a parquet file")
+    paths.append(str(bad_path))
+    
+    analyzer = DataAnalyzer()
+    results = analyzer.analyze_multiple_files(paths, parallel=True, max_workers=2, timeout=60)
+    
+    print(f"\n✓ 并行加载完成: {sum(1 for r in results.values() if r['success'])}/{len(paths)} 成功")
+    
+    ok = (
+        list(results.keys()) == paths
+        and all(results[p]['success'] for p in paths[:-1])
+        and results[paths[-1]]['success'] is False
+        and results[paths[0]]['data'].shape == (20, 2)
+    )
+    
+    for path in test_dir.iterdir():
+        path.unlink()
+    test_dir.rmdir()
+    
+    return ok
+
+
+def test_streaming_analysis():
+    """测试流式分块分析"""
+    print("\n" + "="*60)
+    print("测试5: 流式分块分析")
+    print("="*60)
+    
+    test_dir = Path("./test_data_stream")
+    test_dir.mkdir(exist_ok=True)
+    test_csv = test_dir / "stream.csv"
+    test_data = pd.DataFrame({
+        'value': np.random.randn(500),
+        'group': np.random.choice(['A', 'B', None], 500)
+    })
+    test_data.to_csv(test_csv, index=False)
+    
+    analyzer = DataAnalyzer()
+    streamed = analyzer.analyze_file_streaming(str(test_csv), chunksize=64)
+    full = analyzer.analyze_dataframe(pd.read_csv(test_csv))
+    
+    print(f"\n✓ 流式分析完成: {streamed['shape']}")
+    print(analyzer.generate_summary(streamed))
+    
+    ok = (
+        streamed['shape'] == full['shape']
+        and streamed['missing_values'] == full['missing_values']
+        and np.isclose(streamed['statistics']['value']['mean'], full['statistics']['value']['mean'])
+        and np.isclose(streamed['statistics']['value']['std'], full['statistics']['value']['std'])
+        and streamed['statistics']['group']['top_values'] == full['statistics']['group']['top_values']
+    )
+    
+    test_csv.unlink()
+    test_dir.rmdir()
+    
+    return ok
+
+
+def test_dialect_sniffing():
+    """测试分隔符与编码探测"""
+    print("\n" + "="*60)
+    print("测试6: 分隔符与编码探测")
+    print("="*60)
+    
+    test_dir = Path("./test_data_dialect")
+    test_dir.mkdir(exist_ok=True)
+    test_data = pd.DataFrame({
+        '城市': ['北京', '上海', '广州'] * 10,
+        '温度': np.round(np.random.rand(30) * 30, 2)
+    })
+    gbk_csv = test_dir / "gbk.csv"
+    semicolon_csv = test_dir / "semicolon.csv"
+    test_data.to_csv(gbk_csv, index=False, encoding='gbk')
+    test_data.to_csv(semicolon_csv, index=False, sep=';', decimal=',')
+    
+    analyzer = DataAnalyzer()
+    gbk_result = analyzer.analyze_file(str(gbk_csv))
+    semicolon_result = analyzer.analyze_file(str(semicolon_csv))
+    
+    for result in (gbk_result, semicolon_result):
+        if result['success']:
+            print(f"\n✓ 探测结果: {result['analysis']['dialect']}")
+    
+    ok = (
+        gbk_result['success'] and semicolon_result['success']
+        and gbk_result['data']['城市'].iloc[0] == '北京'
+        and semicolon_result['analysis']['dialect']['sep'] == ';'
+        and semicolon_result['analysis']['dialect']['decimal'] == ','
+        and '温度' in semicolon_result['analysis']['numeric_columns']
+    )
+    
+    gbk_csv.unlink()
+    semicolon_csv.unlink()
+    test_dir.rmdir()
+    
+    return ok
+
+
+def test_analysis_cache():
+    """测试分析结果缓存"""
+    print("\n" + "="*60)
+    print("测试7: 分析结果缓存")
+    print("="*60)
+    
+    import shutil
+    test_dir = Path("./test_data_cache")
+    cache_dir = test_dir / "cache"
+    test_dir.mkdir(exist_ok=True)
+    test_csv = test_dir / "cached.csv"
+    pd.DataFrame({'x': range(100), 'y': np.random.randn(100)}).to_csv(test_csv, index=False)
+    
+    analyzer = DataAnalyzer(cache_dir=str(cache_dir))
+    first = analyzer.analyze_file(str(test_csv))
+    second = analyzer.analyze_file(str(test_csv))
+    print(f"\n✓ 第二次加载命中缓存: {second.get('cached', False)}")
+    
+    # 文件变化后缓存失效
+    pd.DataFrame({'x': range(10)}).to_csv(test_csv, index=False)
+    third = analyzer.analyze_file(str(test_csv))
+    print(f"✓ 文件修改后重新分析: {not third.get('cached', False)}")
+    
+    # 缓存目录中的 ~ 展开为用户主目录，而不是在当前目录下创建名为 ~ 的目录
+    import os
+    home = os.environ.get('HOME')
+    os.environ['HOME'] = str((test_dir / "home").resolve())
+    try:
+        expanded = DataAnalyzer(cache_dir="~/.fig_agent_cache").cache.cache_dir
+    finally:
+        if home is None:
+            del os.environ['HOME']
+        else:
+            os.environ['HOME'] = home
+    print(f"✓ ~ 展开后的缓存目录: {expanded}")
+    expanded_ok = expanded == (test_dir / "home" / ".fig_agent_cache").resolve() and expanded.is_dir()
+    
+    ok = (
+        second.get('cached', False)
+        and second['data'].equals(first['data'])
+        and not third.get('cached', False)
+        and third['analysis']['shape'] == (10, 1)
+        and expanded_ok
+        and not Path("~").exists()
+    )
+    
+    shutil.rmtree(test_dir)
+    
+    return ok
+
+
+def test_approximate_profiling():
+    """测试近似统计模式"""
+    print("\n" + "="*60)
+    print("测试8: 近似统计模式")
+    print("="*60)
+    
+    n = 50000
+    test_data = pd.DataFrame({
+        'id': [f"user_{i}" for i in range(n)],
+        'level': np.random.choice(['高', '中', '低'], n, p=[0.6, 0.3, 0.1]),
+        'score': np.random.randn(n)
+    })
+    
+    analyzer = DataAnalyzer(approximate=True)
+    analysis = analyzer.analyze_dataframe(test_data)
+    print("\n" + analyzer.generate_summary(analysis))
+    
+    id_stats = analysis['statistics']['id']
+    level_stats = analysis['statistics']['level']
+    score_stats = analysis['statistics']['score']
+    low, high = id_stats['error_bounds']['unique_count']
+    median_low, median_high = score_stats['error_bounds']['median']
+    exact_median = float(test_data['score'].median())
+    
+    # 近似分位数使用固定种子，重复分析得到相同的摘要（LLM提示和缓存才能复用）
+    repeated = DataAnalyzer(approximate=True).analyze_dataframe(test_data)
+    reproducible = (
+        repeated['statistics']['score'] == score_stats
+        and analyzer.generate_summary(repeated) == analyzer.generate_summary(analysis)
+    )
+    print(f"✓ 重复分析结果相同: {reproducible}")
+    
+    return (
+        low <= n <= high
+        and list(level_stats['top_values'])[0] == '高'
+        and median_low <= exact_median <= median_high
+        and reproducible
+    )
+
+
+def test_lazy_loading():
+    """测试延迟加载与内存预算"""
+    print("\n" + "="*60)
+    print("测试9: 延迟加载")
+    print("="*60)
+    
+    from fig_agent.lazy_data import LazyDataStore, frame_memory
+    
+    import shutil
+    test_dir = Path("./test_data_lazy")
+    test_dir.mkdir(exist_ok=True)
+    files = []
+    for i in range(3):
+        path = test_dir / f"part_{i}.csv"
+        pd.DataFrame({'x': range(1000), 'y': np.random.randn(1000)}).to_csv(path, index=False)
+        files.append(str(path))
+    
+    analyzer = DataAnalyzer()
+    results = analyzer.analyze_multiple_files(files, keep_data=False)
+    print(f"\n✓ 只计算分析结果: {all(r['data'] is None for r in results.values())}")
+    
+    one_frame = frame_memory(analyzer.read_data(files[0]))
+    store = LazyDataStore(analyzer.read_data, memory_budget=int(one_frame * 1.5))
+    for path in files:
+        store.register(path)
+    
+    loaded_before = any(store.is_loaded(path) for path in files)
+    frames = [store[path] for path in files]
+    print(f"✓ 读取次数: {store.stats['loads']}, 淘汰次数: {store.stats['evictions']}")
+    
+    ok = (
+        all(r['success'] for r in results.values())
+        and not loaded_before
+        and len(store) == 3
+        and frames[0].shape == (1000, 2)
+        and store.stats['evictions'] == 2
+        and store.is_loaded(files[2])
+        and not store.is_loaded(files[0])
+        and store.memory_usage() <= store.memory_budget
+    )
+    
+    shutil.rmtree(test_dir)
+    
+    return ok
+
+
+def test_column_pruning():
+    """测试基于代码静态分析的列裁剪"""
+    print("\n" + "="*60)
+    print("测试10: 列裁剪")
+    print("="*60)
+    
+    from fig_agent.column_pruning import referenced_columns
+    
+    columns = [f"col_{i}" for i in range(50)]
+    simple_code = """
+subset = df[df['col_3'] > 0]
+sns.scatterplot(data=subset, x='col_1', y='col_2', hue='col_3')
+plt.savefig('output.png')
+"""
+    dynamic_code = """
+for col in df.columns[:3]:
+    plt.hist(df[col])
+"""
+    selected = referenced_columns(simple_code, columns)
+    print(f"\n✓ 引用的列: {selected}")
+    print(f"✓ 动态代码回退完整数据: {referenced_columns(dynamic_code, columns) is None}")
+    
+    import shutil
+    test_dir = Path("./test_data_pruning")
+    test_dir.mkdir(exist_ok=True)
+    test_csv = test_dir / "wide.csv"
+    pd.DataFrame(np.random.randn(100, 50), columns=columns).to_csv(test_csv, index=False)
+    
+    df = DataAnalyzer().read_data(str(test_csv), columns=selected)
+    print(f"✓ 按需读取后形状: {df.shape}")
+    
+    shutil.rmtree(test_dir)
+    
+    return (
+        selected == ['col_1', 'col_2', 'col_3']
+        and referenced_columns(dynamic_code, columns) is None
+        and list(df.columns) == selected
+    )
+
+
+def test_incremental_reload():
+    """测试只追加文件的增量重新分析"""
+    print("\n" + "="*60)
+    print("测试11: 增量重新分析")
+    print("="*60)
+    
+    from fig_agent.folder_watcher import FolderWatcher
+    
+    import shutil
+    test_dir = Path("./test_data_watch")
+    test_dir.mkdir(exist_ok=True)
+    test_csv = test_dir / "log.csv"
+    pd.DataFrame({'step': range(10), 'loss': np.random.rand(10)}).to_csv(test_csv, index=False)
+    
+    analyzer = DataAnalyzer()
+    watcher = FolderWatcher([str(test_dir)], analyzer.resolve_paths, use_inotify=False)
+    state = analyzer.file_state(str(test_csv))
+    df = analyzer.read_data(str(test_csv))
+    
+    with open(test_csv, 'a') as f:
+        f.write("10,0.5\n11,0.25\n")
+    changes = watcher.poll()
+    result = analyzer.reload_file(str(test_csv), state, df)
+    print(f"\n✓ 检测到修改: {changes['modified']}")
+    print(f"✓ 追加行数: {result.get('appended_rows')}")
+    
+    # 非追加的修改重新读取整个文件
+    state = analyzer.file_state(str(test_csv))
+    pd.DataFrame({'step': range(3), 'loss': [0.1, 0.2, 0.3]}).to_csv(test_csv, index=False)
+    rewritten = analyzer.reload_file(str(test_csv), state, result['data'])
+    print(f"✓ 重写后重新读取: {rewritten['analysis']['shape']}")
+    
+    ok = (
+        changes['modified'] == [str(test_csv)]
+        and result['appended_rows'] == 2
+        and result['analysis']['shape'] == (12, 2)
+        and result['data']['loss'].iloc[-1] == 0.25
+        and 'appended_rows' not in rewritten
+        and rewritten['analysis']['shape'] == (3, 2)
+    )
+    
+    shutil.rmtree(test_dir)
+    
+    return ok
+
+
+def test_arrow_engine():
+    """测试pyarrow读取引擎与JSON Lines"""
+    print("\n" + "="*60)
+    print("测试12: pyarrow读取引擎")
+    print("="*60)
+    
+    import shutil
+    test_dir = Path("./test_data_engine")
+    test_dir.mkdir(exist_ok=True)
+    test_data = pd.DataFrame({
+        'x': range(200),
+        'y': np.random.randn(200),
+        'label': np.random.choice(['A', 'B'], 200)
+    })
+    test_csv = test_dir / "data.csv"
+    test_jsonl = test_dir / "data.jsonl"
+    test_data.to_csv(test_csv, index=False)
+    test_data.to_json(test_jsonl, orient='records', lines=True)
+    # .json 后缀：一个完整的 JSON 文档，以及按行存放的 JSON Lines
+    test_document = test_dir / "document.json"
+    test_lines_json = test_dir / "lines.json"
+    test_data.to_json(test_document)
+    test_data.to_json(test_lines_json, orient='records', lines=True)
+    
+    pandas_analyzer = DataAnalyzer()
+    arrow_analyzer = DataAnalyzer(engine='pyarrow')
+    typed_analyzer = DataAnalyzer(engine='pyarrow', arrow_dtypes=True)
+    
+    expected = pandas_analyzer.analyze_dataframe(pandas_analyzer.read_data(str(test_csv)))
+    arrow_csv = arrow_analyzer.analyze_dataframe(arrow_analyzer.read_data(str(test_csv)))
+    arrow_jsonl = arrow_analyzer.analyze_dataframe(arrow_analyzer.read_data(str(test_jsonl)))
+    typed = typed_analyzer.read_data(str(test_csv))
+    streamed = pandas_analyzer.analyze_file_streaming(str(test_jsonl), chunksize=50)
+    document = arrow_analyzer.read_data(str(test_document))
+    lines_json = arrow_analyzer.read_data(str(test_lines_json))
+    print(f"\n✓ .json 文档: {document.shape}, .json 中的 JSON Lines: {lines_json.shape}")
+    print(f"✓ Arrow类型: {typed.dtypes.astype(str).tolist()}")
+    print(f"✓ JSON Lines 流式分析: {streamed['shape']}")
+    
+    shutil.rmtree(test_dir)
+    
+    return (
+        arrow_csv['statistics']['x'] == expected['statistics']['x']
+        and arrow_jsonl['statistics']['label'] == expected['statistics']['label']
+        and isinstance(typed['y'].dtype, pd.ArrowDtype)
+        and streamed['shape'] == (200, 3)
+        and document.shape == (200, 3) and document['x'].tolist() == list(range(200))
+        and lines_json.shape == (200, 3)
+    )
+
+
+def test_compressed_files():
+    """测试压缩文件与tar归档读取"""
+    print("\n" + "="*60)
+    print("测试13: 压缩文件与归档")
+    print("="*60)
+    
+    import gzip
+    import shutil
+    import tarfile
+    test_dir = Path("./test_data_compressed")
+    test_dir.mkdir(exist_ok=True)
+    test_data = pd.DataFrame({'x': range(500), 'y': np.random.randn(500)})
+    with gzip.open(test_dir / "data.csv.gz", 'wt') as f:
+        test_data.to_csv(f, index=False)
+    parquet_path = test_dir / "part.parquet"
+    test_data.to_parquet(parquet_path)
+    with tarfile.open(test_dir / "bundle.tar.gz", 'w:gz') as tar:
+        tar.add(parquet_path, arcname="2024/part.parquet")
+    parquet_path.unlink()
+    
+    analyzer = DataAnalyzer()
+    files = analyzer.scan_directory(str(test_dir))
+    print(f"\n✓ 扫描结果: {files}")
+    
+    shapes = [analyzer.analyze_file(f)['analysis']['shape'] for f in files]
+    streamed = analyzer.analyze_file(files[0], streaming=True, chunksize=100)['analysis']
+    print(f"✓ 数据形状: {shapes}")
+    
+    shutil.rmtree(test_dir)
+    
+    return (
+        len(files) == 2
+        and files[0].endswith('bundle.tar.gz::2024/part.parquet')
+        and shapes == [(500, 2), (500, 2)]
+        and streamed['shape'] == (500, 2)
+    )
+
+
+def test_partitioned_dataset():
+    """测试Hive分区Parquet数据集"""
+    print("\n" + "="*60)
+    print("测试14: 分区数据集")
+    print("="*60)
+    
+    import shutil
+    from fig_agent.parquet_dataset import build_time_filter
+    test_dir = Path("./test_data_partitioned")
+    dates = pd.date_range('2023-01-01', '2024-06-30', freq='D')
+    test_data = pd.DataFrame({'date': dates, 'sales': np.random.rand(len(dates)) * 100})
+    test_data['year'] = dates.year
+    test_data['month'] = dates.month
+    test_data.to_parquet(test_dir / "sales", partition_cols=['year', 'month'])
+    
+    analyzer = DataAnalyzer()
+    files = analyzer.scan_directory(str(test_dir))
+    print(f"\n✓ 扫描结果: {files}")
+    
+    analysis = analyzer.analyze_file(files[0])['analysis']
+    print(analyzer.generate_summary(analysis))
+    
+    row_filter = build_time_filter(analysis, "最近3个月的销售趋势")
+    df = analyzer.materialize(files[0], ['date', 'sales'], row_filter)
+    print(f"✓ 筛选读取: {df.attrs['dataset_read']['files']}/{df.attrs['dataset_read']['total_files']} 个文件, {len(df)} 行")
+    
+    # 只有 year/month 分区、没有时间列：窗口从最新分区所在月的月末往前计算，只读取最近3个月的分区
+    monthly = pd.DataFrame({
+        'year': [2023] * 12 + [2024] * 5,
+        'month': list(range(1, 13)) + list(range(1, 6)),
+        'sales': np.arange(17.0),
+    })
+    monthly.to_parquet(test_dir / "monthly", partition_cols=['year', 'month'])
+    monthly_analysis = analyzer.analyze_file(str(test_dir / "monthly"))['analysis']
+    monthly_df = analyzer.materialize(
+        str(test_dir / "monthly"), ['year', 'month', 'sales'],
+        build_time_filter(monthly_analysis, "last 3 months")
+    )
+    monthly_partitions = sorted(zip(monthly_df['year'].astype(int), monthly_df['month'].astype(int)))
+    print(f"✓ 按月分区的最近3个月: {monthly_partitions}")
+    
+    shutil.rmtree(test_dir)
+    
+    return (
+        len(files) == 1
+        and analysis['shape'] == (len(dates), 4)
+        and analysis['dataset']['files'] == 18
+        and analysis['statistics']['year']['max'] == 2024
+        and df.attrs['dataset_read']['files'] == 3
+        and df['date'].min() == pd.Timestamp('2024-04-01')
+        and len(df) == 91
+        and monthly_partitions == [(2024, 3), (2024, 4), (2024, 5)]
+        and monthly_df.attrs['dataset_read']['files'] == 3
+    )
+
+
+def test_excel_sheets():
+    """测试Excel工作表作为独立数据集"""
+    print("\n" + "="*60)
+    print("测试15: Excel工作表")
+    print("="*60)
+    
+    import shutil
+    test_dir = Path("./test_data_excel")
+    test_dir.mkdir(exist_ok=True)
+    workbook = test_dir / "report.xlsx"
+    
+    def write_workbook(offset):
+        with pd.ExcelWriter(workbook) as writer:
+            pd.DataFrame({'x': range(200), 'y': np.arange(200) * 0.5}).to_excel(writer, sheet_name='销售', index=False)
+            pd.DataFrame({'z': range(offset, offset + 20)}).to_excel(writer, sheet_name='库存', index=False)
+    
+    write_workbook(0)
+    analyzer = DataAnalyzer(cache_dir=str(test_dir / "cache"))
+    sheets = analyzer.scan_directory(str(test_dir))
+    print(f"\n✓ 工作表: {sheets}")
+    
+    results = analyzer.analyze_multiple_files(sheets, parallel=True, max_workers=2)
+    shapes = [results[s]['analysis']['shape'] for s in sheets]
+    print(f"✓ 并行解析: {shapes}")
+    
+    # 只修改一个工作表，另一个工作表命中缓存
+    write_workbook(1)
+    cached = [analyzer.analyze_file(s).get('cached', False) for s in sheets]
+    print(f"✓ 修改后缓存命中: {cached}")
+    
+    chunks = list(analyzer.read_data_chunks(sheets[0], chunksize=64))
+    print(f"✓ 流式读取: {[len(c) for c in chunks]}")
+    
+    shutil.rmtree(test_dir)
+    
+    return (
+        [s.split('#')[-1] for s in sheets] == ['销售', '库存']
+        and shapes == [(200, 2), (20, 1)]
+        and cached == [True, False]
+        and [len(c) for c in chunks] == [64, 64, 64, 8]
+    )
+
+
+def test_duplicate_detection():
+    """测试内容重复文件检测"""
+    print("\n" + "="*60)
+    print("测试16: 重复文件检测")
+    print("="*60)
+    
+    from fig_agent.duplicate_finder import find_duplicates, SAMPLE_BYTES
+    
+    import shutil
+    test_dir = Path("./test_data_duplicates")
+    test_dir.mkdir(exist_ok=True)
+    pd.DataFrame({'x': range(100)}).to_csv(test_dir / "a.csv", index=False)
+    shutil.copy(test_dir / "a.csv", test_dir / "b.csv")
+    shutil.copy(test_dir / "a.csv", test_dir / "a.txt")
+    
+    # 两个大文件只在抽样范围之外不同，需要完整哈希才能区分
+    content = bytearray(b"0123456789\n" * (SAMPLE_BYTES // 2))
+    (test_dir / "big1.csv").write_bytes(bytes(content))
+    content[SAMPLE_BYTES + 5] = ord('x')
+    (test_dir / "big2.csv").write_bytes(bytes(content))
+    shutil.copy(test_dir / "big1.csv", test_dir / "big3.csv")
+    
+    files = sorted(str(p) for p in test_dir.iterdir())
+    duplicates = find_duplicates(files)
+    print(f"\n✓ 重复文件: {duplicates}")
+    
+    # 计算完整哈希时读取失败的文件被跳过，不影响其余文件
+    from fig_agent import duplicate_finder
+    content_hash = duplicate_finder.file_content_hash
+    
+    def failing_hash(path):
+        if path.endswith("big1.csv"):
+            raise PermissionError(13, "Permission denied", path)
+        return content_hash(path)
+    
+    duplicate_finder.file_content_hash = failing_hash
+    try:
+        skipped = find_duplicates(files)
+    finally:
+        duplicate_finder.file_content_hash = content_hash
+    print(f"✓ big1.csv 读取失败时: {skipped}")
+    
+    shutil.rmtree(test_dir)
+    
+    return duplicates == {
+        str(test_dir / "b.csv"): str(test_dir / "a.csv"),
+        str(test_dir / "big3.csv"): str(test_dir / "big1.csv")
+    } and skipped == {str(test_dir / "b.csv"): str(test_dir / "a.csv")}
+
+
+def test_http_pool():
+    """测试LLM客户端的keep-alive连接池"""
+    print("\n" + "="*60)
+    print("测试17: HTTP连接池")
+    print("="*60)
+    
+    from concurrent.futures import ThreadPoolExecutor
+    from fig_agent.llm_client import DeepSeekClient
+    from fig_agent.mock_server import start_chat_server
+    
+    server, url = start_chat_server(delay=0.01)
+    client = DeepSeekClient("test-key", base_url=url.rsplit('/chat/completions', 1)[0], pool_size=2)
+    messages = [{"role": "user", "content": "ping"}]
+    
+    replies = [client.chat_completion(messages) for _ in range(3)]
+    sequential = client.http.stats['new_connections']
+    with ThreadPoolExecutor(2) as executor:
+        replies += list(executor.map(lambda _: client.chat_completion(messages), range(6)))
+    print(f"\n✓ 请求数: {client.http.stats['requests']}, 新建连接: {client.http.stats['new_connections']}")
+    print(f"✓ 最近一次耗时: {client.last_timing}")
+    
+    client.close()
+    server.shutdown()
+    
+    return (
+        replies == ['ok'] * 9
+        and sequential == 1
+        and client.http.stats['new_connections'] <= 2
+        and set(client.last_timing) >= {'connect', 'ttfb', 'transfer', 'total'}
+    )
+
+
+def test_streaming_completion():
+    """测试流式接收回复并在代码块结束时提前断开"""
+    print("\n" + "="*60)
+    print("测试18: 流式生成")
+    print("="*60)
+    
+    from fig_agent.llm_client import DeepSeekClient
+    from fig_agent.sse_stream import CodeFenceTracker
+    from fig_agent.mock_server import start_chat_server
+    
+    # 代码块的结束标记被拆在两段文本中
+    tracker = CodeFenceTracker()
+    pieces = ["说明\n``", "`python\nx = 1\n", "y = 2\n`", "``\n后续说明"]
+    emitted = ''.join(tracker.feed(piece) for piece in pieces)
+    print(f"\n✓ 增量输出的代码: {emitted!r}")
+    
+    code = "import matplotlib.pyplot as plt\nplt.plot([1, 2, 3])\nplt.savefig('output.png')"
+    reply = f"Here you go:\n```python\n{code}\n```\n" + "Explanation. " * 200
+    server, url = start_chat_server(0.01, reply=reply, token_delay=0.002)
+    client = DeepSeekClient("test-key", base_url=url.rsplit('/chat/completions', 1)[0])
+    
+    buffered = client.generate_visualization_code("summary")
+    deltas, completed = [], []
+    streamed = client.generate_visualization_code(
+        "summary", on_code_delta=deltas.append, on_code_complete=completed.append
+    )
+    print(f"✓ 收到 {len(deltas)} 段代码增量, 耗时: {client.last_timing}")
+    
+    client.close()
+    server.shutdown()
+    
+    return (
+        emitted == "x = 1\ny = 2" and tracker.complete
+        and buffered == streamed == code
+        and completed == [code]
+        and ''.join(deltas).strip() == code
+        and client.last_timing.get('stopped_early') is True
+    )
+
+
+def test_async_generation():
+    """测试异步接口的并发生成与并发上限"""
+    print("\n" + "="*60)
+    print("测试19: 异步并发生成")
+    print("="*60)
+    
+    import asyncio
+    import time
+    from fig_agent.llm_client import DeepSeekClient
+    from fig_agent.mock_server import start_chat_server
+    
+    server, url = start_chat_server(0.2, reply="建议:\n柱状图 - 比较类别\n```python\nx = 1\n```")
+    client = DeepSeekClient("test-key", base_url=url.rsplit('/chat/completions', 1)[0], max_concurrency=3)
+    
+    async def generate_all():
+        codes = asyncio.gather(*[client.generate_visualization_code_async(f"file_{i}") for i in range(6)])
+        suggestions = client.suggest_visualizations_async("summary")
+        return await codes, await suggestions
+    
+    start = time.perf_counter()
+    codes, suggestions = asyncio.run(generate_all())
+    elapsed = time.perf_counter() - start
+    print(f"\n✓ 并发生成 6 份代码和 1 组建议, 耗时 {elapsed:.2f}s (逐个调用约 1.4s)")
+    print(f"✓ 新建连接: {client.http.stats['new_connections']}")
+    
+    client.close()
+    server.shutdown()
+    
+    return (
+        codes == ["x = 1"] * 6
+        and suggestions == ["柱状图 - 比较类别"]
+        and 0.6 <= elapsed < 1.2
+        and client.http.stats['new_connections'] <= 3
+    )
+
+
+def test_llm_cache():
+    """测试LLM响应缓存的内存/磁盘命中、跳过、过期和大小淘汰"""
+    print("\n" + "="*60)
+    print("测试20: LLM响应缓存")
+    print("="*60)
+    
+    import tempfile
+    import time
+    from fig_agent.llm_client import DeepSeekClient
+    from fig_agent.llm_cache import LLMCache, request_key
+    from fig_agent.mock_server import start_chat_server
+    
+    server, url = start_chat_server(0.01, reply="```python\nx = 1\n```")
+    base_url = url.rsplit('/chat/completions', 1)[0]
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        client = DeepSeekClient("test-key", base_url=base_url, cache_dir=cache_dir)
+        codes = [client.generate_visualization_code("summary") for _ in range(2)]
+        completed = []
+        codes.append(client.generate_visualization_code("summary", on_code_complete=completed.append))
+        codes.append(client.generate_visualization_code("summary", fresh=True))
+        first_stats = client.cache.summary()
+        first_requests = client.http.stats['requests']
+        client.close()
+        
+        # 新的客户端从磁盘缓存读取
+        client = DeepSeekClient("test-key", base_url=base_url, cache_dir=cache_dir)
+        codes.append(client.generate_visualization_code("summary"))
+        disk_stats = client.cache.summary()
+        second_requests = client.http.stats['requests']
+        client.close()
+        print(f"\n✓ 第一个客户端: 请求 {first_requests} 次, {first_stats}")
+        print(f"✓ 第二个客户端: 请求 {second_requests} 次, {disk_stats}")
+        
+        # 不使用内存层，直接检查磁盘上的淘汰和过期
+        cache = LLMCache(cache_dir, ttl=0.2, max_bytes=2500, memory_entries=0)
+        cache.clear()
+        cache.put('old', 'a' * 1000)
+        cache.put('new', 'b' * 1000)
+        cache.get('old')
+        cache.put('newest', 'c' * 1000)
+        evicted = cache.get('new') is None and cache.get('old') is not None
+        cache.put('short', 'x')
+        time.sleep(0.3)
+        expired = cache.get('short') is None
+        print(f"✓ 大小淘汰: {evicted}, 过期失效: {expired}, 磁盘大小: {cache.size()} 字节")
+        cache.close()
+    
+    server.shutdown()
+    
+    key = request_key('m', [{'role': 'user', 'content': 'hi'}], 0.3, 10)
+    same_key = request_key('m', [{'content': 'hi', 'role': 'user'}], 0.3, 10)
+    
+    return (
+        codes == ["x = 1"] * 5
+        and completed == ["x = 1"]
+        and first_requests == 2 and second_requests == 0
+        and first_stats['memory_hits'] == 2 and first_stats['bypassed'] == 1
+        and disk_stats['disk_hits'] == 1
+        and evicted and expired
+        and key == same_key
+    )
+
+
+def test_prompt_prefix_cache():
+    """测试静态提示前缀和服务端上下文缓存命中token的统计"""
+    print("\n" + "="*60)
+    print("测试21: 上下文缓存命中统计")
+    print("="*60)
+    
+    from fig_agent.llm_client import DeepSeekClient
+    from fig_agent.token_usage import parse_usage
+    from fig_agent.mock_server import start_chat_server
+    
+    server, url = start_chat_server(0.0, reply="```python\nx = 1\n```")
+    client = DeepSeekClient("test-key", base_url=url.rsplit('/chat/completions', 1)[0])
+    
+    sent = []
+    original = client.chat_completion
+    client.chat_completion = lambda messages, **kwargs: sent.append(messages) or original(messages, **kwargs)
+    
+    client.generate_visualization_code("列: a, b\n行数: 10")
+    first = client.last_usage
+    client.generate_visualization_code("列: c\n行数: 99")
+    second = client.last_usage
+    client.generate_visualization_code("列: c\n行数: 99", previous_code="x = 1", feedback="KeyError")
+    retry = client.last_usage
+    client.generate_visualization_code("列: c\n行数: 99", on_code_complete=lambda code: None)
+    streamed = client.last_usage
+    totals = client.usage.summary()
+    print(f"\n✓ 首次: {first}")
+    print(f"✓ 换一个文件: {second}")
+    print(f"✓ 重试: {retry}")
+    print(f"✓ 会话合计: {totals}")
+    
+    client.close()
+    server.shutdown()
+    
+    # 两个文件的消息在数据摘要之前逐字节相同
+    prefix = sent[0][1]['content'].split("Data Summary:")[0]
+    same_prefix = sent[0][0] == sent[1][0] and sent[1][1]['content'].startswith(prefix + "Data Summary:")
+    
+    openai_usage = parse_usage({'prompt_tokens': 100, 'completion_tokens': 5, 'prompt_tokens_details': {'cached_tokens': 64}})
+    print(f"✓ OpenAI格式: {openai_usage}")
+    
+    return (
+        same_prefix
+        and first['cache_hit_tokens'] == 0
+        and second['cache_hit_tokens'] > 0.8 * second['prompt_tokens']
+        and retry['cache_hit_tokens'] >= second['prompt_tokens'] - 64
+        and streamed is None and totals['unreported'] == 1  # 代码块结束后提前断开，收不到 usage
+        and totals['calls'] == 4
+        and openai_usage['cache_hit_tokens'] == 64 and openai_usage['cache_miss_tokens'] == 36
+    )
+
+
+def test_rate_limit_and_retry():
+    """测试客户端限流、可重试错误的判断和 Retry-After"""
+    print("\n" + "="*60)
+    print("测试22: 限流与重试退避")
+    print("="*60)
+    
+    import tempfile
+    import time
+    from email.utils import formatdate
+    from fig_agent.llm_client import DeepSeekClient
+    from fig_agent.rate_limit import RateLimiter, parse_retry_after
+    from fig_agent.mock_server import start_chat_server
+    
+    messages = [{"role": "user", "content": "ping"}]
+    
+    # 503 和 429 重试后成功，Retry-After 决定最短等待时间
+    server, url = start_chat_server(0.0, failures=[503, 429], retry_after="0.2")
+    client = DeepSeekClient("test-key", base_url=url.rsplit('/chat/completions', 1)[0], backoff_base=0.01)
+    start = time.perf_counter()
+    reply = client.chat_completion(messages, max_retries=3)
+    elapsed = time.perf_counter() - start
+    retried = dict(client.call_stats)
+    print(f"\n✓ 重试后成功: {reply!r}, 耗时 {elapsed:.2f}s, {retried}")
+    client.close()
+    server.shutdown()
+    
+    # 过长的 Retry-After 被限制为 retry_after_max
+    server, url = start_chat_server(0.0, failures=[429], retry_after="3600")
+    client = DeepSeekClient(
+        "test-key", base_url=url.rsplit('/chat/completions', 1)[0], backoff_base=0.01, retry_after_max=0.2
+    )
+    start = time.perf_counter()
+    clamped_reply = client.chat_completion(messages, max_retries=2)
+    clamped = time.perf_counter() - start
+    print(f"✓ Retry-After=3600 限制为0.2秒: {clamped_reply!r}, 耗时 {clamped:.2f}s")
+    client.close()
+    server.shutdown()
+    
+    # 400 不重试
+    server, url = start_chat_server(0.0, failures=[400, 400])
+    client = DeepSeekClient("test-key", base_url=url.rsplit('/chat/completions', 1)[0], backoff_base=0.01)
+    try:
+        client.chat_completion(messages, max_retries=3)
+        rejected = False
+    except Exception as e:
+        rejected = '400' in str(e)
+    not_retried = client.call_stats['retried'] == 0 and client.http.stats['requests'] == 1
+    print(f"✓ 400错误直接失败: {rejected}, 未重试: {not_retried}")
+    client.close()
+    server.shutdown()
+    
+    # 两个限流器共享同一个状态文件，合计每秒10个请求
+    with tempfile.TemporaryDirectory() as state_dir:
+        limiters = [RateLimiter(requests_per_minute=600, scope='test', state_dir=state_dir) for _ in range(2)]
+        start = time.perf_counter()
+        waits = [limiters[i % 2].acquire() for i in range(15)]
+        limited = time.perf_counter() - start
+    print(f"✓ 15个请求（容量10，每秒10个）耗时 {limited:.2f}s, 等待次数 {sum(1 for w in waits if w)}")
+    
+    http_date = parse_retry_after(formatdate(time.time() + 30, usegmt=True))
+    print(f"✓ Retry-After HTTP日期: {http_date:.0f}s")
+    
+    return (
+        reply == 'ok' and retried['retried'] == 2 and retried['rate_limited'] == 1
+        and elapsed >= 0.4
+        and clamped_reply == 'ok' and 0.2 <= clamped < 1.5
+        and rejected and not_retried
+        and 0.4 <= limited < 1.5
+        and 25 <= http_date <= 30
+    )
+
+
+def test_call_ledger():
+    """测试LLM调用记录、JSON Lines 输出和 get_history 中的汇总"""
+    print("\n" + "="*60)
+    print("测试23: LLM调用记录")
+    print("="*60)
+    
+    import os
+    import json
+    import tempfile
+    from fig_agent.visualization_agent import VisualizationAgent
+    from fig_agent.mock_server import start_chat_server
+    
+    server, url = start_chat_server(0.01, reply="建议:\n柱状图 - 比较\n```python\ntotal = 1 + 1\n```")
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_file = os.path.join(tmpdir, 'data.csv')
+        pd.DataFrame({'a': range(10), 'b': list('xy') * 5}).to_csv(data_file, index=False)
+        ledger_file = os.path.join(tmpdir, 'calls.jsonl')
+        agent = VisualizationAgent("test-key", output_dir=os.path.join(tmpdir, 'out'), llm_options={
+            'base_url': url.rsplit('/chat/completions', 1)[0],
+            'ledger_path': ledger_file,
+            'prices': {'cache_hit_tokens': 0.1, 'cache_miss_tokens': 1.0, 'completion_tokens': 2.0},
+        })
+        agent.load_data([data_file])
+        agent.suggest_visualizations()
+        result = agent.generate_visualization()
+        agent.refine_visualization("更大的字体")
+        agent.generate_all_visualizations()
+        
+        history = agent.get_history()
+        with open(ledger_file, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        agent.llm_client.close()
+    server.shutdown()
+    
+    # 并发的调用：LLM耗时按时间段的并集计算，耗时之和与平均耗时按各次调用计算
+    from fig_agent.call_ledger import CallLedger
+    ledger = CallLedger()
+    for started, latency in [(100.0, 2.0), (101.0, 2.0), (101.5, 0.5), (110.0, 1.0)]:
+        call = ledger.start('speculative', 'deepseek-chat', True)
+        call.pop('_clock')
+        call.update(started=started, latency=latency)
+        ledger.records.append(call)
+    overlapping = ledger.summary()['total']
+    
+    # 流式生成在代码块结束后断开，收不到 usage：调用记录中为估算的 token 数和费用
+    from fig_agent.llm_client import DeepSeekClient
+    server, url = start_chat_server(
+        0.0, reply="```python\nplt.plot([1, 2])\n```\n" + "说明" * 200, token_delay=0.001
+    )
+    client = DeepSeekClient("test-key", base_url=url.rsplit('/chat/completions', 1)[0], prices={'cache_miss_tokens': 1.0})
+    client.chat_completion(
+        [{"role": "user", "content": "画一条折线"}], stream=True, stop_after_code=True, purpose='generate'
+    )
+    estimated = client.ledger.records[-1]
+    estimated_summary = client.ledger.summary()['total']
+    client.close()
+    server.shutdown()
+    print(f"✓ 提前断开的调用: stopped_early={estimated['stopped_early']}, "
+          f"usage_estimated={estimated['usage_estimated']}, prompt_tokens={estimated['prompt_tokens']}, "
+          f"completion_tokens={estimated['completion_tokens']}, cost={estimated.get('cost')}")
+    print(f"✓ 并发调用: llm_seconds={overlapping['llm_seconds']}, "
+          f"llm_seconds_summed={overlapping['llm_seconds_summed']}, mean_latency={overlapping['mean_latency']}")
+    
+    summary = history['llm_calls']
+    print(f"\n✓ 调用合计: {summary['total']}")
+    print(f"✓ 按用途: { {k: v['calls'] for k, v in summary['by_purpose'].items()} }")
+    print(f"✓ 耗时对比: {history['timing']}")
+    print(f"✓ JSONL 第一条: {lines[0]}")
+    
+    return (
+        result['success']
+        and set(summary['by_purpose']) == {'suggest', 'generate', 'refine', 'combined'}
+        and summary['total']['calls'] == len(lines) == 4
+        and summary['total']['prompt_tokens'] > 0 and summary['total']['cost'] > 0
+        and all(line['ttfb'] is not None and line['latency'] >= line['ttfb'] for line in lines)
+        and history['timing']['llm_seconds'] > 0 and history['timing']['execution_seconds'] > 0
+        and overlapping['llm_seconds'] == 4.0 and overlapping['llm_seconds_summed'] == 5.5
+        and overlapping['mean_latency'] == 5.5 / 4
+        and estimated['stopped_early'] and estimated['usage_estimated']
+        and estimated['prompt_tokens'] > 0 and estimated['completion_tokens'] > 0 and estimated['cost'] > 0
+        and estimated_summary['estimated_usage'] == 1 and estimated_summary['unreported_usage'] == 0
+        and not any(line['usage_estimated'] for line in lines)
+    )
+
+
+def test_record_replay_transport():
+    """测试录制/回放传输和本地替身接口"""
+    print("\n" + "="*60)
+    print("测试24: 录制/回放传输")
+    print("="*60)
+    
+    import os
+    import tempfile
+    from fig_agent.llm_client import DeepSeekClient
+    from fig_agent.mock_server import start_chat_server
+    
+    reply = "Here:\n```python\nx = 1\n```\nThe end."
+    messages = [{'role': 'user', 'content': 'plot'}]
+    server, url = start_chat_server(0.0, reply=reply)
+    base_url = url.rsplit('/chat/completions', 1)[0]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fixture_dir = os.path.join(tmpdir, 'fixtures')
+        recorder = DeepSeekClient("test-key", base_url=base_url, transport='record', fixture_dir=fixture_dir)
+        recorded = recorder.chat_completion(messages, stream=True, stop_after_code=True)
+        recorder.close()
+        server.shutdown()
+        fixtures = os.listdir(fixture_dir)
+        print(f"✓ 录制: {recorded!r}, 夹具文件: {fixtures}")
+        
+        # 替身接口已关闭，回放不访问网络；流式和非流式请求使用同一个夹具
+        player = DeepSeekClient(
+            "test-key", base_url=base_url, transport='replay', fixture_dir=fixture_dir,
+            replay_latency=0.1, replay_token_delay=0.001
+        )
+        code = []
+        streamed = player.chat_completion(messages, stream=True, on_code_complete=code.append)
+        stream_timing = player.last_timing
+        buffered = player.chat_completion(messages)
+        print(f"✓ 回放: 流式 {streamed!r}, 代码 {code}, 耗时 {stream_timing}")
+        try:
+            player.chat_completion([{'role': 'user', 'content': 'unknown'}], max_retries=3)
+            missing_error = None
+        except Exception as e:
+            missing_error = str(e)
+        print(f"✓ 未录制的请求: {missing_error}")
+        stats = player.http.stats
+        player.close()
+        
+        # 替身接口从夹具目录回复
+        fixture_server, fixture_url = start_chat_server(0.0, fixtures=fixture_dir)
+        client = DeepSeekClient("test-key", base_url=fixture_url.rsplit('/chat/completions', 1)[0])
+        served = client.chat_completion(messages)
+        try:
+            client.chat_completion([{'role': 'user', 'content': 'unknown'}])
+            served_missing = False
+        except Exception as e:
+            served_missing = '404' in str(e)
+        client.close()
+        fixture_server.shutdown()
+        print(f"✓ 替身接口回复夹具: {served!r}")
+    
+    return (
+        # 录制时客户端在代码块结束后停止，夹具中仍保存完整回复
+        reply.startswith(recorded) and len(recorded) < len(reply)
+        and streamed == buffered == served == reply
+        and len(fixtures) == 1
+        and code == ['x = 1']
+        and stream_timing['ttfb'] >= 0.1
+        and missing_error is not None and '404' in missing_error
+        and stats == {'requests': 3, 'new_connections': 0, 'missing': 1}
+        and served_missing
+    )
+
+
+def test_speculative_candidates():
+    """测试同时生成多个候选代码、采用第一个执行成功的"""
+    print("\n" + "="*60)
+    print("测试25: 推测式候选代码")
+    print("="*60)
+    
+    import os
+    import time
+    import tempfile
+    from fig_agent.visualization_agent import VisualizationAgent
+    from fig_agent.mock_server import start_chat_server
+    
+    failing = "```python\nplt.plot(df['missing'])\nplt.savefig('output.png')\n```"
+    slow = "```python\nimport time\ntime.sleep(30)\nplt.plot(df['a'])\nplt.savefig('output.png')\n```"
+    fast = "```python\nplt.plot(df['a'])\nplt.savefig('output.png')\n```"
+    
+    def by_temperature(request):
+        # 第1个候选执行失败，第2个执行很慢，第3个很快成功
+        return {0.3: failing, 0.6: slow}.get(request['temperature'], fast)
+    
+    def repair_only(request):
+        # 所有候选都失败，只有带上错误信息的修复请求成功
+        return "```python\nplt.plot(df['a'])\n```" if 'Previous Code' in request['messages'][-1]['content'] else failing
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_file = os.path.join(tmpdir, 'data.csv')
+        pd.DataFrame({'a': range(10), 'b': list('xy') * 5}).to_csv(data_file, index=False)
+        for name, responder in [('race', by_temperature), ('repair', repair_only)]:
+            server, url = start_chat_server(0.05, responder=responder)
+            output_dir = os.path.join(tmpdir, name)
+            agent = VisualizationAgent("test-key", output_dir=output_dir, llm_options={
+                'base_url': url.rsplit('/chat/completions', 1)[0]
+            })
+            agent.load_data([data_file])
+            start = time.perf_counter()
+            result = agent.generate_visualization(candidates=3)
+            elapsed = time.perf_counter() - start
+            calls = agent.get_history()['llm_calls']['by_purpose']
+            agent.llm_client.close()
+            server.shutdown()
+            # 返回的路径在临时目录删除后仍然存在
+            outputs_exist = all(
+                os.path.exists(f) for f in result.get('output_files', []) + [result.get('output_file')] if f
+            )
+            results[name] = (result, elapsed, sorted(os.listdir(output_dir)), calls, outputs_exist)
+            print(f"✓ {name}: 成功={result['success']}, 耗时={elapsed:.2f}s, 输出={results[name][2]}, "
+                  f"调用={ {k: v['calls'] for k, v in calls.items()} }")
+    
+    race, race_elapsed, race_files, _, race_outputs_exist = results['race']
+    repair, _, repair_files, repair_calls, repair_outputs_exist = results['repair']
+    return (
+        race['success'] and race['candidate'] == 2 and race['code'] in fast
+        # 较慢的候选被终止，不必等待它执行完（包括首次启动 forkserver 的时间）
+        and race_elapsed < 10
+        and race_files == ['visualization_0.png']
+        and race_outputs_exist and os.path.basename(race['output_file']) == 'visualization_0.png'
+        and repair['success'] and 'candidate' not in repair
+        and repair_calls['speculative']['calls'] == 3 and repair_calls['generate']['calls'] == 1
+        # 逐次修复（与 candidates=1 相同的执行路径）的图片同样保存在输出目录中
+        and repair_files == ['visualization_0.png']
+        and repair_outputs_exist and os.path.basename(repair['output_file']) == 'visualization_0.png'
+        and os.path.basename(os.path.dirname(repair['output_file'])) == 'repair'
+    )
+
+
+def test_time_window_parsing():
+    """测试需求中时间窗口的解析：只接受带明确数量的窗口"""
+    print("\n" + "="*60)
+    print("测试26: 时间窗口解析")
+    print("="*60)
+    
+    from fig_agent.parquet_dataset import parse_chinese_number, parse_time_window
+    
+    expected = {
+        "最近3个月的销售趋势": pd.DateOffset(months=3),
+        "last 2 weeks": pd.DateOffset(weeks=2),
+        "过去二十天": pd.DateOffset(days=20),
+        "近十五天的变化": pd.DateOffset(days=15),
+        "最近二十五天": pd.DateOffset(days=25),
+        "最近两个季度": pd.DateOffset(months=6),
+        # 没有明确数量的普通描述不应被当成筛选条件
+        "show recent years": None,
+        "the last day of each month": None,
+        "近年来的变化": None,
+        "接近3天的波动": None,
+        "Compare blast 3 days": None,
+    }
+    parsed = {text: parse_time_window(text) for text in expected}
+    for text, window in parsed.items():
+        print(f"✓ {text!r} -> {window}")
+    numbers = [parse_chinese_number(text) for text in ['三', '十', '十五', '二十', '二十五', '九十九', '三三']]
+    print(f"✓ 中文数字: {numbers}")
+    
+    return parsed == expected and numbers == [3, 10, 15, 20, 25, 99, None]
+
+
+def test_directory_scanner():
+    """测试目录扫描：跳过的目录、后缀过滤、清单复用和文件增删改"""
+    print("\n" + "="*60)
+    print("测试27: 目录扫描")
+    print("="*60)
+    
+    import os
+    import tempfile
+    import time
+    from fig_agent.directory_scanner import DirectoryScanner
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir) / "data"
+        for rel_path in ['a.csv', 'b.xlsx', 'notes.txt', 'sub/c.CSV', 'sub/deep/d.csv',
+                         '.git/x.csv', 'node_modules/y.csv', '__pycache__/z.csv']:
+            (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+            (root / rel_path).write_text("x\n1\n")
+        
+        def relative(files):
+            return sorted(os.path.relpath(f, root).replace(os.sep, '/') for f in files)
+        
+        scanner = DirectoryScanner(['.csv', '.xlsx'], manifest_path=str(Path(tmpdir) / "manifest.json"))
+        first = relative(scanner.scan(str(root)))
+        first_stats = scanner.last_stats
+        print(f"✓ 首次扫描: {first} {first_stats}")
+        
+        shallow = relative(DirectoryScanner(['.csv', '.xlsx'], max_depth=0).scan(str(root)))
+        print(f"✓ max_depth=0: {shallow}")
+        
+        second = relative(scanner.scan(str(root)))
+        second_stats = scanner.last_stats
+        print(f"✓ 未改动时再次扫描: {second_stats}")
+        
+        # 目录修改时间的精度有限，等待后再改动，保证改动后的修改时间不同
+        time.sleep(0.05)
+        (root / "sub" / "e.csv").write_text("x\n2\n")
+        with open(root / "a.csv", 'a') as f:
+            f.write("3\n")
+        (root / "sub" / "deep" / "d.csv").unlink()
+        third = relative(scanner.scan(str(root)))
+        third_stats = scanner.last_stats
+        print(f"✓ 增删改后扫描: {third} {third_stats}")
+    
+    return (
+        first == ['a.csv', 'b.xlsx', 'sub/c.CSV', 'sub/deep/d.csv']
+        and first_stats == {'dirs_listed': 3, 'dirs_reused': 0, 'files': 4}
+        and shallow == ['a.csv', 'b.xlsx']
+        and second == first and second_stats == {'dirs_listed': 0, 'dirs_reused': 3, 'files': 4}
+        # 只修改文件内容不改变目录的修改时间，根目录的记录仍被复用
+        and third == ['a.csv', 'b.xlsx', 'sub/c.CSV', 'sub/e.csv']
+        and third_stats == {'dirs_listed': 2, 'dirs_reused': 1, 'files': 4}
+    )
+
+
+def test_compact_dataframe():
+    """测试内存压缩：数值降精度、低基数字符串转category，压缩前后取值不变"""
+    print("\n" + "="*60)
+    print("测试28: 内存压缩")
+    print("="*60)
+    
+    rng = np.random.default_rng(0)
+    n = 1000
+    df = pd.DataFrame({
+        '小整数': rng.integers(0, 100, n),
+        '负整数': rng.integers(-1000, 1000, n),
+        '大整数': rng.integers(0, 2**40, n),
+        # 0.25 的倍数可以用 float32 精确表示，带缺失值
+        '可降精度浮点': np.where(rng.random(n) < 0.1, np.nan, rng.integers(0, 400, n) / 4),
+        '高精度浮点': rng.random(n),
+        '低基数字符串': rng.choice(['华东', '华南', '华北'], n),
+        '高基数字符串': [f"id_{i}" for i in range(n)],
+        '布尔': rng.random(n) < 0.5,
+    })
+    
+    compacted = DataAnalyzer(category_threshold=0.5).compact_dataframe(df)
+    dtypes = {col: str(dtype) for col, dtype in compacted.dtypes.items()}
+    print(f"✓ 压缩后类型: {dtypes}")
+    print(f"✓ 内存: {compacted.attrs['memory']}")
+    
+    # 还原为原类型后逐值比较，缺失值位置也必须一致
+    try:
+        pd.testing.assert_frame_equal(compacted.astype(df.dtypes.to_dict()), df)
+        unchanged = True
+    except AssertionError as e:
+        print(f"✗ 压缩后取值改变: {e}")
+        unchanged = False
+    print(f"✓ 取值不变: {unchanged}")
+    
+    return (
+        unchanged
+        and dtypes['小整数'] == 'uint8' and dtypes['负整数'] == 'int16' and dtypes['大整数'] == 'uint64'
+        and dtypes['可降精度浮点'] == 'float32' and dtypes['高精度浮点'] == 'float64'
+        and dtypes['低基数字符串'] == 'category' and dtypes['高基数字符串'] != 'category'
+        and dtypes['布尔'] == 'bool'
+        and compacted['可降精度浮点'].isna().sum() == df['可降精度浮点'].isna().sum()
+        and compacted.attrs['memory']['after'] < compacted.attrs['memory']['before']
+    )
+
+
+def test_vectorized_statistics():
+    """测试向量化统计与逐列循环的旧实现结果一致，样例数据中的缺失值为None"""
+    print("\n" + "="*60)
+    print("测试29: 向量化统计与逐列循环一致")
+    print("="*60)
+    
+    from fig_agent.benchmark import _legacy_analyze_dataframe
+    
+    rng = np.random.default_rng(1)
+    n = 2000
+    values = rng.standard_normal((n, 6))
+    values[rng.random((n, 6)) < 0.05] = np.nan
+    df = pd.DataFrame(values, columns=[f'数值{i}' for i in range(6)])
+    df['整数'] = rng.integers(-50, 50, n)
+    df['全空'] = np.nan
+    df['单值'] = 1.5
+    df['可空整数'] = pd.array(np.where(rng.random(n) < 0.1, None, rng.integers(0, 9, n)), dtype='Int64')
+    labels = np.array(['甲', '乙', '丙', '丁', '戊', '己', '庚'], dtype=object)
+    weights = [0.3, 0.22, 0.16, 0.12, 0.09, 0.07, 0.04]
+    for i in range(3):
+        column = rng.choice(labels, n, p=weights)
+        column[rng.random(n) < 0.05] = None
+        df[f'分类{i}'] = column
+    df['日期'] = pd.date_range('2024-01-01', periods=n, freq='h')
+    df.loc[0, ['数值0', '分类0', '日期']] = [np.nan, None, pd.NaT]
+    
+    analysis = DataAnalyzer().analyze_dataframe(df)
+    expected = _legacy_analyze_dataframe(df)
+    
+    def same(a, b):
+        if isinstance(a, dict):
+            return isinstance(b, dict) and a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+        if a is None or b is None:
+            return a is b
+        return bool(np.isclose(a, b, rtol=1e-9, atol=1e-12))
+    
+    mismatched = [col for col in expected if not same(analysis['statistics'].get(col), expected[col])]
+    print(f"✓ 比较 {len(expected)} 列，不一致: {mismatched}")
+    
+    # 相等但类型不同的值（1 与 True）在不同列中分别计数，各列保留自己的取值
+    mixed = pd.DataFrame({'a': [1, 1, 'x'], 'b': [True, True, 'y']})
+    mixed_top = {
+        col: list(stats['top_values'].items())
+        for col, stats in DataAnalyzer().analyze_dataframe(mixed)['statistics'].items()
+    }
+    print(f"✓ 混合类型列的高频值: {mixed_top}")
+    mixed_ok = (
+        mixed_top == {'a': [(1, 2), ('x', 1)], 'b': [(True, 2), ('y', 1)]}
+        and type(mixed_top['b'][0][0]) is bool and type(mixed_top['a'][0][0]) is int
+    )
+    
+    first = analysis['sample_data'][0]
+    print(f"✓ 首行样例: {first}")
+    missing_as_none = first['数值0'] is None and first['分类0'] is None and first['日期'] is None
+    
+    return not mismatched and analysis['statistics'].keys() == expected.keys() and missing_as_none and mixed_ok
+
+
 def run_all_tests():
     """运行所有测试"""
     print("\n" + "="*70)
@@ -148,7 +1428,33 @@ def run_all_tests():
     tests = [
         ("数据分析模块", test_data_analyzer),
         ("代码执行模块", test_code_executor),
-        ("数据加载功能", test_data_loading)
+        ("数据加载功能", test_data_loading),
+        ("并行加载", test_parallel_loading),
+        ("流式分析", test_streaming_analysis),
+        ("格式探测", test_dialect_sniffing),
+        ("分析缓存", test_analysis_cache),
+        ("近似统计", test_approximate_profiling),
+        ("延迟加载", test_lazy_loading),
+        ("列裁剪", test_column_pruning),
+        ("增量重新分析", test_incremental_reload),
+        ("pyarrow读取引擎", test_arrow_engine),
+        ("压缩文件与归档", test_compressed_files),
+        ("分区数据集", test_partitioned_dataset),
+        ("Excel工作表", test_excel_sheets),
+        ("重复文件检测", test_duplicate_detection),
+        ("HTTP连接池", test_http_pool),
+        ("流式生成", test_streaming_completion),
+        ("异步并发生成", test_async_generation),
+        ("LLM响应缓存", test_llm_cache),
+        ("上下文缓存命中统计", test_prompt_prefix_cache),
+        ("限流与重试退避", test_rate_limit_and_retry),
+        ("LLM调用记录", test_call_ledger),
+        ("录制/回放传输", test_record_replay_transport),
+        ("推测式候选代码", test_speculative_candidates),
+        ("时间窗口解析", test_time_window_parsing),
+        ("目录扫描", test_directory_scanner),
+        ("内存压缩", test_compact_dataframe),
+        ("向量化统计", test_vectorized_statistics)
     ]
     
     results = []
@@ -0,0 +1,64 @@
+"""Token 用量统计模块
+
+解析接口返回的 usage 字段，区分命中服务端上下文缓存（按前缀匹配）的输入 token
+和未命中的输入 token，并累计整个会话的用量。
+DeepSeek 返回 prompt_cache_hit_tokens / prompt_cache_miss_tokens，
+OpenAI 兼容接口返回 prompt_tokens_details.cached_tokens，两种格式都支持。
+"""
+import threading
+from typing import Any, Dict, Optional
+
+USAGE_FIELDS = ['prompt_tokens', 'cache_hit_tokens', 'cache_miss_tokens', 'completion_tokens']
+
+
+def parse_usage(usage: Optional[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    """把接口返回的 usage 统一为 USAGE_FIELDS 各项，没有 usage 时返回 None"""
+    if not usage:
+        return None
+    prompt = usage.get('prompt_tokens') or 0
+    hit = usage.get('prompt_cache_hit_tokens')
+    if hit is None:
+        hit = (usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0
+    miss = usage.get('prompt_cache_miss_tokens')
+    if miss is None:
+        miss = prompt - hit
+    return {
+        'prompt_tokens': prompt,
+        'cache_hit_tokens': hit,
+        'cache_miss_tokens': miss,
+        'completion_tokens': usage.get('completion_tokens') or 0,
+    }
+
+
+def format_usage(usage: Dict[str, int]) -> str:
+    return (
+        f"输入 {usage['prompt_tokens']} tokens (缓存命中 {usage['cache_hit_tokens']}, "
+        f"未命中 {usage['cache_miss_tokens']}), 输出 {usage['completion_tokens']} tokens"
+    )
+
+
+class UsageTotals:
+    """累计多次调用的 token 用量，可在多个线程间共享"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.unreported = 0
+        self.tokens = dict.fromkeys(USAGE_FIELDS, 0)
+
+    def add(self, usage: Optional[Dict[str, int]]):
+        """累计一次调用，usage 为None（如流式接收提前断开）时只计入未报告的调用数"""
+        with self._lock:
+            self.calls += 1
+            if usage is None:
+                self.unreported += 1
+                return
+            for field in USAGE_FIELDS:
+                self.tokens[field] += usage[field]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            result = dict(self.tokens, calls=self.calls, unreported=self.unreported)
+        prompt = result['prompt_tokens']
+        result['cache_hit_rate'] = result['cache_hit_tokens'] / prompt if prompt else 0.0
+        return result
@@ -1,66 +1,289 @@
 import os
+import shutil
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import pandas as pd
 
 from .data_analyzer import DataAnalyzer
+from .lazy_data import LazyDataStore
+from .column_pruning import referenced_columns
+from .parquet_dataset import build_time_filter
+from .folder_watcher import FolderWatcher, DEFAULT_POLL_INTERVAL
+from .duplicate_finder import find_duplicates
 from .llm_client import DeepSeekClient
 from .code_executor import CodeExecutor
+from .process_runner import run_when_ready
 
 
 class VisualizationAgent:
-    def __init__(self, api_key: str, output_dir: str = "./output"):
+    def __init__(
+        self,
+        api_key: str,
+        output_dir: str = "./output",
+        analyzer_options: Optional[Dict[str, Any]] = None,
+        llm_options: Optional[Dict[str, Any]] = None,
+        lazy: bool = False,
+        memory_budget: Optional[int] = None,
+        stream: bool = False
+    ):
+        """
+        Args:
+            api_key: DeepSeek API密钥
+            output_dir: 输出目录
+            analyzer_options: 传给 DataAnalyzer 的参数，如 {'cache_dir': '~/.fig_agent_cache'}
+            llm_options: 传给 DeepSeekClient 的参数，如 {'pool_size': 16}
+            lazy: 加载时只计算分析结果，数据在首次生成可视化时才读取
+            memory_budget: 延迟读取数据的内存上限（字节），超出时淘汰最久未用的数据
+            stream: 流式接收生成的代码并边接收边输出，代码块结束时立即停止接收并校验语法
+        """
         self.api_key = api_key
         self.output_dir = output_dir
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         
-        self.data_analyzer = DataAnalyzer()
-        self.llm_client = DeepSeekClient(api_key)
+        self.data_analyzer = DataAnalyzer(**(analyzer_options or {}))
+        # 扫描数据目录时跳过输出目录
+        self.data_analyzer.scanner.exclude_paths.add(os.path.abspath(output_dir))
+        self.llm_client = DeepSeekClient(api_key, **(llm_options or {}))
         self.code_executor = CodeExecutor(output_dir)
         
-        self.current_data = {}
+        self.lazy = lazy
+        self.stream = stream
+        self.current_data = LazyDataStore(self.data_analyzer.materialize, memory_budget)
         self.current_analyses = {}
+        # 内容重复的文件 -> 实际加载的文件
+        self.aliases = {}
         self.generated_codes = []
         self.execution_history = []
+        
+        # 监视模式使用的状态
+        self.watch_sources = []
+        self.file_states = {}
+        self.load_options = {}
+        self.deduplicate = True
+        self.watcher = None
     
-    def load_data(self, file_paths: List[str]) -> Dict[str, Any]:
-        """加载数据文件或文件夹"""
+    def load_data(self, file_paths: List[str], **options) -> Dict[str, Any]:
+        """加载数据文件或文件夹
+        
+        options 透传给 DataAnalyzer.analyze_multiple_files，
+        例如 parallel=True, max_workers=8, timeout=60；
+        streaming=True 时只保留统计信息，数据在生成可视化时再读取；
+        lazy 模式下默认 keep_data=False，同样延迟到首次使用时读取；
+        deduplicate=False 时不检测内容重复的文件（默认重复文件只加载一次，记为别名）
+        """
         if isinstance(file_paths, str):
             file_paths = [file_paths]
+        self.deduplicate = options.pop('deduplicate', True)
         
+        sources = list(file_paths)
         file_paths = self.data_analyzer.resolve_paths(file_paths)
         
         if not file_paths:
             print("未找到任何数据文件")
             return {}
         
-        print(f"正在加载 {len(file_paths)} 个数据文件...")
-        results = self.data_analyzer.analyze_multiple_files(file_paths)
+        if self.lazy:
+            options.setdefault('keep_data', False)
+        
+        self._track_sources(sources, file_paths, options)
+        
+        duplicates = self._find_duplicates(file_paths) if self.deduplicate else {}
+        unique_paths = [fp for fp in file_paths if fp not in duplicates]
+        
+        print(f"正在加载 {len(unique_paths)} 个数据文件...")
+        if duplicates:
+            print(f"跳过 {len(duplicates)} 个内容重复的文件:")
+            for duplicate, original in duplicates.items():
+                print(f"  = {duplicate} (与 {original} 相同)")
+        results = self.data_analyzer.analyze_multiple_files(unique_paths, **options)
         
         for file_path, result in results.items():
             if result['success']:
-                self.current_data[file_path] = result['data']
-                self.current_analyses[file_path] = result['analysis']
+                self._store_result(file_path, result)
                 print(f"✓ 成功加载: {file_path}")
+                memory = result['analysis'].get('memory')
+                if memory:
+                    print(f"内存占用: {memory['before'] / 1024 ** 2:.1f}MB → {memory['after'] / 1024 ** 2:.1f}MB")
                 print(self.data_analyzer.generate_summary(result['analysis']))
             else:
+                self.file_states.pop(file_path, None)
                 print(f"✗ 加载失败: {file_path} - {result['error']}")
         
+        for duplicate, original in duplicates.items():
+            if original in self.current_analyses:
+                self._add_alias(duplicate, original)
+                loaded = {'success': True, 'data': None, 'analysis': self.current_analyses[original]}
+                results[duplicate] = dict(results.get(original, loaded), duplicate_of=original)
+        
         return results
     
-    def suggest_visualizations(self, file_path: Optional[str] = None) -> List[str]:
-        """建议可视化类型"""
+    def _find_duplicates(self, file_paths: List[str]) -> Dict[str, str]:
+        """在 file_paths 中找出与已加载文件或列表中靠前的文件内容相同的文件"""
+        loaded = [fp for fp in self.current_analyses if fp not in file_paths]
+        duplicates = find_duplicates(loaded + list(dict.fromkeys(file_paths)))
+        return {fp: original for fp, original in duplicates.items() if fp in file_paths}
+    
+    def _add_alias(self, duplicate: str, original: str):
+        """把 duplicate 记为 original 的别名，之前单独加载的数据随之释放"""
+        self.aliases[duplicate] = original
+        self.current_analyses.pop(duplicate, None)
+        if duplicate in self.current_data:
+            del self.current_data[duplicate]
+    
+    def _track_sources(self, sources: List[str], file_paths: List[str], options: Dict[str, Any]):
+        """记录加载来源和文件状态（在读取之前），供监视模式判断变化"""
+        for source in sources:
+            if source not in self.watch_sources:
+                self.watch_sources.append(source)
+        self.load_options = {k: v for k, v in options.items() if k in ('streaming', 'chunksize', 'keep_data')}
+        for file_path in file_paths:
+            try:
+                self.file_states[file_path] = self.data_analyzer.file_state(file_path)
+            except OSError:
+                self.file_states.pop(file_path, None)
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+    
+    def _store_result(self, file_path: str, result: Dict[str, Any]):
+        if result['data'] is not None:
+            self.current_data.refresh(file_path, result['data'])
+        else:
+            self.current_data.register(file_path)
+        self.current_analyses[file_path] = result['analysis']
+    
+    def refresh(self, rerender: bool = False) -> Dict[str, List[str]]:
+        """检查已加载的文件和文件夹，只重新分析新增或修改的文件
+        
+        只追加的 CSV/TXT 在原数据仍在内存中时只解析新增的行。
+        rerender=True 时重新执行依赖变化文件的最近一次可视化代码（不调用LLM）。
+        返回 {'added', 'modified', 'removed'}。
+        """
+        if self.watcher is None:
+            baseline = {fp: (state['size'], state['mtime_ns']) for fp, state in self.file_states.items()}
+            self.watcher = FolderWatcher(self.watch_sources, self.data_analyzer.resolve_paths, baseline)
+        changes = self.watcher.poll()
+        
+        for file_path in changes['removed']:
+            self.current_analyses.pop(file_path, None)
+            self.file_states.pop(file_path, None)
+            self.aliases.pop(file_path, None)
+            if file_path in self.current_data:
+                del self.current_data[file_path]
+            print(f"- 文件已删除: {file_path}")
+        
+        # 原文件被删除的别名需要单独加载
+        orphaned = [fp for fp, original in self.aliases.items() if original not in self.current_analyses]
+        for file_path in orphaned:
+            del self.aliases[file_path]
+        duplicates = self._find_duplicates(changes['added'] + orphaned) if self.deduplicate else {}
+        
+        updated = []
+        for file_path in changes['added'] + changes['modified'] + orphaned:
+            previous = self.file_states.get(file_path)
+            try:
+                self.file_states[file_path] = self.data_analyzer.file_state(file_path)
+            except OSError:
+                continue
+            if duplicates.get(file_path) in self.current_analyses:
+                self._add_alias(file_path, duplicates[file_path])
+                print(f"= {file_path} (与 {duplicates[file_path]} 相同，未重复加载)")
+                continue
+            # 被修改的别名不再视为重复文件，单独加载
+            self.aliases.pop(file_path, None)
+            if file_path in changes['added']:
+                result = self.data_analyzer.analyze_file(file_path, **self.load_options)
+            else:
+                result = self.data_analyzer.reload_file(
+                    file_path, previous, self.current_data.peek(file_path), **self.load_options
+                )
+            
+            if not result['success']:
+                print(f"✗ 重新加载失败: {file_path} - {result['error']}")
+                continue
+            self._store_result(file_path, result)
+            updated.append(file_path)
+            if file_path in changes['added']:
+                print(f"✓ 新增文件: {file_path}")
+            elif 'appended_rows' in result:
+                print(f"✓ 追加 {result['appended_rows']} 行: {file_path}")
+            else:
+                print(f"✓ 重新加载: {file_path}")
+        
+        if rerender and (updated or changes['removed']):
+            self._rerender(set(updated) | set(changes['removed']))
+        return changes
+    
+    def watch(
+        self,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        rerender: bool = False,
+        max_rounds: Optional[int] = None
+    ):
+        """监视模式：目录变化时（inotify，不可用时按 interval 轮询）自动调用 refresh
+        
+        max_rounds 为None时一直运行，直到 KeyboardInterrupt。
+        """
+        if not self.watch_sources:
+            raise ValueError("请先加载数据")
+        self.refresh(rerender)
+        print(f"正在监视 {len(self.watch_sources)} 个路径（{self.watcher.mode}），按 Ctrl+C 停止")
+        rounds = 0
+        try:
+            while max_rounds is None or rounds < max_rounds:
+                if self.watcher.wait(interval):
+                    self.refresh(rerender)
+                rounds += 1
+        except KeyboardInterrupt:
+            print("\n已停止监视")
+    
+    def _rerender(self, changed: set):
+        """重新执行依赖变化文件的最近一次可视化代码"""
+        latest = {}
+        for entry in self.generated_codes:
+            if 'render' in entry:
+                latest[entry['file_path']] = entry
+        
+        for file_path, entry in latest.items():
+            if entry.get('is_combined'):
+                if not self.current_data:
+                    continue
+                print("正在重新生成综合可视化...")
+                result = self.code_executor.execute_combined_visualization(
+                    code=entry['code'],
+                    data_dict=self.current_data,
+                    **entry['render']
+                )
+            elif file_path in changed and file_path in self.current_analyses:
+                print(f"正在重新生成可视化: {file_path}")
+                result = self.code_executor.execute_visualization_code(
+                    code=entry['code'],
+                    df=self._data_for_code(file_path, entry['code'], entry['requirements']),
+                    **entry['render']
+                )
+            else:
+                continue
+            self.execution_history.append(result)
+            if not result['success']:
+                print(f"✗ 执行失败: {result['error']}")
+    
+    def suggest_visualizations(self, file_path: Optional[str] = None, fresh: bool = False) -> List[str]:
+        """建议可视化类型，fresh=True 时不使用缓存的回复"""
         if not self.current_analyses:
             raise ValueError("请先加载数据")
         
         if file_path is None:
             file_path = list(self.current_analyses.keys())[0]
+        file_path = self.aliases.get(file_path, file_path)
         
         analysis = self.current_analyses[file_path]
         summary = self.data_analyzer.generate_summary(analysis)
         
         print("正在分析数据特征并生成建议...")
-        suggestions = self.llm_client.suggest_visualizations(summary)
+        suggestions = self.llm_client.suggest_visualizations(summary, fresh=fresh)
         
         print("\n推荐的可视化类型：")
         for i, suggestion in enumerate(suggestions, 1):
@@ -74,19 +297,27 @@ class VisualizationAgent:
         requirements: Optional[str] = None,
         output_filename: Optional[str] = None,
         allow_multiple: bool = True,
-        max_retries: int = 3
+        max_retries: int = 3,
+        code: Optional[str] = None,
+        fresh: bool = False,
+        candidates: int = 1
     ) -> Dict[str, Any]:
-        """生成可视化，支持单图或多图输出，失败时自动修复"""
+        """生成可视化，支持单图或多图输出，失败时自动修复
+        
+        提供 code 时第一次尝试直接使用该代码；fresh=True 时不使用缓存的回复，重新生成。
+        candidates > 1 时第一次尝试同时请求多个候选代码（见 _generate_candidates），
+        全部失败时再从第一个失败的候选开始逐次修复。
+        """
         if not self.current_analyses:
             raise ValueError("请先加载数据")
         
         if file_path is None:
-            file_path = list(self.current_data.keys())[0]
+            file_path = list(self.current_analyses.keys())[0]
+        file_path = self.aliases.get(file_path, file_path)
         
-        if file_path not in self.current_data:
+        if file_path not in self.current_analyses:
             raise ValueError(f"数据文件 {file_path} 未加载")
         
-        df = self.current_data[file_path]
         analysis = self.current_analyses[file_path]
         summary = self.data_analyzer.generate_summary(analysis)
         
@@ -95,33 +326,48 @@ class VisualizationAgent:
         
         # 尝试多次直到成功
         error_feedback = None
-        for attempt in range(max_retries):
+        first_attempt = 0
+        if candidates > 1 and code is None:
+            result, error_feedback = self._generate_candidates(
+                file_path, summary, requirements, output_filename, allow_multiple, candidates, fresh
+            )
+            if result['success']:
+                return result
+            if result.get('code') is not None:
+                code = result['code']
+                first_attempt = 1
+        for attempt in range(first_attempt, max_retries):
+            streamed = {}
             if attempt > 0:
                 print(f"\n第 {attempt + 1} 次尝试修复代码...")
-            else:
+            elif code is None:
                 print("正在生成可视化代码...")
             
-            code = self.llm_client.generate_visualization_code(
-                data_summary=summary,
-                user_requirements=requirements,
-                allow_multiple=allow_multiple,
-                num_files=len(self.current_data),
-                previous_code=code if attempt > 0 else None,
-                feedback=error_feedback if attempt > 0 else None
-            )
+            if attempt > 0 or code is None:
+                code = self.llm_client.generate_visualization_code(
+                    data_summary=summary,
+                    user_requirements=requirements,
+                    allow_multiple=allow_multiple,
+                    num_files=len(self.current_analyses),
+                    previous_code=code if attempt > 0 else None,
+                    feedback=error_feedback if attempt > 0 else None,
+                    fresh=fresh,
+                    **self._code_hooks("生成的代码：", streamed)
+                )
             
             self.generated_codes.append({
                 'code': code,
                 'requirements': requirements,
-                'file_path': file_path
+                'file_path': file_path,
+                'render': {
+                    'output_filename': f"{output_filename}.png", 'base_filename': output_filename,
+                    'workdir': self.output_dir
+                }
             })
             
-            print("生成的代码：")
-            print("-" * 80)
-            print(code)
-            print("-" * 80)
+            self._show_code("生成的代码：", code, streamed)
             
-            validation = self.code_executor.validate_code(code)
+            validation = self._validate(code, streamed)
             if not validation['valid']:
                 if attempt < max_retries - 1:
                     error_feedback = f"Code validation failed: {validation['error']}\n\nPlease fix the syntax errors."
@@ -135,11 +381,13 @@ class VisualizationAgent:
             
             print("\n正在执行代码生成可视化...")
             
+            df = self._data_for_code(file_path, code, requirements)
             result = self.code_executor.execute_visualization_code(
                 code=code,
                 df=df,
-                output_filename=self.output_dir,
-                base_filename=output_filename
+                output_filename=f"{output_filename}.png",
+                base_filename=output_filename,
+                workdir=self.output_dir
             )
             
             self.execution_history.append(result)
@@ -161,8 +409,281 @@ class VisualizationAgent:
         result['code'] = code
         return result
     
-    def generate_all_visualizations(self, requirements: Optional[str] = None, max_retries: int = 3) -> Dict[str, Any]:
-        """统一分析所有数据，生成综合可视化，失败时自动修复"""
+    def _generate_candidates(
+        self,
+        file_path: str,
+        summary: str,
+        requirements: Optional[str],
+        output_filename: str,
+        allow_multiple: bool,
+        candidates: int,
+        fresh: bool
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """同时请求多个候选代码（temperature 各不相同），每个候选到达后立即在独立的子进程中执行
+        
+        返回第一个执行成功的结果，并中断其余仍在接收的请求、终止仍在执行的子进程。
+        全部失败时返回 (第一个失败的候选的结果, 修复时使用的反馈)，没有得到任何代码时结果中 code 为 None。
+        各候选以输出目录下各自的临时目录为工作目录执行，成功的候选生成的文件移动到输出目录。
+        """
+        print(f"正在同时生成 {candidates} 个候选代码，采用第一个执行成功的...")
+        cancelled = threading.Event()
+        data_lock = threading.Lock()
+        codes = {}
+        invalid = {}
+        sandboxes = []
+        for index in range(candidates):
+            sandbox = os.path.abspath(os.path.join(self.output_dir, f".{output_filename}_candidate_{index}"))
+            Path(sandbox).mkdir(parents=True, exist_ok=True)
+            sandboxes.append(sandbox)
+        
+        def on_code_delta(_text: str):
+            # 流式接收时每段文本都检查一次，已有候选成功时断开连接
+            if cancelled.is_set():
+                raise _CandidateCancelled("已有候选代码执行成功，取消该请求")
+        
+        def prepare(index: int) -> tuple:
+            code = self.llm_client.generate_visualization_code(
+                data_summary=summary,
+                user_requirements=requirements,
+                allow_multiple=allow_multiple,
+                num_files=len(self.current_analyses),
+                fresh=fresh,
+                purpose='speculative',
+                temperature=_candidate_temperature(index),
+                on_code_delta=on_code_delta
+            )
+            codes[index] = code
+            validation = self.code_executor.validate_code(code)
+            if not validation['valid']:
+                invalid[index] = validation['error']
+                raise SyntaxError(validation['error'])
+            # 延迟加载的数据不能在多个线程中同时读取
+            with data_lock:
+                df = self._data_for_code(file_path, code, requirements)
+            return self.code_executor, sandboxes[index], code, df, f"{output_filename}.png", output_filename
+        
+        executor = ThreadPoolExecutor(candidates, thread_name_prefix='candidate')
+        futures = [executor.submit(prepare, index) for index in range(candidates)]
+        outcomes = run_when_ready(
+            _execute_candidate, futures,
+            max_workers=max(CANDIDATE_MIN_WORKERS, os.cpu_count() or 1), preload=CANDIDATE_PRELOAD
+        )
+        winner = None
+        failures = []
+        try:
+            for index, status, payload in outcomes:
+                if status == 'ok':
+                    self.execution_history.append(payload)
+                    if payload['success']:
+                        winner = index, payload
+                        break
+                    error = payload['error']
+                else:
+                    error = payload
+                print(f"✗ 候选 {index + 1} 失败: {error.splitlines()[0] if error else status}")
+                failures.append((index, error))
+        finally:
+            cancelled.set()
+            outcomes.close()
+            executor.shutdown(wait=False)
+        
+        try:
+            if winner is None:
+                print(f"✗ {candidates} 个候选代码均未执行成功")
+                with_code = [(index, error) for index, error in failures if index in codes]
+                if not with_code:
+                    return {'success': False, 'error': failures[0][1] if failures else '', 'code': None}, None
+                index, error = with_code[0]
+                code = codes[index]
+                self.generated_codes.append({
+                    'code': code,
+                    'requirements': requirements,
+                    'file_path': file_path,
+                    'render': {
+                        'output_filename': f"{output_filename}.png", 'base_filename': output_filename,
+                        'workdir': self.output_dir
+                    }
+                })
+                if index in invalid:
+                    feedback = f"Code validation failed: {invalid[index]}\n\nPlease fix the syntax errors."
+                else:
+                    feedback = f"Code execution failed with error:\n{error}\n\nPlease fix the code to resolve this error."
+                return {'success': False, 'error': error, 'code': code}, feedback
+            
+            index, result = winner
+            code = codes[index]
+            self.generated_codes.append({
+                'code': code,
+                'requirements': requirements,
+                'file_path': file_path,
+                'render': {
+                    'output_filename': f"{output_filename}.png", 'base_filename': output_filename,
+                    'workdir': self.output_dir
+                }
+            })
+            self._show_code(f"候选 {index + 1} 执行成功，采用的代码：", code, {})
+            # 结果中的路径相对于候选的工作目录；临时目录删除前把其中的文件移动到输出目录
+            sandbox = sandboxes[index]
+            moved = {}
+            for name in sorted(os.listdir(sandbox)):
+                source = os.path.join(sandbox, name)
+                if os.path.isfile(source):
+                    destination = os.path.join(self.output_dir, name)
+                    os.replace(source, destination)
+                    moved[source] = destination
+            
+            def relocate(path: Optional[str]) -> Optional[str]:
+                if path is None:
+                    return None
+                return moved.get(os.path.normpath(os.path.join(sandbox, path)))
+            
+            result['output_files'] = [relocate(path) for path in result.get('output_files') or [] if relocate(path)]
+            result['output_file'] = relocate(result.get('output_file'))
+            output_files = result['output_files'] or [f for f in [result['output_file']] if f]
+            print(f"✓ 成功生成 {len(output_files)} 个可视化:")
+            for f in output_files:
+                print(f"  - {f}")
+            result['code'] = code
+            result['candidate'] = index
+            return result, None
+        finally:
+            for sandbox in sandboxes:
+                shutil.rmtree(sandbox, ignore_errors=True)
+    
+    def generate_visualizations(
+        self,
+        file_paths: Optional[List[str]] = None,
+        requirements: Optional[str] = None,
+        allow_multiple: bool = True,
+        max_retries: int = 3,
+        fresh: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """为每个文件分别生成可视化
+        
+        各文件的代码通过异步接口并发生成（并发数见 DeepSeekClient 的 max_concurrency），
+        随后依次执行，执行失败的文件按 generate_visualization 的方式逐个修复。
+        """
+        if not self.current_analyses:
+            raise ValueError("请先加载数据")
+        
+        if file_paths is None:
+            file_paths = list(self.current_analyses.keys())
+        file_paths = list(dict.fromkeys(self.aliases.get(p, p) for p in file_paths))
+        for file_path in file_paths:
+            if file_path not in self.current_analyses:
+                raise ValueError(f"数据文件 {file_path} 未加载")
+        
+        summaries = [self.data_analyzer.generate_summary(self.current_analyses[p]) for p in file_paths]
+        print(f"正在并发生成 {len(file_paths)} 个文件的可视化代码...")
+        codes = _run_coroutine(self._generate_codes(summaries, requirements, allow_multiple, fresh))
+        
+        results = {}
+        for file_path, code in zip(file_paths, codes):
+            print(f"\n=== {file_path} ===")
+            if isinstance(code, Exception):
+                # 并发生成失败的文件重新单独生成
+                print(f"✗ 代码生成失败: {code}")
+                code = None
+            results[file_path] = self.generate_visualization(
+                file_path,
+                requirements=requirements,
+                allow_multiple=allow_multiple,
+                max_retries=max_retries,
+                code=code,
+                fresh=fresh
+            )
+        return results
+    
+    async def _generate_codes(
+        self,
+        summaries: List[str],
+        requirements: Optional[str],
+        allow_multiple: bool,
+        fresh: bool
+    ) -> List[Any]:
+        """并发生成各摘要对应的代码，失败的位置返回异常对象"""
+        tasks = [
+            self.llm_client.generate_visualization_code_async(
+                summary,
+                user_requirements=requirements,
+                allow_multiple=allow_multiple,
+                num_files=len(self.current_analyses),
+                fresh=fresh
+            )
+            for summary in summaries
+        ]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _code_hooks(self, title: str, streamed: Dict[str, Any]) -> Dict[str, Any]:
+        """流式模式下的回调：代码边接收边输出，代码块结束时立即校验语法，结果记录在 streamed 中"""
+        if not self.stream:
+            return {}
+        
+        def on_code_delta(text: str):
+            if not streamed.get('printed'):
+                streamed['printed'] = True
+                print(title)
+                print("-" * 80)
+            print(text, end='', flush=True)
+        
+        def on_code_complete(code: str):
+            streamed['code'] = code
+            streamed['validation'] = self.code_executor.validate_code(code)
+        
+        return {'on_code_delta': on_code_delta, 'on_code_complete': on_code_complete}
+    
+    def _show_code(self, title: str, code: str, streamed: Dict[str, Any]):
+        """输出生成的代码，流式模式下代码已在接收时输出"""
+        if streamed.get('printed'):
+            print()
+            print("-" * 80)
+            return
+        print(title)
+        print("-" * 80)
+        print(code)
+        print("-" * 80)
+    
+    def _validate(self, code: str, streamed: Dict[str, Any]) -> Dict[str, Any]:
+        """校验代码语法，流式接收时已在代码块结束时校验过"""
+        if streamed.get('code') == code:
+            return streamed['validation']
+        return self.code_executor.validate_code(code)
+    
+    def _get_data(self, file_path: str) -> pd.DataFrame:
+        """获取数据，流式或延迟加载的文件在此时才完整读取"""
+        return self.current_data[file_path]
+    
+    def _data_for_code(self, file_path: str, code: str, requirements: Optional[str] = None) -> pd.DataFrame:
+        """获取执行代码所需的数据
+        
+        数据尚未读入内存时，只读取代码中引用的列；代码对数据表的使用
+        无法静态确定时回退到完整数据。分区数据集在需求包含时间窗口
+        （如"最近3个月"）时只读取窗口内的分区文件和行组。
+        """
+        analysis = self.current_analyses[file_path]
+        row_filter = build_time_filter(analysis, requirements)
+        if row_filter is not None:
+            columns = referenced_columns(code, analysis['columns'])
+            df = self.data_analyzer.materialize(file_path, columns, row_filter)
+            read = df.attrs['dataset_read']
+            print(f"按需求筛选数据集: 读取 {read['files']}/{read['total_files']} 个文件, {len(df)} 行")
+            return df
+        
+        if not self.current_data.is_loaded(file_path):
+            all_columns = analysis['columns']
+            columns = referenced_columns(code, all_columns)
+            if columns is not None and len(columns) < len(all_columns):
+                print(f"按需读取 {len(columns)}/{len(all_columns)} 列: {', '.join(columns)}")
+                return self.data_analyzer.materialize(file_path, columns)
+        return self._get_data(file_path)
+    
+    def generate_all_visualizations(
+        self,
+        requirements: Optional[str] = None,
+        max_retries: int = 3,
+        fresh: bool = False
+    ) -> Dict[str, Any]:
+        """统一分析所有数据，生成综合可视化，失败时自动修复；fresh=True 时不使用缓存的回复"""
         if not self.current_data:
             raise ValueError("请先加载数据")
         
@@ -189,26 +710,27 @@ class VisualizationAgent:
                 current_summary += f"\n\nPrevious error: {error_feedback}"
             
             # 生成代码，智能判断是否需要多图
+            streamed = {}
             code = self.llm_client.generate_combined_visualization_code(
                 combined_summary=current_summary,
                 user_requirements=requirements,
                 num_datasets=len(self.current_data),
-                data_dict=self.current_data
+                data_dict=self.current_data,
+                fresh=fresh,
+                **self._code_hooks("生成的代码：", streamed)
             )
             
             self.generated_codes.append({
                 'code': code,
                 'requirements': requirements,
                 'file_path': 'combined_all',
-                'is_combined': True
+                'is_combined': True,
+                'render': {'output_dir': self.output_dir, 'base_filename': output_filename}
             })
             
-            print("生成的代码：")
-            print("-" * 80)
-            print(code)
-            print("-" * 80)
+            self._show_code("生成的代码：", code, streamed)
             
-            validation = self.code_executor.validate_code(code)
+            validation = self._validate(code, streamed)
             if not validation['valid']:
                 if attempt < max_retries - 1:
                     error_feedback = f"Code validation failed: {validation['error']}\n\nPlease fix the syntax errors."
@@ -296,7 +818,6 @@ class VisualizationAgent:
             return self._refine_combined_visualization(feedback, output_filename, max_retries)
         
         # 处理单文件可视化
-        df = self.current_data[file_path]
         analysis = self.current_analyses[file_path]
         summary = self.data_analyzer.generate_summary(analysis)
         
@@ -312,25 +833,27 @@ class VisualizationAgent:
             if attempt > 0:
                 print(f"\n第 {attempt + 1} 次尝试修复代码...")
             
+            streamed = {}
             code = self.llm_client.generate_visualization_code(
                 data_summary=summary,
                 user_requirements=requirements,
                 previous_code=previous_code,
-                feedback=feedback
+                feedback=feedback,
+                purpose='refine',
+                **self._code_hooks("优化后的代码：", streamed)
             )
             
             self.generated_codes.append({
                 'code': code,
                 'requirements': requirements,
                 'feedback': feedback,
-                'file_path': file_path
+                'file_path': file_path,
+                'render': {'output_filename': output_path}
             })
             
-            print("优化后的代码：")
-            print("-" * 80)
-            print(code)
-            print("-" * 80)
+            self._show_code("优化后的代码：", code, streamed)
             
+            df = self._data_for_code(file_path, code, requirements)
             result = self.code_executor.execute_visualization_code(
                 code=code,
                 df=df,
@@ -376,20 +899,26 @@ class VisualizationAgent:
             if attempt > 0:
                 print(f"\n第 {attempt + 1} 次尝试修复代码...")
             
+            streamed = {}
+            fixing = feedback.startswith("Code execution failed")
             code = self.llm_client.generate_combined_visualization_code(
                 combined_summary=combined_summary,
-                user_requirements=requirements if not feedback.startswith("Code execution failed") else None,
+                user_requirements=requirements if not fixing else None,
                 num_datasets=len(self.current_data),
-                data_dict=self.current_data
+                data_dict=self.current_data,
+                purpose='refine',
+                **({} if fixing else self._code_hooks("优化后的代码：", streamed))
             )
             
             # 如果是修复错误，添加错误信息到生成请求中
-            if feedback.startswith("Code execution failed"):
+            if fixing:
                 code = self.llm_client.generate_combined_visualization_code(
                     combined_summary=combined_summary + f"\n\nPrevious error: {feedback}",
                     user_requirements=requirements,
                     num_datasets=len(self.current_data),
-                    data_dict=self.current_data
+                    data_dict=self.current_data,
+                    purpose='refine',
+                    **self._code_hooks("优化后的代码：", streamed)
                 )
             
             self.generated_codes.append({
@@ -397,13 +926,11 @@ class VisualizationAgent:
                 'requirements': requirements,
                 'feedback': feedback,
                 'file_path': 'combined_all',
-                'is_combined': True
+                'is_combined': True,
+                'render': {'output_dir': self.output_dir, 'base_filename': output_filename}
             })
             
-            print("优化后的代码：")
-            print("-" * 80)
-            print(code)
-            print("-" * 80)
+            self._show_code("优化后的代码：", code, streamed)
             
             result = self.code_executor.execute_combined_visualization(
                 code=code,
@@ -434,11 +961,18 @@ class VisualizationAgent:
         return result
     
     def get_history(self) -> Dict[str, Any]:
-        """获取历史记录"""
+        """获取历史记录，llm_calls 为按用途汇总的LLM调用记录，timing 对比LLM耗时与代码执行耗时"""
+        llm_calls = self.llm_client.ledger.summary()
         return {
             'loaded_files': list(self.current_data.keys()),
+            'aliases': dict(self.aliases),
             'generated_codes': self.generated_codes,
-            'execution_history': self.execution_history
+            'execution_history': self.execution_history,
+            'llm_calls': llm_calls,
+            'timing': {
+                'llm_seconds': llm_calls['total']['llm_seconds'],
+                'execution_seconds': sum(r.get('execution_seconds', 0.0) for r in self.execution_history)
+            }
         }
     
     def export_code(self, output_file: str = "visualization_script.py"):
@@ -453,3 +987,40 @@ class VisualizationAgent:
             f.write(code)
         
         print(f"代码已导出到: {output_path}")
+
+
+# 执行候选代码的子进程预先导入的模块（执行环境中的 seaborn 在执行时才导入）
+CANDIDATE_PRELOAD = [CodeExecutor.__module__, 'seaborn']
+# 同时执行的候选数不超过CPU核数，但至少为2，一个执行很慢的候选不会使其余候选排队等待
+CANDIDATE_MIN_WORKERS = 2
+
+
+def _execute_candidate(
+    executor: CodeExecutor,
+    workdir: str,
+    code: str,
+    df: pd.DataFrame,
+    output_filename: str,
+    base_filename: str
+) -> Dict[str, Any]:
+    """在子进程中以候选自己的目录为工作目录执行代码，各候选以相对路径读写的文件互不影响"""
+    return executor.execute_visualization_code(code, df, output_filename, base_filename, workdir)
+
+
+class _CandidateCancelled(Exception):
+    """已有候选代码执行成功，中断其余候选的请求"""
+
+
+def _candidate_temperature(index: int) -> float:
+    """第 index 个候选代码的 temperature：第一个与逐次生成时相同（可命中响应缓存），其余依次升高"""
+    return min(1.5, 0.3 + 0.3 * index)
+
+
+def _run_coroutine(coroutine):
+    """在同步代码中运行协程；已处于事件循环中（如 Jupyter）时在新线程中运行"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()